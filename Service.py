@@ -1,5 +1,4 @@
 #!/usr/bin/env python3
-import os
 import logging
 import threading
 import signal
@@ -8,8 +7,19 @@ import time
 
 from app.config import Settings
 from app.services.archiver import Archiver
-from app.services.transcriber import Transcriber
+from app.services.channels import FairQueue
+from app.services.transcriber import Transcriber, SegmentBatcher, StreamingDecoder
 from app.services.db import DBClient
+from app.services.journal import SegmentJournal, DROPPED
+from app.services.scheduler import TranscriptionScheduler
+from app.services.gating import SpeechGate, audio_secs
+from app.services.rolling import RollingSummarizer
+from app.services.summarizer import DeepSeekClient
+from app.services.summary_cache import SummaryCache
+from app.utils.metrics import (
+    DECODED_AUDIO_SECONDS, LIVE_LAG_SECONDS, SEGMENTS_TOTAL, start_http_server, track_backlog
+)
+from app.utils.profiler import SamplingProfiler
 
 # 1) Loglama səviyyəsini qururuq
 logging.basicConfig(
@@ -21,41 +31,265 @@ logger = logging.getLogger(__name__)
 # 2) Konfiqurasiya obyektini yaradırıq
 settings = Settings()
 
-# 3) Xidmət komponentlərini ilkinizə edirik
-archiver    = Archiver(settings)
+# 3) Xidmət komponentlərini ilkinizə edirik: hər kanalın öz Archiver-i (ffmpeg prosesləri),
+#    model isə bütün kanallar üçün bir dəfə yüklənir
+journal     = SegmentJournal(settings)
+channels    = {cs.channel: cs for cs in settings.channel_settings()}
+archivers   = {name: Archiver(cs, journal) for name, cs in channels.items()}
 transcriber = Transcriber(settings)
 db_client   = DBClient(settings)
 
-# 4) Archiver-i işə salırıq (TS + WAV)
-archiver.start_ts()
-archiver.start_wav()
-logger.info("Xidmət başladı: TS archiver və WAV segmenter işə düşdü.")
+# 3b) Cədvəl/partisiyalar və retention job (TS arxivi ilə eyni pəncərə)
+db_client.init_db()
+
+def retention_job():
+    while True:
+        try:
+            db_client.run_retention()
+            journal.prune()
+        except Exception as e:
+            logger.error("Retention xəta: %s", e)
+        time.sleep(settings.retention_interval_secs)
+
+threading.Thread(target=retention_job, daemon=True).start()
+
+# 3c) Fon xülasələri: hər bağlanan zaman bucket-i üçün xülasə əvvəlcədən hazırlanır
+rolling = None
+if settings.rolling_summary_enabled:
+    rolling = RollingSummarizer(
+        db_client, DeepSeekClient(settings, cache=SummaryCache(settings, db_client)), settings
+    )
+    rolling.start()
+
+# 3d) TS faylı və offset vaxta görə arxiv indeksindən götürülür. Audio vaxtı eyni
+#     ffmpeg prosesinin PTS-i və TS-lərin PROGRAM-DATE-TIME-ı ilə hesablanır, ona görə dəqiqdir
+archive_indexes = {name: archiver.index for name, archiver in archivers.items()}
+
+def store(channel, segments, seg=None):
+    """İndeksdə hələ olmayan TS üçün fayl/offset seqmentin PTS-i və TS nömrəsindən hesablanır."""
+    archiver = archivers[channel]
+    fallback = (lambda ts: archiver.ts_position(seg, ts)) if seg is not None else None
+    segments = archive_indexes[channel].remap(segments, fallback)
+    for s in segments:
+        s.channel = channel
+    db_client.insert_segments(segments)
+    if rolling:
+        rolling.add(segments)
+
+def finish(seg, segments):
+    """Transkripsiya nəticəsi əvvəl jurnala, sonra DB-yə; crash olsa yenidən dekod lazım olmur."""
+    journal.transcribed(seg.job, segments)
+    store(seg.channel, segments, seg)
+    journal.finish(seg.job)
+    SEGMENTS_TOTAL.labels(channel=seg.channel, result="stored").inc()
+    LIVE_LAG_SECONDS.labels(channel=seg.channel).set(time.time() - (seg.start_ts + audio_secs(seg.source)))
+
+def failed(seg, e):
+    logger.error("Worker xəta: [%s] #%d: %s", seg.channel, seg.index, e)
+    SEGMENTS_TOTAL.labels(channel=seg.channel, result="error").inc()
+
+def release(seg):
+    """İşlənmiş seqmenti öz kanalının Archiver-inə qaytarır (ring slotu və ya WAV faylı)."""
+    archivers[seg.channel].done(seg)
+
+def drop(seg):
+    """Gate/scheduler atdığı seqment: jurnalda bağlanır ki, restart-da yenidən gəlməsin."""
+    journal.finish(seg.job, DROPPED)
+    SEGMENTS_TOTAL.labels(channel=seg.channel, result="dropped").inc()
+    release(seg)
+
+# 4b) Bütün kanallar bir fair-share queue-ya düşür (round-robin). Nitq ön-keçidi
+#     sükut/musiqi seqmentlərini modelə çatmadan atır. Stream rejimində bir kanalın
+#     seqmentləri eyni anda yalnız bir worker-də olur ki, sıra pozulmasın.
+gate = SpeechGate(settings)
+segment_queue = FairQueue(archivers, exclusive=settings.transcribe_mode == "stream")
+track_backlog(segment_queue.backlog)
+
+# 4c) Əvvəlki işləmədən qalan işlər: transkripsiyası olanlar dərhal yazılır (unikal açar
+#     təkrarı buraxmır), qalanların audiosu WAV-dan və ya TS arxivindən bərpa olunur
+def resume(name):
+    archiver = archivers[name]
+    for job in journal.pending(name):
+        if job.result is not None:
+            store(name, job.result)
+            journal.finish(job.id)
+            continue
+        seg = archiver.recover(job)
+        if seg is None:
+            journal.finish(job.id, DROPPED)
+            continue
+        segment_queue.put(seg)
+        logger.info("[%s] Seqment #%d bərpa olundu və növbəyə qoyuldu", name, job.idx)
+
+for name in archivers:
+    threading.Thread(target=resume, args=(name,), daemon=True).start()
+
+# 4d) Archiver-ləri işə salırıq: hər kanal üçün bir ffmpeg (TS arxivi + audio)
+for archiver in archivers.values():
+    archiver.start()
+logger.info("Xidmət başladı: %d kanal (%s)", len(archivers), ", ".join(archivers))
+
+def forward(src, dst):
+    while True:
+        seg = src.get()
+        dst.put(seg)
+        if seg is None:
+            return
+
+for name, archiver in archivers.items():
+    inlet = segment_queue.inlet(name)
+    if settings.gate_enabled:
+        target, args = gate.pump, (archiver.wav_queue, inlet, drop)
+    else:
+        target, args = forward, (archiver.wav_queue, inlet)
+    threading.Thread(target=target, args=args, daemon=True).start()
+
+def audio_segments():
+    while True:
+        seg = segment_queue.get()
+        if seg is None:
+            return
+        yield seg
+
+def record_decode(segs, t0):
+    secs = sum(audio_secs(s.source) for s in segs)
+    gate.record_decode(secs, time.monotonic() - t0)
+    DECODED_AUDIO_SECONDS.inc(secs)
+
+def monitor_gate():
+    while True:
+        time.sleep(settings.gate_report_secs)
+        logger.info("[Gate] %s", gate.stats())
 
 # 5) Transkripsiya worker funksiyası
 def transcription_worker():
-    for wav_path, start_ts in archiver.wav_generator():
-        logger.info("Worker: yeni WAV gəldi → %s", wav_path)
+    for seg in audio_segments():
+        logger.info("Worker: [%s] yeni seqment gəldi → #%d", seg.channel, seg.index)
         try:
-            segments = transcriber.transcribe(wav_path, start_ts)
-            db_client.insert_segments(segments)
+            t0 = time.monotonic()
+            segments = transcriber.transcribe(seg.source, seg.start_ts, seg.index)
+            record_decode([seg], t0)
+            finish(seg, segments)
             logger.info("Worker: %d seqment DB-ə yazıldı", len(segments))
+        except Exception as e:
+            failed(seg, e)
+
+        # 6) İşlənən seqmenti azad edirik (ring slotu və ya WAV faylı)
+        release(seg)
+
+# 5b) Batched worker: queue-dan bir neçə seqmenti birlikdə transkripsiya edir
+def batch_transcription_worker():
+    batcher = SegmentBatcher(
+        segment_queue,
+        settings.whisper_batch_size,
+        settings.whisper_batch_max_wait
+    )
+    for batch in batcher:
+        logger.info("Worker: %d seqmentlik partiya gəldi → #%d..#%d",
+                    len(batch), batch[0].index, batch[-1].index)
+        try:
+            t0 = time.monotonic()
+            results = transcriber.transcribe_batch(batch)
+            record_decode(batch, t0)
+            # Partiyada müxtəlif kanalların seqmentləri ola bilər
+            for seg, per_seg in zip(batch, results):
+                finish(seg, per_seg)
+            logger.info("Worker: %d seqment DB-ə yazıldı", sum(len(r) for r in results))
         except Exception as e:
             logger.error("Worker xəta: %s", e)
+            for seg in batch:
+                SEGMENTS_TOTAL.labels(channel=seg.channel, result="error").inc()
+
+        for seg in batch:
+            release(seg)
+
+# 5c) Stream worker: pəncərələri kontekstlə dekod edir, overlap təkrarlanmır.
+#     Hər kanalın öz decoder-i (quyruq və prompt) var, model ortaqdır.
+#     Quyruqlar yalnız bütün stream worker-ləri bitəndən sonra flush olunur: biri
+#     dayananda digəri hələ son seqmenti feed edə bilər.
+decoders = {name: StreamingDecoder(transcriber, settings) for name in archivers}
+stream_finished = threading.Barrier(transcriber.workers)
 
-        # 6) İşlənən WAV faylını silirik
+def stream_transcription_worker():
+    for seg in audio_segments():
+        logger.info("Worker: [%s] yeni seqment gəldi → #%d", seg.channel, seg.index)
         try:
-            os.remove(wav_path)
-            logger.info("WAV silindi: %s", wav_path)
+            t0 = time.monotonic()
+            segments = decoders[seg.channel].feed(seg.source, seg.start_ts, seg.index)
+            record_decode([seg], t0)
+            finish(seg, segments)
+            logger.info("Worker: %d seqment DB-ə yazıldı", len(segments))
         except Exception as e:
-            logger.warning("WAV silinərkən xəta: %s", e)
+            failed(seg, e)
+        release(seg)
+        segment_queue.task_done(seg.channel)
+    if stream_finished.wait() == 0:
+        for name, decoder in decoders.items():
+            store(name, decoder.flush())
+
+# 5d) Scheduler worker: lag-a görə keyfiyyəti azaldıb-artırır
+scheduler = TranscriptionScheduler(transcriber, settings, on_drop=drop)
+
+def scheduler_feeder():
+    for seg in audio_segments():
+        scheduler.submit(seg)
+    scheduler.close()
+
+def scheduled_transcription_worker():
+    for seg in scheduler:
+        logger.info("Worker: [%s] seqment #%d (pillə %s)", seg.channel, seg.index, scheduler.tier.name)
+        try:
+            t0 = time.monotonic()
+            segments = scheduler.transcribe(seg)
+            record_decode([seg], t0)
+            finish(seg, segments)
+            logger.info("Worker: %d seqment DB-ə yazıldı", len(segments))
+        except Exception as e:
+            failed(seg, e)
+        release(seg)
+
+def monitor_scheduler():
+    while True:
+        logger.info("[Monitor] %s", scheduler.status())
+        time.sleep(settings.sched_report_secs)
+
+# 7) Worker thread-lərini daemon kimi işə salırıq (hamısı eyni modeli paylaşır);
+#    sayı modelin num_workers-i ilə eynidir (CPU profili varsa, onun seçdiyi düzülüş)
+if settings.sched_enabled:
+    worker = scheduled_transcription_worker
+    threading.Thread(target=scheduler_feeder, daemon=True).start()
+    threading.Thread(target=monitor_scheduler, daemon=True).start()
+elif settings.transcribe_mode == "stream":
+    worker = stream_transcription_worker
+elif settings.whisper_batch_size > 1:
+    worker = batch_transcription_worker
+else:
+    worker = transcription_worker
+for _ in range(transcriber.workers):
+    threading.Thread(target=worker, daemon=True).start()
+if settings.gate_enabled:
+    threading.Thread(target=monitor_gate, daemon=True).start()
+
+# 7b) Prometheus /metrics (mərhələ histogramları, lag və backlog) və opt-in profiler:
+#     SIGUSR1 profiler_max_secs ərzində stack-ləri toplayıb profiler_dir-ə yazır
+profiler = SamplingProfiler(settings)
+if settings.metrics_port:
+    start_http_server(settings.metrics_port, profiler)
+    logger.info("Metrics: http://0.0.0.0:%d/metrics", settings.metrics_port)
+
+def dump_profile(sig, frame):
+    if profiler.enabled:
+        threading.Thread(target=profiler.dump, args=(profiler.max_secs,), daemon=True).start()
 
-# 7) Worker thread-i daemon kimi işə salırıq
-threading.Thread(target=transcription_worker, daemon=True).start()
+signal.signal(signal.SIGUSR1, dump_profile)
 
 # 8) Sinyal handler – Ctrl+C ilə shutdown
 def shutdown(sig, frame):
     logger.info("Shutdown siqnalı alındı (%s), xidmət dayandırılır…", sig)
-    archiver.stop()
+    for archiver in archivers.values():
+        archiver.stop()
+    if rolling:
+        rolling.flush()
     sys.exit(0)
 
 signal.signal(signal.SIGINT,  shutdown)
@@ -1,17 +1,29 @@
 # api.py
 
 import os
-import subprocess
-from datetime import datetime, timedelta
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional
 
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, ORJSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 
 from app.config import Settings
 from app.services.db import DBClient
-from app.services.summarizer import DeepSeekClient
-from app.api.schemas import SearchResponse, SegmentInfo
+from app.services.async_db import AsyncDBClient
+from app.services.summarizer import AsyncDeepSeekClient
+from app.services.summary_cache import SummaryCache
+from app.services.clips import ClipService
+from app.services.archive_index import ArchiveIndex
+from app.services.playlists import PlaylistService
+from app.services.live import LiveHub
+from prometheus_client import Gauge
+from app.utils.metrics import CONTENT_TYPE, render
+from app.utils.profiler import SamplingProfiler
+from app.services.db import decode_cursor
+from app.services.search import NotFound, find_segments, ndjson_search, run_search, stream_search
+from app.api.schemas import SearchResponse
 
 settings = Settings()
 app = FastAPI()
@@ -30,46 +42,255 @@ app.mount("/archive", StaticFiles(directory=settings.archive_dir), name="archive
 
 db = DBClient(settings)
 db.init_db()           # make sure table exists
-ds = DeepSeekClient(settings)
+summary_cache = SummaryCache(settings, db)
+
+adb = AsyncDBClient(settings)
+ads = AsyncDeepSeekClient(settings, cache=summary_cache)
+
+hub = LiveHub(settings, adb)
+
+@app.on_event("startup")
+async def start_live():
+    hub.start()
+
+@app.on_event("shutdown")
+async def close_clients():
+    await hub.stop()
+    await ads.aclose()
+    await adb.close()
 
 @app.get("/search/", response_model=SearchResponse)
-def search(keyword: str = Query(..., min_length=1)):
-    # 1) find matching segments
-    segments = db.search(keyword)
-    if not segments:
+async def search(
+    keyword: str = Query(..., min_length=1),
+    limit: Optional[int] = Query(None, ge=1),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    ranked: bool = False,
+    channel: Optional[str] = None
+):
+    # matching segments → clustered context windows → DeepSeek summary
+    try:
+        return await run_search(
+            adb, ads, settings, keyword,
+            limit=limit or settings.search_max_rows,
+            start=start, end=end, ranked=ranked, channel=channel
+        )
+    except NotFound:
         raise HTTPException(404, "Keyword tapılmadı")
 
-    # 2) compute ±3min window around matches
-    starts = [datetime.fromisoformat(s.start_time) for s in segments]
-    ends   = [datetime.fromisoformat(s.end_time)   for s in segments]
-    window_start = min(starts) - timedelta(minutes=3)
-    window_end   = max(ends)   + timedelta(minutes=3)
+@app.get("/search/stream/")
+async def search_stream(
+    keyword: str = Query(..., min_length=1),
+    limit: Optional[int] = Query(None, ge=1),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    ranked: bool = False,
+    channel: Optional[str] = None
+):
+    # segments go out at once, the summary follows token by token (SSE)
+    try:
+        segments = await find_segments(
+            adb, keyword, limit=limit or settings.search_max_rows,
+            start=start, end=end, ranked=ranked, channel=channel
+        )
+    except NotFound:
+        raise HTTPException(404, "Keyword tapılmadı")
+    return StreamingResponse(
+        stream_search(adb, ads, settings, segments),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-    # 3) fetch full text in that window
-    context = db.fetch_text(
-        window_start.isoformat(),
-        window_end.isoformat()
+@app.get("/search/segments/")
+async def search_segments(
+    keyword: str = Query(..., min_length=1),
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    channel: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
+    # hits only, no summary: keyset pages on (start_time, id), or every row
+    # streamed as NDJSON off a server-side cursor
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(400, "Yanlış cursor")
+    filters = dict(cursor=cursor, start_time=start, end_time=end, channel=channel)
+    if format == "ndjson":
+        return StreamingResponse(
+            ndjson_search(adb, keyword, limit=limit, **filters),
+            media_type="application/x-ndjson"
+        )
+    rows, next_cursor = await adb.search_page(
+        keyword, min(limit or settings.search_page_size, settings.search_page_max), **filters
     )
+    return ORJSONResponse({"segments": rows, "next_cursor": next_cursor})
 
-    # 4) summarize with DeepSeek
-    summary = ds.summarize_text(context)
+@app.get("/summary_cache/stats")
+def summary_cache_stats():
+    return summary_cache.stats()
 
-    return SearchResponse(summary=summary, segments=segments)
+# one archive index / playlist cache per channel (archive_dir/<channel> when channels are set)
+channels = {cs.channel: cs for cs in settings.channel_settings()}
+clips = ClipService(settings)
+archive_indexes = {name: ArchiveIndex(cs) for name, cs in channels.items()}
+playlists = {name: PlaylistService(cs, archive_indexes[name]) for name, cs in channels.items()}
+
+def channel_name(channel: Optional[str]) -> str:
+    if channel is None:
+        return next(iter(channels))
+    if channel not in channels:
+        raise HTTPException(404, "Kanal yoxdu")
+    return channel
+
+def serve_clip(files, start: float, duration: float):
+    key = clips.key(files, start, duration)
+    cached = clips.lookup(key)
+    if cached:
+        return FileResponse(cached, media_type="video/mp4")
+    return StreamingResponse(clips.remux(files, start, duration, key), media_type="video/mp4")
 
 @app.get("/video_clip/", response_class=StreamingResponse)
-def clip(video_file: str, start: float, duration: float):
-    path = os.path.join(settings.archive_dir, video_file)
-    if not os.path.exists(path):
+async def clip(video_file: str, start: float, duration: float, channel: Optional[str] = None):
+    cs = channels[channel_name(channel)]
+    resolved = clips.resolve(video_file, start, duration, cs.archive_dir)
+    if resolved is None:
         raise HTTPException(404, "Segment yoxdu")
-    cmd = [
-        "ffmpeg", "-ss", str(start), "-i", path,
-        "-t", str(duration), "-c", "copy",
-        "-bsf:a", "aac_adtstoasc",
-        "-movflags", "frag_keyframe+empty_moov",
-        "-f", "mp4", "pipe:1"
-    ]
-    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
-    return StreamingResponse(proc.stdout, media_type="video/mp4")
+    files, start = resolved
+    return serve_clip(files, start, duration)
+
+@app.get("/clip_by_time/", response_class=StreamingResponse)
+async def clip_by_time(
+    at: datetime,
+    duration: float = Query(..., gt=0),
+    channel: Optional[str] = None
+):
+    # wall-clock time → TS segment(s) via the in-memory archive index
+    index = archive_indexes[channel_name(channel)]
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    resolved = await asyncio.to_thread(index.span, at.timestamp(), duration)
+    if resolved is None:
+        raise HTTPException(404, "Bu vaxt üçün video yoxdu")
+    files, start = resolved
+    return serve_clip(files, start, duration)
+
+def m3u8(body: Optional[str]) -> Response:
+    if body is None:
+        raise HTTPException(404, "Bu aralıqda video yoxdu")
+    return Response(body, media_type="application/vnd.apple.mpegurl",
+                    headers={"Cache-Control": f"max-age={int(settings.playlist_cache_ttl)}"})
+
+@app.get("/playlist.m3u8")
+async def playlist(start: datetime, end: datetime, channel: Optional[str] = None):
+    # VOD playlist over archived TS files for a time range: no ffmpeg involved
+    pl = playlists[channel_name(channel)]
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if end <= start:
+        raise HTTPException(400, "end start-dan sonra olmalıdır")
+    key = ("range", start.timestamp(), end.timestamp())
+    body = pl.get(key)
+    if body is None:
+        body = await asyncio.to_thread(pl.build, [(start.timestamp(), end.timestamp())])
+        if body is not None:
+            pl.put(key, body)
+    return m3u8(body)
+
+@app.get("/playlist/hits.m3u8")
+async def playlist_hits(
+    keyword: str = Query(..., min_length=1),
+    limit: Optional[int] = Query(None, ge=1),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    pad: float = Query(15.0, ge=0),
+    channel: Optional[str] = None
+):
+    # every search hit ±pad seconds, stitched with discontinuities (one channel per playlist)
+    channel = channel_name(channel)
+    pl = playlists[channel]
+    key = ("hits", keyword, limit, start, end, pad)
+    body = pl.get(key)
+    if body is None:
+        try:
+            segments = await find_segments(
+                adb, keyword, limit=limit or settings.search_max_rows,
+                start=start, end=end, channel=channel
+            )
+        except NotFound:
+            raise HTTPException(404, "Keyword tapılmadı")
+        ranges = [
+            (datetime.fromisoformat(s.start_time).timestamp() - pad,
+             datetime.fromisoformat(s.end_time).timestamp() + pad)
+            for s in segments
+        ]
+        body = await asyncio.to_thread(pl.build, ranges)
+        if body is not None:
+            pl.put(key, body)
+    return m3u8(body)
+
+async def live_events(channel: Optional[str]):
+    async with hub.subscribe(channel) as sub:
+        while True:
+            data = await sub.get(settings.live_keepalive_secs)
+            if data is None:
+                yield b"event: dropped\ndata: {}\n\n"
+                return
+            yield b"data: " + data + b"\n\n" if data else b": keepalive\n\n"
+
+@app.get("/live")
+async def live(channel: Optional[str] = None):
+    # new transcripts pushed as they are inserted (fed by Postgres NOTIFY);
+    # a client that falls live_client_buffer segments behind is dropped
+    return StreamingResponse(
+        live_events(channel),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/live/ws")
+async def live_ws(websocket: WebSocket, channel: Optional[str] = None):
+    await websocket.accept()
+    try:
+        async with hub.subscribe(channel) as sub:
+            while True:
+                data = await sub.get()
+                if data is None:
+                    await websocket.close(code=1013, reason="slow consumer")
+                    return
+                await websocket.send_text(data.decode())
+    except WebSocketDisconnect:
+        pass
+
+@app.get("/live/stats")
+def live_stats():
+    return hub.stats()
+
+Gauge("hls_live_subscribers", "Canlı (/live) abunəçilərin sayı").set_function(
+    lambda: hub.stats()["subscribers"]
+)
+profiler = SamplingProfiler(settings)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    # Prometheus text format: DB, DeepSeek and clip ffmpeg timings of this process
+    return Response(render(), media_type=CONTENT_TYPE)
+
+@app.get("/debug/profile", include_in_schema=False)
+async def debug_profile(seconds: float = Query(10.0, gt=0)):
+    # opt-in (profiler_enabled): hottest collapsed stacks of all threads
+    if not profiler.enabled:
+        raise HTTPException(404, "Profiler söndürülüb")
+    try:
+        text = await asyncio.to_thread(profiler.sample, seconds)
+    except RuntimeError as e:
+        raise HTTPException(409, str(e))
+    return Response(text, media_type="text/plain; charset=utf-8")
 
 if __name__ == "__main__":
     import uvicorn
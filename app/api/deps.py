@@ -2,6 +2,7 @@ from fastapi import Depends
 from app.config import Settings
 from app.services.db import DBClient
 from app.services.summarizer import DeepSeekClient
+from app.services.summary_cache import SummaryCache
 
 settings = Settings()
 _db = None
@@ -16,5 +17,5 @@ def get_db():
 def get_summarizer():
     global _summ
     if not _summ:
-        _summ = DeepSeekClient(settings)
+        _summ = DeepSeekClient(settings, cache=SummaryCache(settings, get_db()))
     return _summ
\ No newline at end of file
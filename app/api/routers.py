@@ -1,30 +1,228 @@
-from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import StreamingResponse
-import os, subprocess
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, ORJSONResponse, Response, StreamingResponse
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional
 from app.services.db import DBClient
-from app.services.summarizer import DeepSeekClient
+from app.services.async_db import AsyncDBClient
+from app.services.summarizer import AsyncDeepSeekClient
+from app.services.summary_cache import SummaryCache
+from app.services.clips import ClipService
+from app.services.archive_index import ArchiveIndex
+from app.services.playlists import PlaylistService
+from app.services.live import LiveHub
+from app.utils.metrics import CONTENT_TYPE, render
+from app.utils.profiler import SamplingProfiler
+from app.services.db import decode_cursor
+from app.services.search import NotFound, find_segments, ndjson_search, stream_search
 from app.api.schemas import SearchResponse
 from app.config import Settings
 
 router = APIRouter()
 s = Settings()
 db = DBClient(s)
-ds = DeepSeekClient(s)
+summary_cache = SummaryCache(s, db)
+adb = AsyncDBClient(s)
+clips = ClipService(s)
+channels = {cs.channel: cs for cs in s.channel_settings()}
+archive_indexes = {name: ArchiveIndex(cs) for name, cs in channels.items()}
+playlists = {name: PlaylistService(cs, archive_indexes[name]) for name, cs in channels.items()}
+ads = AsyncDeepSeekClient(s, cache=summary_cache)
+hub = LiveHub(s, adb)
 
 @router.get("/search/", response_model=SearchResponse)
-def search(keyword: str = Query(..., min_length=1)):
-    rows = db.search(keyword)
-    if not rows:
+async def search(
+    keyword: str = Query(..., min_length=1),
+    limit: Optional[int] = Query(None, ge=1),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    ranked: bool = False,
+    channel: Optional[str] = None
+):
+    try:
+        rows = await find_segments(adb, keyword, limit=limit or s.search_max_rows, start=start, end=end, ranked=ranked, channel=channel)
+    except NotFound:
         raise HTTPException(404, "Not found")
-    summary = ds.summarize(rows, keyword)
-    from app.api.schemas import SegmentInfo
-    segments = [ SegmentInfo(**dict(zip(["start_time","end_time","text","segment_filename","offset_secs","duration_secs"], r))) for r in rows ]
-    return SearchResponse(summary=summary, segments=segments)
+    summary = await ads.summarize(rows, keyword)
+    return SearchResponse(summary=summary, segments=rows)
+
+@router.get("/search/stream/")
+async def search_stream(
+    keyword: str = Query(..., min_length=1),
+    limit: Optional[int] = Query(None, ge=1),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    ranked: bool = False,
+    channel: Optional[str] = None
+):
+    try:
+        rows = await find_segments(adb, keyword, limit=limit or s.search_max_rows, start=start, end=end, ranked=ranked, channel=channel)
+    except NotFound:
+        raise HTTPException(404, "Not found")
+    return StreamingResponse(
+        stream_search(adb, ads, s, rows),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/search/segments/")
+async def search_segments(
+    keyword: str = Query(..., min_length=1),
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    channel: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(400, "Yanlış cursor")
+    filters = dict(cursor=cursor, start_time=start, end_time=end, channel=channel)
+    if format == "ndjson":
+        return StreamingResponse(ndjson_search(adb, keyword, limit=limit, **filters), media_type="application/x-ndjson")
+    rows, next_cursor = await adb.search_page(keyword, min(limit or s.search_page_size, s.search_page_max), **filters)
+    return ORJSONResponse({"segments": rows, "next_cursor": next_cursor})
+
+@router.on_event("startup")
+async def start_live():
+    hub.start()
+
+@router.on_event("shutdown")
+async def close_clients():
+    await hub.stop()
+    await ads.aclose()
+    await adb.close()
+
+@router.get("/summary_cache/stats")
+def summary_cache_stats():
+    return summary_cache.stats()
+
+def channel_name(channel: Optional[str]) -> str:
+    if channel is None:
+        return next(iter(channels))
+    if channel not in channels: raise HTTPException(404, "Kanal yoxdu")
+    return channel
+
+def serve_clip(files, start: float, duration: float):
+    key = clips.key(files, start, duration)
+    cached = clips.lookup(key)
+    if cached:
+        return FileResponse(cached, media_type="video/mp4")
+    return StreamingResponse(clips.remux(files, start, duration, key), media_type="video/mp4")
 
 @router.get("/video_clip/")
-def clip(video_file: str, start: float, duration: float):
-    path = os.path.join(s.archive_dir, video_file)
-    if not os.path.exists(path): raise HTTPException(404)
-    cmd = ["ffmpeg","-ss",str(start),"-i",path,"-t",str(duration),"-c","copy","-f","mp4","pipe:1"]
-    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
-    return StreamingResponse(proc.stdout, media_type="video/mp4")
\ No newline at end of file
+async def clip(video_file: str, start: float, duration: float, channel: Optional[str] = None):
+    cs = channels[channel_name(channel)]
+    resolved = clips.resolve(video_file, start, duration, cs.archive_dir)
+    if resolved is None: raise HTTPException(404, "Segment yoxdu")
+    files, start = resolved
+    return serve_clip(files, start, duration)
+
+@router.get("/clip_by_time/")
+async def clip_by_time(at: datetime, duration: float = Query(..., gt=0), channel: Optional[str] = None):
+    index = archive_indexes[channel_name(channel)]
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    resolved = await asyncio.to_thread(index.span, at.timestamp(), duration)
+    if resolved is None: raise HTTPException(404, "Bu vaxt üçün video yoxdu")
+    files, start = resolved
+    return serve_clip(files, start, duration)
+
+def m3u8(body: Optional[str]) -> Response:
+    if body is None: raise HTTPException(404, "Bu aralıqda video yoxdu")
+    return Response(body, media_type="application/vnd.apple.mpegurl",
+                    headers={"Cache-Control": f"max-age={int(s.playlist_cache_ttl)}"})
+
+@router.get("/playlist.m3u8")
+async def playlist(start: datetime, end: datetime, channel: Optional[str] = None):
+    pl = playlists[channel_name(channel)]
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if end <= start: raise HTTPException(400, "end start-dan sonra olmalıdır")
+    key = ("range", start.timestamp(), end.timestamp())
+    body = pl.get(key)
+    if body is None:
+        body = await asyncio.to_thread(pl.build, [(start.timestamp(), end.timestamp())])
+        if body is not None:
+            pl.put(key, body)
+    return m3u8(body)
+
+@router.get("/playlist/hits.m3u8")
+async def playlist_hits(
+    keyword: str = Query(..., min_length=1),
+    limit: Optional[int] = Query(None, ge=1),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    pad: float = Query(15.0, ge=0),
+    channel: Optional[str] = None
+):
+    channel = channel_name(channel)
+    pl = playlists[channel]
+    key = ("hits", keyword, limit, start, end, pad)
+    body = pl.get(key)
+    if body is None:
+        try:
+            rows = await find_segments(adb, keyword, limit=limit or s.search_max_rows, start=start, end=end, channel=channel)
+        except NotFound:
+            raise HTTPException(404, "Keyword tapılmadı")
+        ranges = [
+            (datetime.fromisoformat(r.start_time).timestamp() - pad,
+             datetime.fromisoformat(r.end_time).timestamp() + pad)
+            for r in rows
+        ]
+        body = await asyncio.to_thread(pl.build, ranges)
+        if body is not None:
+            pl.put(key, body)
+    return m3u8(body)
+
+async def live_events(channel: Optional[str]):
+    async with hub.subscribe(channel) as sub:
+        while True:
+            data = await sub.get(s.live_keepalive_secs)
+            if data is None:
+                yield b"event: dropped\ndata: {}\n\n"
+                return
+            yield b"data: " + data + b"\n\n" if data else b": keepalive\n\n"
+
+@router.get("/live")
+async def live(channel: Optional[str] = None):
+    return StreamingResponse(live_events(channel), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.websocket("/live/ws")
+async def live_ws(websocket: WebSocket, channel: Optional[str] = None):
+    await websocket.accept()
+    try:
+        async with hub.subscribe(channel) as sub:
+            while True:
+                data = await sub.get()
+                if data is None:
+                    await websocket.close(code=1013, reason="slow consumer")
+                    return
+                await websocket.send_text(data.decode())
+    except WebSocketDisconnect:
+        pass
+
+@router.get("/live/stats")
+def live_stats():
+    return hub.stats()
+
+profiler = SamplingProfiler(s)
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(render(), media_type=CONTENT_TYPE)
+
+@router.get("/debug/profile", include_in_schema=False)
+async def debug_profile(seconds: float = Query(10.0, gt=0)):
+    if not profiler.enabled: raise HTTPException(404, "Profiler söndürülüb")
+    try:
+        text = await asyncio.to_thread(profiler.sample, seconds)
+    except RuntimeError as e:
+        raise HTTPException(409, str(e))
+    return Response(text, media_type="text/plain; charset=utf-8")
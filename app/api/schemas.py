@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field
+from typing import List, Optional, Tuple
 
 class SegmentInfo(BaseModel):
     start_time: str
@@ -8,7 +8,20 @@ class SegmentInfo(BaseModel):
     segment_filename: str
     offset_secs: float
     duration_secs: float
+    channel: str = "default"
+    # search hits: where the matched word/phrase is spoken inside the TS file
+    match_offset_secs:   Optional[float] = None
+    match_duration_secs: Optional[float] = None
+    # ingest only: (start, end, word) relative to start_time, never serialized
+    words: Optional[List[Tuple[float, float, str]]] = Field(default=None, exclude=True)
+
+class BucketSummary(BaseModel):
+    channel:    str
+    start_time: str
+    end_time:   str
+    summary:    str
 
 class SearchResponse(BaseModel):
     summary: str
-    segments: List[SegmentInfo]
\ No newline at end of file
+    segments: List[SegmentInfo]
+    bucket_summaries: Optional[List[BucketSummary]] = None
\ No newline at end of file
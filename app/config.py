@@ -1,9 +1,19 @@
 # app/config.py
+import os
+from typing import Dict, List
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
-    # HLS stream URL
-    hls_url: str
+    # HLS stream URL (tək kanal rejimi; `channels` verilibsə istifadə olunmur)
+    hls_url: str = ""
+    # Çoxkanallı ingest: {"itv": "https://…/itv.m3u8", "aztv": "…"} (JSON). Hər kanalın
+    # öz ffmpeg prosesləri və archive_dir/<ad>, wav_dir/<ad> qovluqları olur, model isə ortaqdır
+    channels: Dict[str, str] = {}
+    # Cari kanalın adı (channel_settings() hər kanal üçün təyin edir)
+    channel: str = "default"
+    # Lokal fayl verilibsə onu real vaxt sürətində oxu (ffmpeg -re)
+    ingest_realtime: bool = False
     # Arxiv TS faylları harada saxlanır
     archive_dir: str = "archive"
     # WAV faylların çıxacağı qovluq
@@ -11,19 +21,121 @@ class Settings(BaseSettings):
     # HLS TS segment parametrləri
     ts_segment_time: int = 8
     ts_list_size: int = 10800
+    # Arxiv indeksi (wall-clock → TS seqment) index.m3u8-i ən çox bu intervalla yenidən oxuyur
+    archive_index_refresh_secs: float = 2.0
+    # /video_clip/ cache-i: qovluq, maksimum ölçü (MB), eyni anda ffmpeg sayı
+    clip_cache_dir:    str = "clip_cache"
+    clip_cache_max_mb: int = 2048
+    clip_max_ffmpeg:   int = 4
+    # Dinamik VOD playlist-lərin (mövcud TS-lərə istinad) cache-i: yaşama müddəti (saniyə), ölçü
+    playlist_cache_ttl:  float = 10.0
+    playlist_cache_size: int = 256
 
     # WAV segment parametrləri
     wav_segment_time: int = 8
     wav_overlap_time: int = 1
+    # "pipe" – ffmpeg PCM-i birbaşa yaddaşa verir, "file" – WAV faylları diskə yazılır
+    wav_ingest_mode: str = "pipe"
+    # PCM ring buffer-də neçə seqment saxlanılır
+    pcm_ring_slots: int = 8
+    # Seqment işlərinin jurnalı (SQLite WAL): restart-da bitməmiş işlər davam etdirilir;
+    # bitmiş işlər bu qədər saat saxlanılır
+    journal_path:        str = "journal.db"
+    journal_keep_hours:  int = 24
 
     # Whisper model üçün
     whisper_model: str = "large"
     device: str         # məsələn "cuda" və ya "cpu"
     compute_type: str   # məsələn "float16"
+    # CPU profili: device=cpu olanda model/compute_type/thread-lər kalibrasiya ilə seçilir.
+    # Modellər keyfiyyət sırası ilə; headroom – real vaxta nisbətən ehtiyat əmsalı.
+    # cpu_profile_clip – bir neçə saniyəlik real nitq WAV-ı; yoxdursa kalibrasiya edilmir
+    cpu_profile:               bool = False
+    cpu_profile_models:        List[str] = ["medium", "small", "base", "tiny"]
+    cpu_profile_compute_types: List[str] = ["int8"]
+    cpu_profile_headroom:      float = 1.5
+    cpu_profile_runs:          int = 2
+    cpu_profile_clip:          str = "calibration.wav"
+    cpu_profile_cache:         str = "cpu_profile.json"
+    # "chunk" – hər seqment ayrıca, "stream" – kontekstli ardıcıl dekod (StreamingDecoder)
+    transcribe_mode: str = "chunk"
+    # stream rejimi: qəti sayılmayan son saniyələr, maksimum quyruq, prompt uzunluğu
+    stream_holdback_secs: float = 1.0
+    stream_max_tail_secs: float = 5.0
+    stream_prompt_chars:  int = 200
+    # Nitq ön-keçidi: kadr uzunluğu, enerji həddi (dBFS), fon üzərində ehtiyat (dB),
+    # nitq üçün ZCR aralığı və seqmentin keçməsi üçün minimum nitq payı
+    gate_enabled:          bool = False
+    gate_frame_ms:         int = 30
+    gate_energy_db:        float = -45.0
+    gate_noise_margin_db:  float = 6.0
+    gate_zcr_min:          float = 0.01
+    gate_zcr_max:          float = 0.35
+    gate_min_speech_ratio: float = 0.15
+    gate_history:          int = 1000
+    gate_log_path:         str = ""
+    gate_report_secs:      float = 60.0
+    # Backlog scheduler: queue ölçüsü (pipe rejimində pcm_ring_slots-dan kiçik olmalıdır),
+    # greedy / fallback / skip pillələri üçün lag həddləri (saniyə), geri qalxma nisbəti
+    sched_enabled:               bool = False
+    sched_queue_size:            int = 6
+    sched_lag_thresholds:        List[float] = [30.0, 90.0, 180.0]
+    sched_restore_ratio:         float = 0.5
+    sched_fallback_model:        str = "small"
+    sched_fallback_compute_type: str = "int8"
+    sched_skip_speech_ratio:     float = 0.2
+    sched_report_secs:           float = 5.0
+    # Batched inference: bir çağırışda maksimum seqment sayı (1 – söndürülüb)
+    whisper_batch_size: int = 1
+    # Partiyanı doldurmaq üçün maksimum gözləmə (saniyə)
+    whisper_batch_max_wait: float = 0.5
+    # Ortaq modeli paralel istifadə edən transkripsiya worker-lərinin sayı
+    transcribe_workers: int = 1
+    # Söz səviyyəsində vaxtlar: transcript_words cədvəlinə yazılır, axtarış dəqiq offset qaytarır
+    word_timestamps: bool = False
 
     # DeepSeek API
     deepseek_api_url: str
     deepseek_key:     str
+    deepseek_model:   str = "deepseek-chat"
+    # HTTP timeout-ları (saniyə), retry sayı və backoff, keep-alive bağlantı limiti
+    deepseek_connect_timeout: float = 5.0
+    deepseek_timeout:         float = 60.0
+    deepseek_max_retries:     int = 2
+    deepseek_retry_backoff:   float = 0.5
+    http_max_connections:     int = 20
+
+    # Xülasə cache-i: yaddaşda maksimum element sayı və yaşama müddəti (saniyə)
+    summary_cache_size: int = 512
+    summary_cache_ttl:  int = 3600
+
+    # /search/ konteksti: hər tapıntının ətrafındakı pəncərə (saniyə), LLM-ə gedən
+    # kontekstin token büdcəsi və token təxmini üçün simvol/token nisbəti
+    context_pad_secs:        int = 180
+    context_token_budget:    int = 6000
+    context_chars_per_token: float = 4.0
+    # Axtarış nəticələri: /search/segments/ səhifəsinin default və maksimum ölçüsü;
+    # limit verilməyəndə xülasə və playlist üçün götürülən maksimum tapıntı sayı
+    search_page_size: int = 100
+    search_page_max:  int = 1000
+    search_max_rows:  int = 2000
+    # Canlı transkript (/live): ingest hər insert-dən sonra NOTIFY göndərir; hər izləyicinin
+    # buffer-i (seqment), SSE keepalive intervalı və LISTEN bağlantısının yenidən qoşulma gözləməsi
+    live_notify:         bool  = True
+    live_client_buffer:  int   = 256
+    live_keepalive_secs: float = 15.0
+    live_reconnect_secs: float = 2.0
+
+    # Map-reduce xülasə: bir parçanın token limiti, paralel map sorğuları və
+    # reduce mərhələsində bir sorğuda birləşdirilən qismən xülasə sayı
+    summary_chunk_tokens:    int = 3000
+    summary_map_concurrency: int = 4
+    summary_reduce_fanin:    int = 4
+
+    # Fon xülasələri: ingest tərəfi hər N dəqiqəlik bucket üçün xülasəni əvvəlcədən
+    # hazırlayıb `summaries` cədvəlinə yazır, /search/ onları istifadə edir
+    rolling_summary_enabled: bool = False
+    rolling_summary_minutes: int = 10
 
     # PostgreSQL bağlantısı
     db_host:     str
@@ -31,5 +143,42 @@ class Settings(BaseSettings):
     db_name:     str
     db_user:     str
     db_password: str
+    # Connection pool ölçüsü və boş qalmış bağlantıların yoxlanma intervalı (saniyə)
+    db_pool_min:        int = 1
+    db_pool_max:        int = 10
+    db_pool_check_secs: float = 30.0
+    # transcripts günlük partisiyalanır: neçə gün qabaqcadan yaradılır,
+    # saxlanma müddəti (0 – TS arxivi ilə eyni: ts_list_size × ts_segment_time),
+    # retention job-un intervalı (saniyə)
+    db_partition_days_ahead:   int = 2
+    transcript_retention_secs: int = 0
+    retention_interval_secs:   int = 3600
+
+    # Prometheus metrikləri: Service.py bu portda /metrics verir (0 – söndürülüb, opt-in;
+    # məs. 9464). API-də /metrics həmişə var
+    metrics_port: int = 0
+    # Sampling profiler (opt-in): /debug/profile?seconds=N və Service.py-da SIGUSR1
+    # (profiler_dir-ə yazır); nümunə intervalı (ms) və maksimum müddət (saniyə)
+    profiler_enabled:     bool  = False
+    profiler_interval_ms: float = 10.0
+    profiler_max_secs:    float = 60.0
+    profiler_dir:         str   = "profiles"
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
+
+    def channel_settings(self) -> List["Settings"]:
+        """
+        Hər kanal üçün öz hls_url və qovluqları olan Settings nüsxəsi.
+        `channels` boşdursa köhnə tək kanal rejimi: [self] ("default", qovluqlar dəyişmir).
+        """
+        if not self.channels:
+            return [self]
+        return [
+            self.model_copy(update={
+                "channel":     name,
+                "hls_url":     url,
+                "archive_dir": os.path.join(self.archive_dir, name),
+                "wav_dir":     os.path.join(self.wav_dir, name),
+            })
+            for name, url in self.channels.items()
+        ]
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+import os
+import re
+import time
+import bisect
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from app.api.schemas import SegmentInfo
+
+logger = logging.getLogger(__name__)
+
+# ffmpeg "+0000" yazır, fromisoformat (3.10-a qədər) "+00:00" gözləyir
+_TZ_RE = re.compile(r"([+-]\d{2})(\d{2})$")
+
+
+def _parse_pdt(value: str) -> float:
+    value = _TZ_RE.sub(r"\1:\2", value.strip().replace("Z", "+00:00"))
+    return datetime.fromisoformat(value).timestamp()
+
+
+class ArchiveIndex:
+    """
+    HLS arxivinin (archive/index.m3u8) yaddaşdakı wall-clock indeksi.
+
+    Playlist artımlı oxunur: yalnız sonuncu indekslənmiş seqmentdən sonrakı sətirlər parse
+    olunur, `delete_segments` ilə silinənlər önündən kəsilir. Seqmentin vaxtı
+    `EXT-X-PROGRAM-DATE-TIME`-dan, o yoxdursa əvvəlkinin sonundan, ən sonda isə TS faylının
+    mtime-ından götürülür. Sıralı massivlər üzərində bisect ilə O(log n) axtarış.
+    """
+
+    def __init__(self, settings):
+        self.archive_dir  = settings.archive_dir
+        self.playlist     = os.path.join(settings.archive_dir, "index.m3u8")
+        self.refresh_secs = settings.archive_index_refresh_secs
+
+        self._lock      = threading.Lock()
+        self._seqs:  List[int]   = []    # media sequence nömrələri
+        self._starts: List[float] = []   # epoch saniyə
+        self._durs:  List[float] = []
+        self._files: List[str]   = []
+        self._stamp     = None           # (mtime, size) – dəyişməyibsə oxumuruq
+        self._checked   = 0.0
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def _file_time(self, name: str, duration: float) -> Optional[float]:
+        try:
+            return os.path.getmtime(os.path.join(self.archive_dir, name)) - duration
+        except OSError:
+            return None
+
+    def _parse(self, lines: List[str], media_seq: int):
+        """Playlist sətirlərini massivlərin sonuna əlavə edir; birinci seqmentin nömrəsi media_seq."""
+        seq = media_seq
+        pdt: Optional[float] = None
+        duration = 0.0
+        for line in lines:
+            line = line.strip()
+            if line.startswith("#EXT-X-PROGRAM-DATE-TIME:"):
+                pdt = _parse_pdt(line.split(":", 1)[1])
+            elif line.startswith("#EXTINF:"):
+                duration = float(line[8:].split(",", 1)[0])
+            elif line and not line.startswith("#"):
+                start = pdt
+                if start is None and self._starts:
+                    start = self._starts[-1] + self._durs[-1]
+                if start is None:
+                    start = self._file_time(line, duration)
+                if start is not None:
+                    self._seqs.append(seq)
+                    self._starts.append(start)
+                    self._durs.append(duration)
+                    self._files.append(os.path.basename(line))
+                seq += 1
+                pdt = None
+
+    def refresh(self, force: bool = False):
+        """Playlist dəyişibsə yeni seqmentləri indeksə əlavə edir, silinənləri çıxarır."""
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._checked < self.refresh_secs:
+                return
+            self._checked = now
+            try:
+                st = os.stat(self.playlist)
+            except OSError:
+                return
+            if (st.st_mtime, st.st_size) == self._stamp:
+                return
+            self._stamp = (st.st_mtime, st.st_size)
+            with open(self.playlist) as f:
+                text = f.read()
+
+            media_seq = 0
+            head = text.find("#EXT-X-MEDIA-SEQUENCE:")
+            if head >= 0:
+                media_seq = int(text[head + 22:text.index("\n", head)].strip())
+
+            # Silinmiş seqmentləri önündən kəsirik; ardıcıllıq qırılıbsa (restart) sıfırdan
+            if self._seqs and (media_seq > self._seqs[-1] + 1 or media_seq < self._seqs[0]):
+                self._seqs, self._starts, self._durs, self._files = [], [], [], []
+            cut = bisect.bisect_left(self._seqs, media_seq)
+            if cut:
+                del self._seqs[:cut], self._starts[:cut], self._durs[:cut], self._files[:cut]
+
+            if self._files:
+                # Sonuncu indekslənmiş seqmentdən sonrakı hissəni parse edirik
+                pos = text.rfind("\n" + self._files[-1])
+                if pos >= 0:
+                    before = text.count("\n#EXTINF:", 0, pos)
+                    self._parse(text[pos + 1:].splitlines()[1:], media_seq + before)
+                    return
+                self._seqs, self._starts, self._durs, self._files = [], [], [], []
+            self._parse(text.splitlines(), media_seq)
+            logger.info("Arxiv indeksi quruldu: %d seqment", len(self._files))
+
+    def last_seq(self) -> Optional[int]:
+        """İndeksdəki sonuncu seqmentin nömrəsi (boşdursa None)."""
+        with self._lock:
+            return self._seqs[-1] if self._seqs else None
+
+    def start_of(self, seq: int) -> Optional[float]:
+        """Verilmiş nömrəli seqmentin başlanğıcı (epoch); hələ yazılmayıbsa və ya silinibsə None."""
+        self.refresh()
+        with self._lock:
+            i = bisect.bisect_left(self._seqs, seq)
+            if i < len(self._seqs) and self._seqs[i] == seq:
+                return self._starts[i]
+            return None
+
+    def locate(self, ts: float) -> Optional[Tuple[int, str, float]]:
+        """Wall-clock vaxtı (epoch) → (seqment nömrəsi, TS fayl adı, offset). Boşluqdadırsa None."""
+        self.refresh()
+        with self._lock:
+            i = bisect.bisect_right(self._starts, ts) - 1
+            if i < 0 or ts >= self._starts[i] + self._durs[i]:
+                return None
+            return self._seqs[i], self._files[i], ts - self._starts[i]
+
+    def lookup(self, ts: float) -> Optional[Tuple[str, float]]:
+        """Wall-clock vaxtı (epoch) → (TS fayl adı, fayl daxilində offset). Boşluqdadırsa None."""
+        hit = self.locate(ts)
+        return hit[1:] if hit else None
+
+    def span(self, ts: float, duration: float) -> Optional[Tuple[List[str], float]]:
+        """
+        [ts, ts + duration] aralığını əhatə edən TS fayllarının yolları və birinci
+        fayl daxilində başlanğıc (ClipService.resolve ilə eyni forma).
+        """
+        self.refresh()
+        with self._lock:
+            i = bisect.bisect_right(self._starts, ts) - 1
+            if i < 0 or ts >= self._starts[i] + self._durs[i]:
+                return None
+            start = ts - self._starts[i]
+            files = [os.path.join(self.archive_dir, self._files[i])]
+            j = i + 1
+            while j < len(self._starts) and self._starts[j] < ts + duration:
+                files.append(os.path.join(self.archive_dir, self._files[j]))
+                j += 1
+            return files, start
+
+    def between(self, start_ts: float, end_ts: float) -> List[Tuple[int, str, float, float]]:
+        """[start_ts, end_ts] aralığına düşən seqmentlər: (seq, fayl adı, başlanğıc, müddət)."""
+        self.refresh()
+        with self._lock:
+            i = max(bisect.bisect_right(self._starts, start_ts) - 1, 0)
+            j = bisect.bisect_left(self._starts, end_ts)
+            return [
+                (self._seqs[k], self._files[k], self._starts[k], self._durs[k])
+                for k in range(i, j)
+                if self._starts[k] + self._durs[k] > start_ts
+            ]
+
+    def remap(
+        self,
+        segments: List[SegmentInfo],
+        fallback: Optional[Callable[[float], Optional[Tuple[str, float]]]] = None
+    ) -> List[SegmentInfo]:
+        """
+        Transkript seqmentlərinin TS faylını və offset-ini başlanğıc vaxtına görə təyin edir.
+        İndeksdə hələ olmayanlar (TS seqmenti yazılmayıb) üçün `fallback(ts)` çağırılır
+        (məs. Archiver.ts_position); o da None qaytarsa seqment olduğu kimi qalır.
+        """
+        out = []
+        for seg in segments:
+            ts = datetime.fromisoformat(seg.start_time).timestamp()
+            hit = self.lookup(ts) or (fallback(ts) if fallback else None)
+            if hit:
+                seg = seg.model_copy(update={"segment_filename": hit[0], "offset_secs": hit[1]})
+            out.append(seg)
+        return out
@@ -6,14 +6,36 @@ import threading
 import subprocess
 import datetime
 import logging
+from typing import NamedTuple, Optional, Tuple, Union
+
+import numpy as np
 
 from app.config import Settings
+from app.services.archive_index import ArchiveIndex
+from app.utils.metrics import CAPTURE_WAIT_SECONDS
 
 logger = logging.getLogger(__name__)
 
+SAMPLE_RATE = 16000
+_PCM_SCALE  = np.float32(1.0 / 32768.0)
+
+
+class AudioSegment(NamedTuple):
+    """Queue-dakı bir audio parçası."""
+    source:   Union[str, np.ndarray]  # WAV yolu ("file") və ya ring buffer view-u ("pipe")
+    start_ts: float                   # epoch saniyə
+    index:    int                     # ardıcıl seqment nömrəsi
+    slot:     Optional[int] = None    # ring buffer slotu (yalnız "pipe")
+    channel:  str = "default"          # hansı kanaldan gəlib
+    pts:      Optional[float] = None   # ingest başlanğıcından audio zamanı (saniyə)
+    ts_index: Optional[int] = None     # başlanğıcın düşdüyü TS seqmentinin nömrəsi (məlumdursa)
+    job:      Optional[int] = None     # SegmentJournal-dakı iş id-si
+
+
 class Archiver:
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, journal=None):
         # HLS → TS archiving
+        self.channel         = settings.channel
         self.hls_url         = settings.hls_url
         self.archive_dir     = settings.archive_dir
         self.ts_seg_time     = settings.ts_segment_time
@@ -24,47 +46,192 @@ class Archiver:
         self.wav_seg_time     = settings.wav_segment_time
         self.wav_overlap      = settings.wav_overlap_time
 
+        # Lokal faylı canlı yayım sürətində oxumaq üçün (replay/benchmark)
+        self.input_opts       = ["-re"] if settings.ingest_realtime else []
+
+        # "pipe" – PCM birbaşa ffmpeg stdout-dan, "file" – köhnə WAV rejimi
+        self.ingest_mode      = settings.wav_ingest_mode
+        self.ring_slots       = settings.pcm_ring_slots
+
+        # TS arxivinin indeksi: audio PTS-i TS seqmentlərinin PROGRAM-DATE-TIME-ı ilə bağlanır
+        self.index            = ArchiveIndex(settings)
+        self.first_seq        = 0       # bu ingest-in ilk TS seqmentinin nömrəsi
+        self._epoch0: Optional[float] = None
+        self._combined        = False   # TS və audio eyni ffmpeg prosesindən gəlir
+
+        # Seqment jurnalı: nömrələr restart-dan sonra davam edir, hər seqment qeydə alınır
+        self.journal          = journal
+        self.start_index      = journal.next_index(self.channel) if journal else 0
+
         # daxili queue & stop-flag
         self.wav_queue        = queue.Queue()
         self._shutdown        = threading.Event()
 
-    def start_ts(self):
-        """HLS-dən .ts və index.m3u8 yaradır."""
+    def _ts_output(self) -> list:
+        """HLS arxiv çıxışının ffmpeg arqumentləri."""
         os.makedirs(self.archive_dir, exist_ok=True)
-        logger.info("TS archiver işə düşdü, m3u8 yazılır → %s", self.archive_dir)
-        cmd = [
-            "ffmpeg", "-y", "-i", self.hls_url,
+        # append_list köhnə playlist-in davamını yazır; nömrəni özümüz də bilməliyik ki,
+        # audio PTS 0 hansı TS seqmentinə düşür
+        self.index.refresh(force=True)
+        self.first_seq = self.index.last_seq() + 1 if len(self.index) else 0
+        return [
             "-c", "copy", "-f", "hls",
             "-hls_time", str(self.ts_seg_time),
             "-hls_list_size", str(self.ts_list_size),
-            "-hls_flags", "delete_segments+append_list",
+            "-hls_flags", "delete_segments+append_list+program_date_time",
+            "-start_number", str(self.first_seq),
             "-hls_segment_filename", os.path.join(self.archive_dir, "segment_%05d.ts"),
             os.path.join(self.archive_dir, "index.m3u8")
         ]
-        self.ts_proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
-    def start_wav(self):
-        """HLS-dən .wav seqmentləri yaradır və watch thread-i işə salır."""
+    def _audio_output(self) -> list:
+        """Audio çıxışı: "pipe" – s16le stdout-a, "file" – WAV seqmentləri."""
+        if self.ingest_mode == "pipe":
+            return ["-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "pipe:1"]
         os.makedirs(self.wav_dir, exist_ok=True)
-        logger.info("WAV segmenter işə düşdü, fayllar → %s", self.wav_dir)
-        cmd = [
-            "ffmpeg", "-y", "-i", self.hls_url,
-            "-vn", "-ac", "1", "-ar", "16000",
+        return [
+            "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE),
             "-f", "segment",
             "-segment_time", str(self.wav_seg_time),
             "-segment_time_delta", str(self.wav_overlap),
+            "-segment_start_number", str(self.start_index),
             "-reset_timestamps", "1",
             os.path.join(self.wav_dir, "segment_%03d.wav")
         ]
-        self.wav_proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        threading.Thread(target=self._watch_wavs, daemon=True).start()
+
+    def _start_audio_reader(self):
+        if self.ingest_mode == "pipe":
+            self._init_ring()
+            threading.Thread(target=self._read_pcm, daemon=True).start()
+        else:
+            threading.Thread(target=self._watch_wavs, daemon=True).start()
+
+    def start(self):
+        """
+        Tək ffmpeg prosesi: HLS bir dəfə yüklənir və demux olunur, TS arxivi və audio
+        eyni girişdən yazılır. Audio seqmentlərinin vaxtı PTS-dən hesablanır, ona görə
+        TS seqmentinə uyğunluq dəqiqdir (iki prosesin bir-birindən sürüşməsi yoxdur).
+        """
+        self._combined = True
+        cmd = [
+            "ffmpeg", "-y", "-nostdin", *self.input_opts, "-i", self.hls_url,
+            *self._ts_output(),
+            *self._audio_output()
+        ]
+        logger.info("[%s] Ingest işə düşdü (TS → %s, audio → %s), ilk TS seqmenti #%d",
+                    self.channel, self.archive_dir, self.ingest_mode, self.first_seq)
+        self.wav_proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE if self.ingest_mode == "pipe" else subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            bufsize=0
+        )
+        self._start_audio_reader()
+
+    def start_ts(self):
+        """Yalnız HLS-dən .ts və index.m3u8 yaradır (ayrıca proses)."""
+        logger.info("[%s] TS archiver işə düşdü, m3u8 yazılır → %s", self.channel, self.archive_dir)
+        cmd = ["ffmpeg", "-y", *self.input_opts, "-i", self.hls_url, *self._ts_output()]
+        self.ts_proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def start_wav(self):
+        """Yalnız audio (ayrıca proses, məs. benchmark): PCM pipe və ya WAV seqmentləri."""
+        logger.info("Audio ingest işə düşdü (%s)", self.ingest_mode)
+        cmd = ["ffmpeg", "-y", "-nostdin", *self.input_opts, "-i", self.hls_url, *self._audio_output()]
+        self.wav_proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE if self.ingest_mode == "pipe" else subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            bufsize=0
+        )
+        self._start_audio_reader()
+
+    def _clock(self, pts: float, secs: float) -> float:
+        """
+        Audio parçasının başlanğıc vaxtı (epoch). Tək prosesdə PTS bu ingest-in ilk TS
+        seqmentinin PROGRAM-DATE-TIME-ına əlavə olunur – arxiv indeksi ilə eyni saat.
+        Həmin seqment hələ yazılmayıbsa (və ya ayrıca prosesdə) köhnə qayda: indi − müddət.
+        """
+        if self._combined and self._epoch0 is None:
+            self._epoch0 = self.index.start_of(self.first_seq)
+        if self._epoch0 is not None:
+            return self._epoch0 + pts
+        return datetime.datetime.now(datetime.timezone.utc).timestamp() - secs
+
+    def _emit(self, seg: AudioSegment, duration: float):
+        """Seqmenti jurnala yazır və queue-ya qoyur."""
+        if self.journal is not None:
+            job = self.journal.captured(
+                self.channel, seg.index, seg.source if isinstance(seg.source, str) else None,
+                seg.start_ts, duration
+            )
+            seg = seg._replace(job=job)
+        self.wav_queue.put(seg)
+
+    def recover(self, job) -> Optional[AudioSegment]:
+        """
+        Restart-dan əvvəl bitməmiş iş üçün audio: WAV faylı qalıbsa o, yoxdursa həmin
+        vaxt aralığı TS arxivindən yenidən dekod olunur. Heç biri yoxdursa None.
+        """
+        if job.source and os.path.exists(job.source):
+            return AudioSegment(job.source, job.start_ts, job.idx, channel=self.channel, job=job.id)
+        span = self.index.span(job.start_ts, job.duration)
+        if span is None:
+            return None
+        files, start = span
+        source = files[0] if len(files) == 1 else "concat:" + "|".join(files)
+        cmd = [
+            "ffmpeg", "-nostdin", "-loglevel", "error",
+            "-ss", str(start), "-i", source, "-t", str(job.duration),
+            "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "pipe:1"
+        ]
+        try:
+            raw = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                 check=True).stdout
+        except (OSError, subprocess.CalledProcessError) as e:
+            logger.warning("[%s] Seqment #%d arxivdən bərpa olunmadı: %s", self.channel, job.idx, e)
+            return None
+        audio = np.frombuffer(raw, dtype=np.int16).astype(np.float32) * _PCM_SCALE
+        if not len(audio):
+            return None
+        return AudioSegment(audio, job.start_ts, job.idx, channel=self.channel, job=job.id)
+
+    def _ts_index(self, ts: float) -> Optional[int]:
+        # Yalnız PTS saatı ilə (ts = epoch0 + pts) – wall-clock təxmini başqa TS-ə düşə bilər
+        if not self._combined or self._epoch0 is None:
+            return None
+        hit = self.index.locate(ts)
+        return hit[0] if hit else None
+
+    def ts_position(self, seg: AudioSegment, ts: float) -> Optional[Tuple[str, float]]:
+        """
+        İndeksdə hələ olmayan vaxt üçün (playlist 2s-dən bir oxunur, parçanın sonu çox vaxt
+        hələ orada yoxdur) TS faylı və offset: lövbər seqmentin öz TS-i (ts_index), o
+        yoxdursa bu ingest-in ilk TS-i; qalanı PTS fərqi və hls_time ilə hesablanır.
+        Audio ayrıca prosesdən gəlibsə (PTS TS-lə bağlı deyil) None.
+        """
+        if not self._combined or seg.pts is None:
+            return None
+        pts = seg.pts + (ts - seg.start_ts)
+        seq, base = self.first_seq, 0.0
+        if seg.ts_index is not None:
+            start = self.index.start_of(seg.ts_index)
+            if start is not None and self._epoch0 is not None:
+                seq, base = seg.ts_index, start - self._epoch0
+        k = int((pts - base) // self.ts_seg_time)
+        return f"segment_{seq + k:05d}.ts", pts - base - k * self.ts_seg_time
 
     def _watch_wavs(self):
         """Yazılmış wav fayllarını gözləyir, tamalananda queue-ya atır."""
-        idx = 0
+        idx = self.start_index
+        waited = time.perf_counter()
         while not self._shutdown.is_set():
             path = os.path.join(self.wav_dir, f"segment_{idx:03d}.wav")
             if not os.path.exists(path):
+                # ffmpeg bitibsə (məs. lokal fayl sonuna çatdı) yeni seqment gəlməyəcək
+                if self.wav_proc.poll() is not None and not os.path.exists(path):
+                    logger.info("WAV segmenter dayandı")
+                    break
                 time.sleep(0.1)
                 continue
 
@@ -79,18 +246,119 @@ class Archiver:
                 prev_size = size
                 time.sleep(0.05)
 
-            # Başlanğıc zamanını epoch şəklində hesablayırıq
-            end_dt   = datetime.datetime.now(datetime.timezone.utc)
-            start_dt = end_dt - datetime.timedelta(seconds=self.wav_seg_time)
-            self.wav_queue.put((path, start_dt.timestamp()))
+            CAPTURE_WAIT_SECONDS.labels(channel=self.channel, mode="file").observe(time.perf_counter() - waited)
+
+            # Başlanğıc zamanını epoch şəklində hesablayırıq (seqmentlər sabit uzunluqdadır)
+            pts = float((idx - self.start_index) * self.wav_seg_time)
+            start_ts = self._clock(pts, self.wav_seg_time)
+            self._emit(AudioSegment(
+                path, start_ts, idx, channel=self.channel, pts=pts, ts_index=self._ts_index(start_ts)
+            ), self.wav_seg_time)
             logger.info("WAV hazırlandı və queue-yə göndərildi: %s", path)
 
             idx += 1
+            waited = time.perf_counter()
+
+        self.wav_queue.put(None)
 
-    def wav_generator(self):
-        """Daemon thread-lər üçün iterator: (wav_path, start_ts)."""
+    def _init_ring(self):
+        """PCM rejimi: s16le 16 kHz mono ffmpeg stdout-dan, diskə heç nə yazılmır."""
+        seg_samples = SAMPLE_RATE * self.wav_seg_time
+        # Əvvəlcədən ayrılmış ring buffer: int16 xam baytlar + Whisper üçün float32
+        self._ring_raw   = np.zeros((self.ring_slots, seg_samples), dtype=np.int16)
+        self._ring       = np.zeros((self.ring_slots, seg_samples), dtype=np.float32)
+        self._scratch    = np.zeros(seg_samples, dtype=np.int16)
+        # Boş slotların nömrələri: worker-lər seqmentləri istənilən sırada qaytara bilər
+        # (paralel worker-lər, gate/scheduler drop-u), ona görə slot sayğacla yox, id ilə alınır
+        self._free_slots = queue.Queue()
+        for slot in range(self.ring_slots):
+            self._free_slots.put(slot)
+        logger.info("PCM ring buffer: %d slot × %ds", self.ring_slots, self.wav_seg_time)
+
+    def _read_pcm(self):
+        """ffmpeg stdout-unu slot-slot ring buffer-ə oxuyur və view-ları queue-ya atır."""
+        stream = self.wav_proc.stdout
+        idx = self.start_index
+        samples = 0     # indiyədək oxunmuş sample-lar → növbəti parçanın PTS-i
+        while not self._shutdown.is_set():
+            # Consumer slotu done() ilə qaytarana qədər onun üzərinə yazmırıq. Tək prosesdə
+            # pipe-ı saxlamaq TS arxivini də dayandırardı, ona görə bu parça atılır.
+            try:
+                slot = self._free_slots.get(timeout=0.5)
+            except queue.Empty:
+                if not self._combined:
+                    continue
+                raw = memoryview(self._scratch).cast("B")
+                filled = 0
+                while filled < len(raw):
+                    n = stream.readinto(raw[filled:])
+                    if not n:
+                        break
+                    filled += n
+                samples += filled // 2
+                logger.warning("[%s] Ring buffer dolub, %.1fs audio atıldı", self.channel, filled / 2 / SAMPLE_RATE)
+                if filled < len(raw):
+                    break
+                continue
+
+            raw = memoryview(self._ring_raw[slot]).cast("B")
+            waited = time.perf_counter()
+            filled = 0
+            while filled < len(raw):
+                n = stream.readinto(raw[filled:])
+                if not n:
+                    break
+                filled += n
+
+            CAPTURE_WAIT_SECONDS.labels(channel=self.channel, mode="pipe").observe(time.perf_counter() - waited)
+            n_samples = filled // 2
+            if n_samples == 0:
+                self._free_slots.put(slot)
+                break
+
+            audio = self._ring[slot, :n_samples]
+            np.multiply(self._ring_raw[slot, :n_samples], _PCM_SCALE,
+                        out=audio, dtype=np.float32)
+
+            pts = samples / SAMPLE_RATE
+            start_ts = self._clock(pts, n_samples / SAMPLE_RATE)
+            ts_index = self._ts_index(start_ts)
+            self._emit(AudioSegment(audio, start_ts, idx, slot, self.channel, pts, ts_index),
+                       n_samples / SAMPLE_RATE)
+            logger.debug("PCM seqment %d hazırdır (slot %d, pts %.2f, TS #%s)", idx, slot, pts, ts_index)
+
+            idx += 1
+            samples += n_samples
+            if filled < len(raw):
+                break
+
+        logger.info("PCM stream bitdi")
+        self.wav_queue.put(None)
+
+    def audio_generator(self):
+        """
+        Lazy iterator: AudioSegment-lər. "pipe" rejimində `source` ring buffer-in
+        zero-copy view-udur, ona görə hər seqment işləndikdən sonra done() çağırılmalıdır.
+        Stream bitəndə iterator dayanır.
+        """
         while True:
-            yield self.wav_queue.get()
+            seg = self.wav_queue.get()
+            if seg is None:
+                return
+            yield seg
+
+    def done(self, seg: AudioSegment):
+        """İşlənmiş seqmenti azad edir: ring slotunu qaytarır və ya WAV faylını silir."""
+        if seg.slot is not None:
+            self._free_slots.put(seg.slot)
+            return
+        if not isinstance(seg.source, str):
+            return      # arxivdən bərpa olunmuş PCM
+        try:
+            os.remove(seg.source)
+            logger.info("WAV silindi: %s", seg.source)
+        except OSError as e:
+            logger.warning("WAV silinərkən xəta: %s", e)
 
     def stop(self):
         """Həm ts, həm wav process-lərini dayandırır."""
@@ -0,0 +1,236 @@
+# app/services/async_db.py
+
+import asyncio
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+
+import asyncpg
+
+from app.api.schemas import BucketSummary, SegmentInfo
+from app.services.db import decode_cursor, encode_cursor, hit_info, hit_row, like_pattern
+from app.utils.metrics import DB_SECONDS
+
+
+class AsyncDBClient:
+    """
+    asyncpg-backed read path for the API. Shares the schema created by
+    DBClient.init_db; writes still go through the sync DBClient.
+    """
+
+    def __init__(self, settings):
+        self._conf = settings
+        self._pool: Optional[asyncpg.Pool] = None
+        self._pool_lock = asyncio.Lock()
+
+    async def pool(self) -> asyncpg.Pool:
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    self._pool = await asyncpg.create_pool(
+                        host=self._conf.db_host,
+                        port=self._conf.db_port,
+                        database=self._conf.db_name,
+                        user=self._conf.db_user,
+                        password=self._conf.db_password,
+                        min_size=self._conf.db_pool_min,
+                        max_size=self._conf.db_pool_max,
+                        max_inactive_connection_lifetime=self._conf.db_pool_check_secs * 10
+                    )
+        return self._pool
+
+    async def connect(self) -> asyncpg.Connection:
+        """A dedicated connection outside the pool, e.g. for LISTEN."""
+        return await asyncpg.connect(
+            host=self._conf.db_host,
+            port=self._conf.db_port,
+            database=self._conf.db_name,
+            user=self._conf.db_user,
+            password=self._conf.db_password
+        )
+
+    async def _fetch(self, op: str, sql: str, *args) -> list:
+        pool = await self.pool()
+        with DB_SECONDS.labels(op=op, client="async").time():
+            return await pool.fetch(sql, *args)
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    @staticmethod
+    def _search_query(
+        keyword: str,
+        limit: Optional[int] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        ranked: bool = False,
+        channel: Optional[str] = None,
+        cursor: Optional[str] = None
+    ) -> Tuple[str, list]:
+        """
+        SQL and arguments for a keyword search. Rows are (start_time, end_time,
+        text, segment_filename, offset_secs, duration_secs, times, words,
+        channel, id). `cursor` resumes after the last row of a previous
+        page (keyset on start_time, id); it is not combined with `ranked`.
+        """
+        args = [like_pattern(keyword)]
+        where = ["t.text ILIKE $1"]
+        if channel:
+            args.append(channel)
+            where.append(f"t.channel = ${len(args)}")
+        if start_time:
+            args.append(start_time)
+            where.append(f"t.start_time >= ${len(args)}")
+        if end_time:
+            args.append(end_time)
+            where.append(f"t.start_time <= ${len(args)} AND t.end_time <= ${len(args)}")
+        if cursor:
+            after, after_id = decode_cursor(cursor)
+            args += [after, after_id]
+            where.append(f"(t.start_time, t.id) > (${len(args) - 1}, ${len(args)})")
+        order = "t.start_time, t.id"
+        if ranked:
+            args.append(keyword)
+            order = f"strict_word_similarity(${len(args)}, t.text) DESC, t.start_time DESC"
+        sql = f"""
+            SELECT t.start_time, t.end_time, t.text,
+                   t.segment_filename, t.offset_secs, t.duration_secs,
+                   w.times, w.words, t.channel, t.id
+              FROM transcripts t
+              LEFT JOIN transcript_words w
+                ON w.transcript_id = t.id AND w.start_time = t.start_time
+             WHERE {" AND ".join(where)}
+             ORDER BY {order}
+        """
+        if limit:
+            args.append(limit)
+            sql += f" LIMIT ${len(args)}"
+        return sql, args
+
+    async def search(
+        self,
+        keyword: str,
+        limit: Optional[int] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        ranked: bool = False,
+        channel: Optional[str] = None
+    ) -> List[SegmentInfo]:
+        """
+        Same contract as DBClient.search.
+        """
+        sql, args = self._search_query(keyword, limit, start_time, end_time, ranked, channel)
+        rows = await self._fetch("search", sql, *args)
+        return [hit_info(keyword, r) for r in rows]
+
+    async def search_page(
+        self,
+        keyword: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        channel: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        One page of hits in (start_time, id) order, as plain dicts, and the
+        cursor of the next page (None on the last page). Raises ValueError
+        for a malformed cursor.
+        """
+        sql, args = self._search_query(
+            keyword, limit + 1, start_time, end_time, channel=channel, cursor=cursor
+        )
+        rows = await self._fetch("search_page", sql, *args)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][0], rows[-1][9])
+        return [hit_row(keyword, r) for r in rows], next_cursor
+
+    async def iter_search(
+        self,
+        keyword: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        channel: Optional[str] = None,
+        prefetch: int = 500
+    ) -> AsyncIterator[Tuple[dict, str]]:
+        """
+        Stream hits off a server-side cursor, `prefetch` rows per round trip,
+        yielding (hit, cursor after this hit). Memory stays flat however many
+        rows match; closing the generator releases the connection.
+        """
+        sql, args = self._search_query(
+            keyword, limit, start_time, end_time, channel=channel, cursor=cursor
+        )
+        pool = await self.pool()
+        async with pool.acquire() as conn, conn.transaction():
+            async for r in conn.cursor(sql, *args, prefetch=prefetch):
+                yield hit_row(keyword, r), encode_cursor(r[0], r[9])
+
+    async def fetch_text(self, start_time: datetime, end_time: datetime) -> str:
+        """
+        Return all 'text' in the given time window.
+        """
+        rows = await self._fetch("fetch_text", """
+            SELECT text
+              FROM transcripts
+             WHERE start_time >= $1
+               AND start_time <= $2
+               AND end_time   <= $2
+             ORDER BY start_time
+        """, start_time, end_time)
+        return " ".join(r[0] for r in rows)
+
+    async def fetch_windows(
+        self, windows: Sequence[Tuple[datetime, datetime, str]]
+    ) -> List[List[Tuple[datetime, str]]]:
+        """
+        Fetch (start_time, text) rows for several (start, end, channel)
+        windows in one round trip. Returns one chronologically ordered
+        list per input window.
+        """
+        if not windows:
+            return []
+        rows = await self._fetch("fetch_windows", """
+            SELECT w.idx, t.start_time, t.text
+              FROM unnest($1::timestamptz[], $2::timestamptz[], $3::text[])
+                   WITH ORDINALITY AS w(ws, we, ch, idx)
+              JOIN transcripts t
+                ON t.start_time >= w.ws
+               AND t.start_time <= w.we
+               AND t.end_time   <= w.we
+               AND t.channel    =  w.ch
+             ORDER BY w.idx, t.start_time
+        """, [w[0] for w in windows], [w[1] for w in windows], [w[2] for w in windows])
+        out: List[List[Tuple[datetime, str]]] = [[] for _ in windows]
+        for r in rows:
+            out[r[0] - 1].append((r[1], r[2]))
+        return out
+
+    async def fetch_bucket_summaries(
+        self, start_time: datetime, end_time: datetime
+    ) -> List[BucketSummary]:
+        """
+        Return precomputed rolling summaries of buckets overlapping
+        [start_time, end_time], ordered by bucket_start.
+        """
+        rows = await self._fetch("bucket_summaries", """
+            SELECT channel, bucket_start, bucket_end, summary
+              FROM summaries
+             WHERE bucket_end   >  $1
+               AND bucket_start <= $2
+             ORDER BY bucket_start, channel
+        """, start_time, end_time)
+        return [
+            BucketSummary(
+                channel    = r[0],
+                start_time = r[1].isoformat(),
+                end_time   = r[2].isoformat(),
+                summary    = r[3]
+            )
+            for r in rows
+        ]
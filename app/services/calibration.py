@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import logging
+import platform
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from faster_whisper import WhisperModel, decode_audio
+from app.services.archiver import SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+
+def _thread_layouts(cpus: int) -> List[Tuple[int, int]]:
+    """(cpu_threads, num_workers) namizədləri: nüvələri workerlər arasında bölürük."""
+    layouts = []
+    for workers in (1, 2, 4):
+        threads = cpus // workers
+        if threads >= 1 and (threads, workers) not in layouts:
+            layouts.append((threads, workers))
+    return layouts
+
+
+def _load_clip(settings) -> Optional[np.ndarray]:
+    """
+    Kalibrasiya klipi (real nitq) wav_segment_time uzunluğuna gətirilir. Klip yoxdursa
+    None: sintetik siqnalda decoder real nitqdəki qədər işləmir və RTF mənasız çıxır.
+    """
+    n = SAMPLE_RATE * settings.wav_segment_time
+    path = settings.cpu_profile_clip
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    audio = decode_audio(path, sampling_rate=SAMPLE_RATE)
+    if not len(audio):
+        return None
+    if len(audio) < n:
+        audio = np.tile(audio, n // max(len(audio), 1) + 1)
+    return np.ascontiguousarray(audio[:n])
+
+
+def _fingerprint(settings) -> dict:
+    clip = settings.cpu_profile_clip
+    return {
+        "cpus":          os.cpu_count(),
+        "machine":       platform.machine(),
+        "processor":     platform.processor(),
+        "models":        list(settings.cpu_profile_models),
+        "compute_types": list(settings.cpu_profile_compute_types),
+        "segment_time":  settings.wav_segment_time,
+        "headroom":      settings.cpu_profile_headroom,
+        "clip":          [clip, os.path.getsize(clip) if os.path.exists(clip) else None],
+        "vad":           False,
+    }
+
+
+def _measure(model: WhisperModel, audio: np.ndarray, workers: int, runs: int) -> float:
+    """
+    `workers` paralel transkripsiyanın RTF-i (decode vaxtı / audio vaxtı). VAD söndürülür:
+    əks halda klipin sakit hissələri atılır və RTF optimist çıxır (canlıda hər şey dekod olunur).
+    """
+    def decode():
+        segments, _ = model.transcribe(audio, language="az", beam_size=4, best_of=4, vad_filter=False)
+        for _ in segments:
+            pass
+
+    decode()  # warm-up
+    elapsed = []
+    for _ in range(runs):
+        threads = [threading.Thread(target=decode) for _ in range(workers)]
+        t0 = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed.append(time.monotonic() - t0)
+    audio_secs = len(audio) / SAMPLE_RATE * workers
+    return min(elapsed) / audio_secs
+
+
+def calibrate(settings, audio: np.ndarray) -> Optional[dict]:
+    """
+    Namizəd model / compute_type / thread düzülüşlərini `audio` (nitq klipi) üzərində
+    ölçür. Modellər keyfiyyət sırası ilə yoxlanır; real vaxtı `headroom` ehtiyatla
+    çatdıran ilk modelin ən sürətli variantı seçilir. Heç biri çatdırmırsa, ən sürətlisi.
+    Ölçüləcək namizəd yoxdursa None.
+    """
+    budget = 1.0 / settings.cpu_profile_headroom
+    fastest: Optional[dict] = None
+
+    for model_name in settings.cpu_profile_models:
+        best: Optional[dict] = None
+        for compute_type in settings.cpu_profile_compute_types:
+            for threads, workers in _thread_layouts(os.cpu_count() or 1):
+                model = WhisperModel(
+                    model_name, device="cpu", compute_type=compute_type,
+                    cpu_threads=threads, num_workers=workers
+                )
+                rtf = _measure(model, audio, workers, settings.cpu_profile_runs)
+                del model
+                logger.info("Kalibrasiya: %s/%s threads=%d workers=%d → RTF %.3f",
+                            model_name, compute_type, threads, workers, rtf)
+                result = {
+                    "model": model_name, "compute_type": compute_type,
+                    "cpu_threads": threads, "num_workers": workers, "rtf": round(rtf, 4),
+                }
+                if best is None or rtf < best["rtf"]:
+                    best = result
+                if fastest is None or rtf < fastest["rtf"]:
+                    fastest = result
+        if best is not None and best["rtf"] <= budget:
+            return best
+
+    if fastest is not None:
+        logger.warning("Heç bir CPU profili real vaxtı çatdırmır, ən sürətlisi seçildi: %s", fastest)
+    return fastest
+
+
+def load_or_calibrate(settings) -> Optional[dict]:
+    """
+    Disk cache-dəki profili qaytarır; maşın və ya parametrlər dəyişibsə yenidən ölçür.
+    Nitq klipi və ya namizəd model yoxdursa None – konfiqurasiyadakı model istifadə olunur.
+    """
+    path = settings.cpu_profile_cache
+    fingerprint = _fingerprint(settings)
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+        if cached.get("fingerprint") == fingerprint:
+            logger.info("CPU profili cache-dən: %s", cached["profile"])
+            return cached["profile"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    if not settings.cpu_profile_models or not settings.cpu_profile_compute_types:
+        logger.warning("cpu_profile_models/cpu_profile_compute_types boşdur, kalibrasiya edilmir; "
+                       "whisper_model və compute_type istifadə olunur")
+        return None
+    audio = _load_clip(settings)
+    if audio is None:
+        logger.warning("Kalibrasiya klipi (cpu_profile_clip=%s) tapılmadı, kalibrasiya edilmir; "
+                       "whisper_model və compute_type istifadə olunur. Bir neçə saniyəlik real "
+                       "nitq WAV-ı bu yola qoyun", settings.cpu_profile_clip)
+        return None
+
+    logger.info("CPU profili kalibrasiya olunur…")
+    profile = calibrate(settings, audio)
+    if profile is None:
+        return None
+    with open(path, "w") as f:
+        json.dump({"fingerprint": fingerprint, "profile": profile}, f, indent=2)
+    logger.info("CPU profili seçildi: %s", profile)
+    return profile
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+import time
+import queue
+import threading
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional
+
+from app.services.archiver import AudioSegment
+
+
+class _Inlet:
+    """Bir kanalın FairQueue-ya girişi: queue.Queue kimi `put`, None kanalı bağlayır."""
+
+    def __init__(self, fair: "FairQueue", channel: str):
+        self._fair   = fair
+        self.channel = channel
+
+    def put(self, seg: Optional[AudioSegment]):
+        if seg is None:
+            self._fair.close(self.channel)
+        else:
+            self._fair.put(seg)
+
+
+class FairQueue:
+    """
+    Bütün kanalların seqmentlərini ortaq transkripsiya worker-lərinə paylayan növbə.
+
+    Hər kanalın öz FIFO-su var, `get()` kanalları round-robin ilə gəzir: bir kanalın
+    backlog-u digərlərinin seqmentlərini gözlətmir. `exclusive=True` olanda bir kanaldan
+    eyni anda yalnız bir seqment işlənir (stream decoder-in sırası pozulmasın);
+    worker işi bitirəndə `task_done(channel)` çağırmalıdır.
+
+    `get()` queue.Queue ilə uyğundur (timeout, queue.Empty), ona görə SegmentBatcher
+    və scheduler onu birbaşa oxuya bilər. Bütün kanallar bağlanıb boşalanda None qaytarır.
+    """
+
+    def __init__(self, channels, exclusive: bool = False):
+        self.exclusive = exclusive
+        self._cond     = threading.Condition()
+        self._queues: "OrderedDict[str, Deque[AudioSegment]]" = OrderedDict(
+            (name, deque()) for name in channels
+        )
+        self._open = set(self._queues)
+        self._busy = set()
+        self.served: Dict[str, int] = {name: 0 for name in self._queues}
+
+    def inlet(self, channel: str) -> _Inlet:
+        return _Inlet(self, channel)
+
+    def put(self, seg: AudioSegment):
+        with self._cond:
+            self._queues[seg.channel].append(seg)
+            self._cond.notify()
+
+    def close(self, channel: str):
+        with self._cond:
+            self._open.discard(channel)
+            self._cond.notify_all()
+
+    def _pop(self) -> Optional[AudioSegment]:
+        for name in list(self._queues):
+            q = self._queues[name]
+            if q and not (self.exclusive and name in self._busy):
+                # Xidmət olunan kanal sıranın sonuna keçir
+                self._queues.move_to_end(name)
+                self.served[name] += 1
+                if self.exclusive:
+                    self._busy.add(name)
+                return q.popleft()
+        return None
+
+    def _finished(self) -> bool:
+        return not self._open and not any(self._queues.values())
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Optional[AudioSegment]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                seg = self._pop()
+                if seg is not None:
+                    return seg
+                if self._finished():
+                    return None
+                if not block:
+                    raise queue.Empty
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                self._cond.wait(remaining)
+
+    def task_done(self, channel: str):
+        if self.exclusive:
+            with self._cond:
+                self._busy.discard(channel)
+                self._cond.notify_all()
+
+    def backlog(self) -> Dict[str, int]:
+        with self._cond:
+            return {name: len(q) for name, q in self._queues.items()}
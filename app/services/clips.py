@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+import os
+import re
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import AsyncIterator, List, Optional, Tuple
+
+from app.utils.metrics import CLIP_FFMPEG_ACTIVE, CLIP_FFMPEG_SECONDS, CLIP_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+_SEGMENT_RE = re.compile(r"^segment_(\d+)\.ts$")
+_CHUNK_SIZE = 64 * 1024
+# Bundan köhnə .part faylı heç bir işləyən remux-a aid deyil (cache-i digər API worker-ləri də paylaşır)
+_STALE_PART_SECS = 3600
+
+
+class ClipService:
+    """
+    /video_clip/ üçün TS → fragmented MP4 remux xidməti.
+
+    - Hazır kliplər diskdə ölçü limiti olan LRU cache-də saxlanılır, açar (fayl, start, duration).
+    - Eyni anda işləyən ffmpeg proseslərinin sayı məhduddur; artıq sorğular növbə gözləyir.
+    - Klient bağlantını kəsəndə ffmpeg öldürülür və yarımçıq fayl silinir.
+    - Klip TS seqment sərhədini keçirsə, qonşu seqmentlər concat ilə birləşdirilir.
+    """
+
+    def __init__(self, settings):
+        self.archive_dir = settings.archive_dir
+        self.seg_time    = settings.ts_segment_time
+        self.cache_dir   = settings.clip_cache_dir
+        self.max_bytes   = settings.clip_cache_max_mb * 1024 * 1024
+        self._ffmpeg     = asyncio.Semaphore(settings.clip_max_ffmpeg)
+
+        self._lock  = threading.Lock()
+        self._index = OrderedDict()   # key → fayl ölçüsü, köhnədən yeniyə
+        self._total = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        """Restart-dan sonra cache-i diskdən bərpa edir (mtime sırası ilə)."""
+        entries = []
+        cutoff = time.time() - _STALE_PART_SECS
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".part"):
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except OSError:
+                    pass
+                continue
+            if name.endswith(".mp4"):
+                st = os.stat(path)
+                entries.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total += size
+        self._evict()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".mp4")
+
+    def _evict(self):
+        with self._lock:
+            victims = []
+            while self._total > self.max_bytes and self._index:
+                key, size = self._index.popitem(last=False)
+                self._total -= size
+                victims.append(key)
+        for key in victims:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    @staticmethod
+    def _segment_path(archive_dir: str, idx: int) -> str:
+        return os.path.join(archive_dir, f"segment_{idx:05d}.ts")
+
+    def resolve(
+        self,
+        video_file: str,
+        start: float,
+        duration: float,
+        archive_dir: Optional[str] = None
+    ) -> Optional[Tuple[List[str], float]]:
+        """
+        Klip üçün lazım olan TS fayllarını və birinci fayl daxilindəki başlanğıcı qaytarır.
+        Mənfi `start` əvvəlki seqmentə, `start + duration` seqmentdən uzun olanda
+        növbəti seqmentlərə keçir. Fayl yoxdursa None.
+        `archive_dir` – kanalın arxiv qovluğu (verilməyibsə settings.archive_dir).
+        """
+        archive_dir = archive_dir or self.archive_dir
+        if os.path.basename(video_file) != video_file:
+            return None
+        path = os.path.join(archive_dir, video_file)
+        if not os.path.exists(path):
+            return None
+
+        m = _SEGMENT_RE.match(video_file)
+        if not m:
+            return [path], max(start, 0.0)
+
+        seg_path = lambda i: self._segment_path(archive_dir, i)
+        idx = int(m.group(1))
+        while start < 0 and idx > 0 and os.path.exists(seg_path(idx - 1)):
+            idx -= 1
+            start += self.seg_time
+        while start >= self.seg_time and os.path.exists(seg_path(idx + 1)):
+            idx += 1
+            start -= self.seg_time
+        start = max(start, 0.0)
+
+        files = [seg_path(idx)]
+        covered = self.seg_time - start
+        while covered < duration and os.path.exists(seg_path(idx + len(files))):
+            files.append(seg_path(idx + len(files)))
+            covered += self.seg_time
+        return files, start
+
+    @staticmethod
+    def key(files: List[str], start: float, duration: float) -> str:
+        # Tam yol: fərqli kanalların eyni adlı seqmentləri toqquşmasın
+        raw = f"{os.path.abspath(files[0])}|{len(files)}|{start:.3f}|{duration:.3f}"
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Cache-də varsa faylın yolunu qaytarır və onu ən yeni kimi işarələyir."""
+        with self._lock:
+            if key not in self._index:
+                CLIP_REQUESTS.labels(cache="miss").inc()
+                return None
+            self._index.move_to_end(key)
+        CLIP_REQUESTS.labels(cache="hit").inc()
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._total -= self._index.pop(key, 0)
+            return None
+        return path
+
+    def _store(self, key: str, tmp: str):
+        size = os.path.getsize(tmp)
+        os.replace(tmp, self._path(key))
+        with self._lock:
+            self._total += size - self._index.pop(key, 0)
+            self._index[key] = size
+        self._evict()
+
+    async def remux(self, files: List[str], start: float, duration: float, key: str) -> AsyncIterator[bytes]:
+        """
+        ffmpeg ilə remux edib MP4 baytlarını yield edir, eyni zamanda cache-ə yazır.
+        Generator bağlananda (klient getdi) ffmpeg öldürülür.
+        """
+        source = files[0] if len(files) == 1 else "concat:" + "|".join(files)
+        cmd = [
+            "ffmpeg", "-nostdin", "-loglevel", "error",
+            "-ss", str(start), "-i", source,
+            "-t", str(duration), "-c", "copy",
+            "-bsf:a", "aac_adtstoasc",
+            "-movflags", "frag_keyframe+empty_moov",
+            "-f", "mp4", "pipe:1"
+        ]
+        async with self._ffmpeg:
+            t0 = time.perf_counter()
+            proc = await asyncio.create_subprocess_exec(
+                *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+            )
+            CLIP_FFMPEG_ACTIVE.inc()
+            tmp = f"{self._path(key)}.{proc.pid}.part"
+            complete = False
+            first = True
+            try:
+                with open(tmp, "wb") as out:
+                    while True:
+                        chunk = await proc.stdout.read(_CHUNK_SIZE)
+                        if first:
+                            CLIP_FFMPEG_SECONDS.labels(stage="ttfb").observe(time.perf_counter() - t0)
+                            first = False
+                        if not chunk:
+                            break
+                        out.write(chunk)
+                        yield chunk
+                complete = await proc.wait() == 0
+            finally:
+                CLIP_FFMPEG_ACTIVE.dec()
+                CLIP_FFMPEG_SECONDS.labels(stage="total").observe(time.perf_counter() - t0)
+                # Fayl await-dən əvvəl: ləğv olunmuş generator-da wait() da ləğv oluna bilər
+                if complete:
+                    self._store(key, tmp)
+                elif os.path.exists(tmp):
+                    os.remove(tmp)
+                if proc.returncode is None:
+                    logger.info("Klient getdi, ffmpeg dayandırılır (pid %d)", proc.pid)
+                    proc.kill()
+                    await asyncio.shield(proc.wait())
@@ -0,0 +1,107 @@
+# app/services/context.py
+
+from datetime import datetime, timedelta
+from typing import List, NamedTuple, Sequence, Tuple
+
+from app.api.schemas import SegmentInfo
+
+
+class Window(NamedTuple):
+    start:   datetime
+    end:     datetime
+    hits:    List[datetime]     # pəncərəyə düşən tapıntıların başlanğıcları
+    channel: str = "default"
+
+
+def cluster_windows(segments: Sequence[SegmentInfo], pad: timedelta) -> List[Window]:
+    """
+    Tapıntıları ±pad pəncərələrinə çevirir və eyni kanalda üst-üstə düşənləri birləşdirir.
+    Səhər və axşam tapılan söz iki ayrı pəncərə verir, bütün günü yox.
+    """
+    spans = sorted(
+        (s.channel, datetime.fromisoformat(s.start_time), datetime.fromisoformat(s.end_time))
+        for s in segments
+    )
+    windows: List[Window] = []
+    for channel, start, end in spans:
+        if windows and windows[-1].channel == channel and start - pad <= windows[-1].end:
+            last = windows[-1]
+            windows[-1] = last._replace(end=max(last.end, end + pad), hits=last.hits + [start])
+        else:
+            windows.append(Window(start - pad, end + pad, [start], channel))
+    return windows
+
+
+def _tokens(text: str, chars_per_token: float) -> int:
+    return int(len(text) / chars_per_token) + 1
+
+
+def trim_hits(
+    segments: Sequence[SegmentInfo],
+    token_budget: int,
+    chars_per_token: float
+) -> List[SegmentInfo]:
+    """
+    Tapıntıları token büdcəsinə sığdırır: gəldiyi sıra ilə (ranked axtarışda aktuallıq)
+    sığanlar götürülür, nəticə xronoloji sıradadır.
+    """
+    budget = token_budget
+    keep = []
+    for i, seg in enumerate(segments):
+        cost = _tokens(seg.text, chars_per_token)
+        if cost > budget:
+            continue
+        keep.append(i)
+        budget -= cost
+    return sorted((segments[i] for i in keep), key=lambda s: datetime.fromisoformat(s.start_time))
+
+
+def build_context(
+    windows: List[Window],
+    rows: List[List[Tuple[datetime, str]]],
+    token_budget: int,
+    chars_per_token: float
+) -> str:
+    """
+    Pəncərələri aktuallığa görə (tapıntı sayı, sonra yenilik) sıralayıb token büdcəsinə
+    sığdırır. Büdcəyə tam sığmayan pəncərədə tapıntılara ən yaxın sətirlər saxlanılır.
+    Nəticə xronoloji sırada, hər sətir ayrı (seqment sərhədi) olur.
+    """
+    order = sorted(range(len(windows)), key=lambda i: (-len(windows[i].hits), -windows[i].start.timestamp()))
+    budget = token_budget
+    chosen = {}
+    for i in order:
+        if budget <= 0:
+            break
+        lines = rows[i]
+        if not lines:
+            continue
+        cost = [_tokens(text, chars_per_token) for _, text in lines]
+        if sum(cost) <= budget:
+            keep = range(len(lines))
+        else:
+            hits = windows[i].hits
+            nearest = sorted(
+                range(len(lines)),
+                key=lambda j: min(abs((lines[j][0] - h).total_seconds()) for h in hits)
+            )
+            keep, used = [], 0
+            for j in nearest:
+                if used + cost[j] > budget:
+                    continue
+                keep.append(j)
+                used += cost[j]
+            keep.sort()
+            if not keep:
+                continue
+        chosen[i] = [lines[j] for j in keep]
+        budget -= sum(cost[j] for j in keep)
+
+    blocks = []
+    for i in sorted(chosen, key=lambda i: windows[i].start):
+        w = windows[i]
+        header = f"[{w.start:%Y-%m-%d %H:%M:%S} – {w.end:%H:%M:%S}]"
+        if w.channel != "default":
+            header += f" ({w.channel})"
+        blocks.append(header + "\n" + "\n".join(text for _, text in chosen[i]))
+    return "\n\n".join(blocks)
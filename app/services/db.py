@@ -1,12 +1,236 @@
 # app/services/db.py
 
+import re
+import json
+import time
+import base64
+import struct
+import logging
+import datetime
+import threading
+from contextlib import contextmanager
+
 import psycopg2
-from typing import List
+from psycopg2 import pool as pg_pool
+from psycopg2.extras import execute_values
+from typing import List, Optional
 from app.api.schemas import SegmentInfo
+from app.utils.metrics import DB_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_PARTITION_PREFIX = "transcripts_p"
+_WORDS_PARTITION_PREFIX = "transcript_words_p"
+
+# Partitioned by day on start_time so time-range queries prune to a few
+# partitions and retention is a DROP TABLE instead of a DELETE.
+_CREATE_TRANSCRIPTS = """
+CREATE TABLE transcripts (
+    id               BIGSERIAL,
+    start_time       TIMESTAMP WITH TIME ZONE NOT NULL,
+    end_time         TIMESTAMP WITH TIME ZONE NOT NULL,
+    text             TEXT NOT NULL,
+    segment_filename TEXT NOT NULL,
+    offset_secs      REAL NOT NULL,
+    duration_secs    REAL NOT NULL,
+    channel          TEXT NOT NULL DEFAULT 'default',
+    PRIMARY KEY (id, start_time)
+) PARTITION BY RANGE (start_time)
+"""
+
+# Tables created before multi-channel ingest get the column on startup;
+# existing rows belong to the single pre-existing channel.
+_ADD_CHANNEL = (
+    "ALTER TABLE transcripts"
+    " ADD COLUMN IF NOT EXISTS channel TEXT NOT NULL DEFAULT 'default'"
+)
+
+# Defined on the parent, so every new day partition gets them too. Trigram
+# GIN keeps `text ILIKE '%kw%'` indexed with the substring semantics users
+# rely on ("bank" also finds "bankın"), which a 'simple' tsvector would lose
+# for Azerbaijani suffixes. BRIN is tiny and fits append-only time data;
+# the B-tree serves ORDER BY start_time LIMIT.
+_TRANSCRIPT_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS transcripts_text_trgm_idx"
+    " ON transcripts USING GIN (text gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS transcripts_time_brin_idx"
+    " ON transcripts USING BRIN (start_time, end_time)",
+    "CREATE INDEX IF NOT EXISTS transcripts_start_time_idx"
+    " ON transcripts (start_time)",
+]
+
+# Word-level timestamps, one row per transcript segment: `times` packs
+# little-endian float32 (start, end) pairs relative to the segment's
+# start_time, `words` holds the matching tokens. Partitioned like
+# transcripts so retention drops both together.
+_CREATE_TRANSCRIPT_WORDS = """
+CREATE TABLE IF NOT EXISTS transcript_words (
+    transcript_id BIGINT NOT NULL,
+    start_time    TIMESTAMP WITH TIME ZONE NOT NULL,
+    times         BYTEA NOT NULL,
+    words         TEXT[] NOT NULL,
+    PRIMARY KEY (transcript_id, start_time)
+) PARTITION BY RANGE (start_time)
+"""
+
+# Rolling summaries precomputed by the ingest side, one row per channel
+# and time bucket.
+_CREATE_SUMMARIES = """
+CREATE TABLE IF NOT EXISTS summaries (
+    channel       TEXT NOT NULL DEFAULT 'default',
+    bucket_start  TIMESTAMP WITH TIME ZONE NOT NULL,
+    bucket_end    TIMESTAMP WITH TIME ZONE NOT NULL,
+    summary       TEXT NOT NULL,
+    segment_count INTEGER NOT NULL,
+    created_at    TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    PRIMARY KEY (channel, bucket_start)
+)
+"""
+
+# New rows are announced on this channel (NOTIFY payload: JSON list of
+# SegmentInfo dicts) so API processes can push them to live viewers.
+NOTIFY_CHANNEL = "transcripts_live"
+# Postgres rejects NOTIFY payloads of 8000 bytes or more.
+_NOTIFY_MAX_BYTES = 7900
+
+_LEGACY_INDEXES = ["transcripts_text_trgm_idx", "transcripts_start_time_idx"]
+
+# One row per transcribed piece of audio, so a retried or resumed segment
+# never inserts twice. Only fields fixed at capture time are used: the TS
+# file and offset depend on when the archive index caught up, so a retry
+# may map the same piece differently. start_time is the partition key and
+# must be part of any unique index on the parent.
+_SEGMENT_KEY = "channel, start_time, end_time"
+_SEGMENT_KEY_INDEX = "transcripts_time_key"
+_CREATE_SEGMENT_KEY = (
+    f"CREATE UNIQUE INDEX IF NOT EXISTS {_SEGMENT_KEY_INDEX} ON transcripts ({_SEGMENT_KEY})"
+)
+# Earlier key on (channel, segment_filename, offset_secs, start_time).
+_LEGACY_SEGMENT_KEY_INDEX = "transcripts_segment_key"
+
+# Keep the oldest copy of rows that were inserted twice before the key existed.
+_DEDUPLICATE = """
+DELETE FROM transcripts t
+ USING transcripts d
+ WHERE (t.channel, t.start_time, t.end_time) = (d.channel, d.start_time, d.end_time)
+   AND t.id > d.id
+"""
+
+
+def like_pattern(keyword: str) -> str:
+    escaped = keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def pack_times(words) -> bytes:
+    """(start, end, word) tuples → packed little-endian float32 start/end pairs."""
+    flat = [t for w in words for t in (w[0], w[1])]
+    return struct.pack(f"<{len(flat)}f", *flat)
+
+
+_TOKEN_STRIP = re.compile(r"^\W+|\W+$")
+
+
+def _norm(word: str) -> str:
+    return _TOKEN_STRIP.sub("", word.casefold().replace("\u0307", ""))
+
+
+def word_match(keyword: str, times: Optional[bytes], words: Optional[List[str]]):
+    """
+    Locate `keyword` (one or more words) in a segment's word list, with the
+    same substring semantics as the ILIKE search ("bank" matches "bankın").
+    Returns (start, end) relative to the segment start, or None.
+    """
+    if not times or not words:
+        return None
+    tokens = [_norm(t) for t in keyword.split() if _norm(t)]
+    norm = [_norm(w) for w in words]
+    if not tokens or len(norm) < len(tokens):
+        return None
+    pairs = struct.unpack(f"<{len(times) // 4}f", times)
+    for i in range(len(norm) - len(tokens) + 1):
+        if all(tok in norm[i + j] for j, tok in enumerate(tokens)):
+            return pairs[2 * i], pairs[2 * (i + len(tokens) - 1) + 1]
+    return None
+
+
+def hit_row(keyword: str, r) -> dict:
+    """
+    Build a search hit from a (start_time, end_time, text, segment_filename,
+    offset_secs, duration_secs, times, words, channel) row, with the matched
+    phrase's offset inside the TS file when word timestamps exist. Returns
+    the plain dict SegmentInfo would serialize to, for paths that stream
+    many rows and skip model validation.
+    """
+    match = word_match(keyword, r[6] and bytes(r[6]), r[7])
+    return {
+        "start_time":          r[0].isoformat(),
+        "end_time":            r[1].isoformat(),
+        "text":                r[2],
+        "segment_filename":    r[3],
+        "offset_secs":         float(r[4]),
+        "duration_secs":       float(r[5]),
+        "channel":             r[8],
+        "match_offset_secs":   round(float(r[4]) + match[0], 3) if match else None,
+        "match_duration_secs": round(match[1] - match[0], 3) if match else None,
+    }
+
+
+def hit_info(keyword: str, r) -> SegmentInfo:
+    """hit_row as a SegmentInfo."""
+    return SegmentInfo(**hit_row(keyword, r))
+
+
+def notify_payloads(segments: List[SegmentInfo]) -> List[str]:
+    """
+    Split segments into JSON payloads that each fit one NOTIFY. A single
+    segment that is still too large has its text shortened.
+    """
+    payloads, batch, size = [], [], 2
+    for seg in segments:
+        item = json.dumps(seg.model_dump(), ensure_ascii=False)
+        n = len(item.encode()) + 1
+        if n > _NOTIFY_MAX_BYTES - 2:
+            d = seg.model_dump()
+            d["text"] = d["text"].encode()[:_NOTIFY_MAX_BYTES // 2].decode(errors="ignore")
+            item = json.dumps(d, ensure_ascii=False)
+            n = len(item.encode()) + 1
+        if batch and size + n > _NOTIFY_MAX_BYTES:
+            payloads.append("[" + ",".join(batch) + "]")
+            batch, size = [], 2
+        batch.append(item)
+        size += n
+    if batch:
+        payloads.append("[" + ",".join(batch) + "]")
+    return payloads
+
+
+def encode_cursor(start_time: datetime.datetime, row_id: int) -> str:
+    """Opaque keyset cursor for search pagination: position after (start_time, id)."""
+    raw = f"{start_time.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        start, row_id = raw.rsplit("|", 1)
+        return datetime.datetime.fromisoformat(start), int(row_id)
+    except (UnicodeDecodeError, TypeError, ValueError) as e:
+        raise ValueError(f"invalid cursor: {cursor!r}") from e
+
 
 class DBClient:
     def __init__(self, settings):
         self._conf = settings
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        # ThreadedConnectionPool raises instead of waiting when exhausted,
+        # so callers queue on this semaphore first.
+        self._slots = threading.BoundedSemaphore(settings.db_pool_max)
+        self._last_used = {}
+        self._partition_days = set()
 
     def get_conn(self):
         return psycopg2.connect(
@@ -17,94 +241,457 @@ class DBClient:
             password=self._conf.db_password
         )
 
+    def _get_pool(self):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = pg_pool.ThreadedConnectionPool(
+                        self._conf.db_pool_min,
+                        self._conf.db_pool_max,
+                        host=self._conf.db_host,
+                        port=self._conf.db_port,
+                        database=self._conf.db_name,
+                        user=self._conf.db_user,
+                        password=self._conf.db_password
+                    )
+        return self._pool
+
+    def _healthy(self, conn) -> bool:
+        """
+        Cheap liveness check: a closed connection is dead, a recently used one
+        is trusted, an idle one is pinged with SELECT 1.
+        """
+        if conn.closed:
+            return False
+        idle = time.monotonic() - self._last_used.get(id(conn), 0.0)
+        if idle < self._conf.db_pool_check_secs:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    @contextmanager
+    def connection(self, op: str = "other"):
+        """
+        Borrow a pooled connection; commit on success, roll back on error.
+        Broken connections are discarded instead of being returned to the pool.
+        The whole block, pool wait included, is timed under `op`.
+        """
+        t0 = time.perf_counter()
+        self._slots.acquire()
+        pool = self._get_pool()
+        conn = None
+        try:
+            conn = pool.getconn()
+            if not self._healthy(conn):
+                logger.warning("Dropping dead pooled DB connection")
+                self._last_used.pop(id(conn), None)
+                pool.putconn(conn, close=True)
+                conn = pool.getconn()
+            yield conn
+            conn.commit()
+        except Exception:
+            if conn is not None and not conn.closed:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    conn.close()
+            raise
+        finally:
+            if conn is not None:
+                if conn.closed:
+                    self._last_used.pop(id(conn), None)
+                else:
+                    self._last_used[id(conn)] = time.monotonic()
+                pool.putconn(conn, close=bool(conn.closed))
+            self._slots.release()
+            DB_SECONDS.labels(op=op, client="sync").observe(time.perf_counter() - t0)
+
+    def close(self):
+        """Close every pooled connection."""
+        if self._pool is not None:
+            self._pool.closeall()
+            self._pool = None
+
     def init_db(self):
         """
-        Ensure the transcripts table exists.
-        """
-        conn = self.get_conn()
-        cur = conn.cursor()
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS transcripts (
-            id               SERIAL PRIMARY KEY,
-            start_time       TIMESTAMP WITH TIME ZONE NOT NULL,
-            end_time         TIMESTAMP WITH TIME ZONE NOT NULL,
-            text             TEXT NOT NULL,
-            segment_filename TEXT NOT NULL,
-            offset_secs      REAL NOT NULL,
-            duration_secs    REAL NOT NULL
-        )
-        """)
-        conn.commit()
-        cur.close()
-        conn.close()
+        Ensure the day-partitioned transcripts table, its indexes and
+        partitions around today exist. A plain (pre-partitioning)
+        transcripts table is migrated in place.
+        """
+        with self.connection("init") as conn, conn.cursor() as cur:
+            cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            # before any day partition: _create_partition attaches one to each table
+            cur.execute(_CREATE_TRANSCRIPT_WORDS)
+            cur.execute("SELECT relkind FROM pg_class WHERE relname = 'transcripts'")
+            row = cur.fetchone()
+            if row and row[0] == "r":
+                self._migrate_to_partitions(cur)
+            elif not row:
+                cur.execute(_CREATE_TRANSCRIPTS)
+            cur.execute(_ADD_CHANNEL)
+            for ddl in _TRANSCRIPT_INDEXES:
+                cur.execute(ddl)
+            cur.execute("SELECT 1 FROM pg_class WHERE relname = %s", (_SEGMENT_KEY_INDEX,))
+            if not cur.fetchone():
+                cur.execute(f"DROP INDEX IF EXISTS {_LEGACY_SEGMENT_KEY_INDEX}")
+                cur.execute(_DEDUPLICATE)
+                if cur.rowcount:
+                    logger.info("Removed %d duplicate transcript rows", cur.rowcount)
+                cur.execute(_CREATE_SEGMENT_KEY)
+            cur.execute("""
+            CREATE TABLE IF NOT EXISTS summary_cache (
+                key        TEXT PRIMARY KEY,
+                summary    TEXT NOT NULL,
+                created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+            )
+            """)
+            cur.execute(
+                "CREATE INDEX IF NOT EXISTS summary_cache_created_at_idx ON summary_cache (created_at)"
+            )
+            # summaries is derived data: a single-channel table is rebuilt
+            cur.execute("""
+                SELECT 1 FROM information_schema.columns
+                 WHERE table_name = 'summaries' AND column_name = 'bucket_start'
+                   AND NOT EXISTS (SELECT 1 FROM information_schema.columns
+                                    WHERE table_name = 'summaries' AND column_name = 'channel')
+            """)
+            if cur.fetchone():
+                cur.execute("DROP TABLE summaries")
+            cur.execute(_CREATE_SUMMARIES)
+        self.ensure_partitions()
 
-    def insert_segments(self, segments: List[SegmentInfo]):
+    def _migrate_to_partitions(self, cur):
         """
-        Insert a batch of whisper‐generated segments into the DB.
+        Move rows from the legacy unpartitioned table into day partitions,
+        keeping ids, inside the caller's transaction.
         """
-        conn = self.get_conn()
-        cur = conn.cursor()
-        for seg in segments:
+        logger.info("Migrating transcripts to a day-partitioned table")
+        for name in _LEGACY_INDEXES:
+            cur.execute(f"DROP INDEX IF EXISTS {name}")
+        cur.execute("ALTER TABLE transcripts RENAME TO transcripts_legacy")
+        cur.execute("ALTER SEQUENCE IF EXISTS transcripts_id_seq RENAME TO transcripts_legacy_id_seq")
+        cur.execute(_CREATE_TRANSCRIPTS)
+
+        cur.execute("SELECT min(start_time), max(start_time) FROM transcripts_legacy")
+        first, last = cur.fetchone()
+        if first is not None:
+            day = first.astimezone(datetime.timezone.utc).date()
+            while day <= last.astimezone(datetime.timezone.utc).date():
+                self._create_partition(cur, day)
+                day += datetime.timedelta(days=1)
             cur.execute("""
                 INSERT INTO transcripts
-                  (start_time, end_time, text,
+                  (id, start_time, end_time, text,
                    segment_filename, offset_secs, duration_secs)
-                VALUES (%s,%s,%s,%s,%s,%s)
-            """, (
+                SELECT id, start_time, end_time, text,
+                       segment_filename, offset_secs, duration_secs
+                  FROM transcripts_legacy
+            """)
+            cur.execute("""
+                SELECT setval('transcripts_id_seq',
+                              (SELECT max(id) FROM transcripts_legacy))
+            """)
+        cur.execute("DROP TABLE transcripts_legacy")
+
+    def _create_partition(self, cur, day: datetime.date):
+        start = datetime.datetime.combine(day, datetime.time(), datetime.timezone.utc)
+        end = start + datetime.timedelta(days=1)
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {_PARTITION_PREFIX}{day:%Y%m%d}
+            PARTITION OF transcripts
+            FOR VALUES FROM (%s) TO (%s)
+        """, (start, end))
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {_WORDS_PARTITION_PREFIX}{day:%Y%m%d}
+            PARTITION OF transcript_words
+            FOR VALUES FROM (%s) TO (%s)
+        """, (start, end))
+        self._partition_days.add(day)
+
+    def ensure_partitions(self, days: Optional[List[datetime.date]] = None):
+        """
+        Create day partitions for `days`, or for yesterday through
+        db_partition_days_ahead days from now.
+        """
+        if days is None:
+            today = datetime.datetime.now(datetime.timezone.utc).date()
+            days = [
+                today + datetime.timedelta(days=d)
+                for d in range(-1, self._conf.db_partition_days_ahead + 1)
+            ]
+        missing = [d for d in days if d not in self._partition_days]
+        if not missing:
+            return
+        with self.connection("partitions") as conn, conn.cursor() as cur:
+            for day in missing:
+                self._create_partition(cur, day)
+
+    def _retention_cutoff(self) -> datetime.datetime:
+        retention = self._conf.transcript_retention_secs or (
+            self._conf.ts_list_size * self._conf.ts_segment_time
+        )
+        return datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=retention)
+
+    def drop_expired_partitions(self) -> List[str]:
+        """
+        Drop day partitions that ended before the retention window, which
+        matches the TS archive window (ts_list_size * ts_segment_time)
+        unless transcript_retention_secs overrides it. Dropping a
+        partition is O(1) compared with DELETE.
+        """
+        cutoff = self._retention_cutoff()
+        dropped = []
+        with self.connection("retention") as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT c.relname
+                  FROM pg_inherits i
+                  JOIN pg_class c ON c.oid = i.inhrelid
+                  JOIN pg_class p ON p.oid = i.inhparent
+                 WHERE p.relname = 'transcripts'
+            """)
+            for (name,) in cur.fetchall():
+                try:
+                    day = datetime.datetime.strptime(name[len(_PARTITION_PREFIX):], "%Y%m%d").date()
+                except ValueError:
+                    continue
+                end = datetime.datetime.combine(day, datetime.time(), datetime.timezone.utc) \
+                    + datetime.timedelta(days=1)
+                if end <= cutoff:
+                    cur.execute(f"DROP TABLE IF EXISTS {name}")
+                    cur.execute(f"DROP TABLE IF EXISTS {_WORDS_PARTITION_PREFIX}{day:%Y%m%d}")
+                    self._partition_days.discard(day)
+                    dropped.append(name)
+        if dropped:
+            logger.info("Dropped expired transcript partitions: %s", ", ".join(dropped))
+        return dropped
+
+    def run_retention(self):
+        """
+        Periodic job: pre-create upcoming partitions, drop expired ones
+        and the bucket summaries covering them, and purge summary_cache
+        rows older than summary_cache_ttl (reads already ignore them).
+        """
+        self.ensure_partitions()
+        self.drop_expired_partitions()
+        with self.connection("retention") as conn, conn.cursor() as cur:
+            cur.execute("DELETE FROM summaries WHERE bucket_end <= %s", (self._retention_cutoff(),))
+            cur.execute(
+                "DELETE FROM summary_cache WHERE created_at <= now() - make_interval(secs => %s)",
+                (self._conf.summary_cache_ttl,)
+            )
+            if cur.rowcount:
+                logger.info("Purged %d expired summary cache rows", cur.rowcount)
+
+    def insert_segments(self, segments: List[SegmentInfo]):
+        """
+        Insert a batch of whisper‐generated segments into the DB
+        with a single multi-row INSERT. Segments carrying word
+        timestamps also get a packed row in transcript_words.
+        Rows already present (same channel, start and end) are skipped,
+        so retries and resumed jobs are idempotent. Newly inserted rows
+        are announced with NOTIFY, delivered when the transaction commits.
+        """
+        if not segments:
+            return
+        rows = [
+            (
+                i,
                 seg.start_time,
                 seg.end_time,
                 seg.text,
                 seg.segment_filename,
                 seg.offset_secs,
-                seg.duration_secs
-            ))
-        conn.commit()
-        cur.close()
-        conn.close()
-
-    def search(self, keyword: str) -> List[SegmentInfo]:
-        """
-        Return all segments containing keyword, ordered by start_time.
-        """
-        conn = self.get_conn()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT start_time, end_time, text,
-                   segment_filename, offset_secs, duration_secs
-              FROM transcripts
-             WHERE text ILIKE %s
-             ORDER BY start_time
-        """, (f"%{keyword}%",))
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
-
-        return [
-            SegmentInfo(
-                start_time       = r[0].isoformat(),
-                end_time         = r[1].isoformat(),
-                text             = r[2],
-                segment_filename = r[3],
-                offset_secs      = float(r[4]),
-                duration_secs    = float(r[5])
+                seg.duration_secs,
+                seg.channel
             )
-            for r in rows
+            for i, seg in enumerate(segments)
         ]
+        self.ensure_partitions(sorted({
+            datetime.datetime.fromisoformat(seg.start_time)
+            .astimezone(datetime.timezone.utc).date()
+            for seg in segments
+        }))
+        with self.connection("insert") as conn, conn.cursor() as cur:
+            # ON CONFLICT skips rows, so RETURNING is matched back to the
+            # input by key (compared in SQL, with the column types) not by position
+            inserted = execute_values(cur, f"""
+                WITH v (ord, start_time, end_time, text,
+                        segment_filename, offset_secs, duration_secs, channel) AS (
+                    VALUES %s
+                ), ins AS (
+                    INSERT INTO transcripts
+                      (start_time, end_time, text,
+                       segment_filename, offset_secs, duration_secs, channel)
+                    SELECT start_time, end_time, text,
+                           segment_filename, offset_secs, duration_secs, channel
+                      FROM v
+                    ON CONFLICT ({_SEGMENT_KEY}) DO NOTHING
+                    RETURNING id, {_SEGMENT_KEY}
+                )
+                SELECT min(v.ord), ins.id
+                  FROM ins
+                  JOIN v USING ({_SEGMENT_KEY})
+                 GROUP BY ins.id
+            """, rows, template="(%s, %s::timestamptz, %s::timestamptz, %s, %s, %s::real, %s::real, %s)",
+                fetch=True)
+            word_rows = [
+                (row_id, segments[i].start_time, pack_times(segments[i].words),
+                 [w[2] for w in segments[i].words])
+                for i, row_id in inserted
+                if segments[i].words
+            ]
+            if word_rows:
+                execute_values(cur, """
+                    INSERT INTO transcript_words (transcript_id, start_time, times, words)
+                    VALUES %s
+                    ON CONFLICT DO NOTHING
+                """, word_rows)
+            if len(inserted) < len(rows):
+                logger.info("Skipped %d already stored segments", len(rows) - len(inserted))
+            if self._conf.live_notify and inserted:
+                new = [segments[i] for i in sorted(i for i, _ in inserted)]
+                for payload in notify_payloads(new):
+                    cur.execute("SELECT pg_notify(%s, %s)", (NOTIFY_CHANNEL, payload))
+
+    def get_cached_summary(self, key: str, max_age_secs: float) -> Optional[str]:
+        """
+        Return a cached summary younger than max_age_secs, or None.
+        """
+        with self.connection("cache_get") as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT summary
+                  FROM summary_cache
+                 WHERE key = %s
+                   AND created_at > now() - make_interval(secs => %s)
+            """, (key, max_age_secs))
+            row = cur.fetchone()
+        return row[0] if row else None
+
+    def put_cached_summary(self, key: str, summary: str):
+        """
+        Upsert a summary into the persistent cache.
+        """
+        with self.connection("cache_put") as conn, conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO summary_cache (key, summary)
+                VALUES (%s, %s)
+                ON CONFLICT (key) DO UPDATE
+                   SET summary = EXCLUDED.summary,
+                       created_at = now()
+            """, (key, summary))
+
+    def fetch_bucket_text(
+        self,
+        channel: str,
+        bucket_start: datetime.datetime,
+        bucket_end: datetime.datetime
+    ) -> List[str]:
+        """
+        Return the texts of a channel's segments starting in
+        [bucket_start, bucket_end), one per segment, ordered by start_time.
+        """
+        with self.connection("bucket_text") as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT text
+                  FROM transcripts
+                 WHERE start_time >= %s
+                   AND start_time <  %s
+                   AND channel = %s
+                 ORDER BY start_time
+            """, (bucket_start, bucket_end, channel))
+            return [r[0] for r in cur.fetchall()]
+
+    def put_bucket_summary(
+        self,
+        channel: str,
+        bucket_start: datetime.datetime,
+        bucket_end: datetime.datetime,
+        summary: str,
+        segment_count: int
+    ):
+        """
+        Upsert the rolling summary of one channel's time bucket.
+        """
+        with self.connection("bucket_put") as conn, conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO summaries (channel, bucket_start, bucket_end, summary, segment_count)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (channel, bucket_start) DO UPDATE
+                   SET bucket_end    = EXCLUDED.bucket_end,
+                       summary       = EXCLUDED.summary,
+                       segment_count = EXCLUDED.segment_count,
+                       created_at    = now()
+            """, (channel, bucket_start, bucket_end, summary, segment_count))
+
+    def search(
+        self,
+        keyword: str,
+        limit: Optional[int] = None,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+        ranked: bool = False,
+        channel: Optional[str] = None
+    ) -> List[SegmentInfo]:
+        """
+        Return segments containing keyword, ordered by start_time
+        (or by relevance when `ranked`), optionally limited to a time
+        range and a channel.
+        """
+        where = ["t.text ILIKE %(like)s"]
+        if channel:
+            where.append("t.channel = %(channel)s")
+        if start_time:
+            where.append("t.start_time >= %(start)s")
+        if end_time:
+            # the start_time bound lets the planner prune partitions
+            where.append("t.start_time <= %(end)s AND t.end_time <= %(end)s")
+        order = (
+            "strict_word_similarity(%(kw)s, t.text) DESC, t.start_time DESC"
+            if ranked else "t.start_time"
+        )
+        sql = f"""
+            SELECT t.start_time, t.end_time, t.text,
+                   t.segment_filename, t.offset_secs, t.duration_secs,
+                   w.times, w.words, t.channel
+              FROM transcripts t
+              LEFT JOIN transcript_words w
+                ON w.transcript_id = t.id AND w.start_time = t.start_time
+             WHERE {" AND ".join(where)}
+             ORDER BY {order}
+        """
+        if limit:
+            sql += " LIMIT %(limit)s"
+        params = {
+            "kw": keyword,
+            "like": like_pattern(keyword),
+            "start": start_time,
+            "end": end_time,
+            "limit": limit,
+            "channel": channel,
+        }
+        with self.connection("search") as conn, conn.cursor() as cur:
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+
+        return [hit_info(keyword, r) for r in rows]
 
     def fetch_text(self, start_time: str, end_time: str) -> str:
         """
         Return all 'text' in the given time window.
         """
-        conn = self.get_conn()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT text
-              FROM transcripts
-             WHERE start_time >= %s
-               AND end_time   <= %s
-             ORDER BY start_time
-        """, (start_time, end_time))
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
+        with self.connection("fetch_text") as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT text
+                  FROM transcripts
+                 WHERE start_time >= %(start)s
+                   AND start_time <= %(end)s
+                   AND end_time   <= %(end)s
+                 ORDER BY start_time
+            """, {"start": start_time, "end": end_time})
+            rows = cur.fetchall()
         return " ".join(r[0] for r in rows)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+import wave
+import queue
+import logging
+import threading
+from collections import deque
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from app.services.archiver import AudioSegment, SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+
+def load_pcm(source) -> np.ndarray:
+    """AudioSegment.source → float32 PCM (WAV-lar ffmpeg-in yazdığı 16 kHz s16le mono-dur)."""
+    if isinstance(source, np.ndarray):
+        return source
+    with wave.open(source) as w:
+        raw = np.frombuffer(w.readframes(w.getnframes()), dtype=np.int16)
+    return raw.astype(np.float32) / 32768.0
+
+
+def audio_secs(source) -> float:
+    """Seqmentin uzunluğu (saniyə); WAV üçün yalnız başlıq oxunur."""
+    if isinstance(source, np.ndarray):
+        return len(source) / SAMPLE_RATE
+    with wave.open(source) as w:
+        return w.getnframes() / w.getframerate()
+
+
+class SpeechGate:
+    """
+    Whisper-dən əvvəl yüngül ön-keçid: NumPy ilə kadr enerjisi və zero-crossing rate
+    hesablanır, nitq payı `gate_min_speech_ratio`-dan az olan seqmentlər (sükut, musiqi,
+    reklam fasilələri) modelin queue-suna çatmadan atılır.
+
+    Ardıcıl atılan seqmentlər hər kanal üçün ayrıca bir "fasilə" kimi birləşdirilib
+    loglanır (gate bütün kanalların pump thread-ləri arasında paylaşılır). Hər seqmentin
+    nitq payı yadda (və istəyə görə CSV-də) saxlanır ki, həddləri tənzimləmək olsun.
+    """
+
+    def __init__(self, settings):
+        self.frame      = int(SAMPLE_RATE * settings.gate_frame_ms / 1000)
+        self.energy_db  = settings.gate_energy_db
+        self.margin_db  = settings.gate_noise_margin_db
+        self.zcr_min    = settings.gate_zcr_min
+        self.zcr_max    = settings.gate_zcr_max
+        self.min_ratio  = settings.gate_min_speech_ratio
+        self.log_path   = settings.gate_log_path
+        self.history    = deque(maxlen=settings.gate_history)
+
+        self._lock         = threading.Lock()
+        self._runs: Dict[str, List] = {}   # kanal → cari nitqsiz fasilə: [ilk idx, son idx, saniyə]
+        self.passed        = 0
+        self.dropped       = 0
+        self.dropped_secs  = 0.0
+        self.decoded_secs  = 0.0      # model tərəfindən dekod olunan audio
+        self.decode_time   = 0.0      # həmin dekodun sərf etdiyi vaxt
+
+    def speech_ratio(self, audio: np.ndarray) -> float:
+        """Nitq kimi görünən kadrların payı (0..1)."""
+        n = len(audio) // self.frame
+        if n == 0:
+            return 0.0
+        frames = audio[:n * self.frame].reshape(n, self.frame)
+
+        rms = np.sqrt(np.einsum("ij,ij->i", frames, frames) / self.frame)
+        db  = 20.0 * np.log10(rms + 1e-10)
+        # Fon səviyyəsinə uyğunlaşan hədd: sakit studiya ilə səs-küylü efir fərqlidir
+        threshold = max(self.energy_db, np.percentile(db, 10) + self.margin_db)
+
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / self.frame
+
+        voiced = (db > threshold) & (zcr >= self.zcr_min) & (zcr <= self.zcr_max)
+        return float(np.count_nonzero(voiced)) / n
+
+    def _record(self, seg: AudioSegment, ratio: float, secs: float, passed: bool):
+        with self._lock:
+            self.history.append((seg.channel, seg.index, seg.start_ts, round(ratio, 3), passed))
+            if passed:
+                self.passed += 1
+                run = self._runs.pop(seg.channel, None)
+            else:
+                self.dropped += 1
+                self.dropped_secs += secs
+                run = None
+                current = self._runs.get(seg.channel)
+                if current is None:
+                    self._runs[seg.channel] = [seg.index, seg.index, secs]
+                else:
+                    current[1] = seg.index
+                    current[2] += secs
+        if run:
+            logger.info("[%s] Nitqsiz hissə atıldı: #%d..#%d (%.0fs)", seg.channel, *run)
+        if self.log_path:
+            with open(self.log_path, "a") as f:
+                f.write(f"{seg.index},{seg.start_ts:.3f},{ratio:.4f},{int(passed)},{seg.channel}\n")
+
+    def filter(
+        self,
+        segments: Iterable[AudioSegment],
+        on_drop: Optional[Callable[[AudioSegment], None]] = None
+    ) -> Iterator[AudioSegment]:
+        """Yalnız nitqi olan seqmentləri ötürür; atılanlar üçün on_drop çağırılır."""
+        for seg in segments:
+            audio = load_pcm(seg.source)
+            ratio = self.speech_ratio(audio)
+            passed = ratio >= self.min_ratio
+            self._record(seg, ratio, len(audio) / SAMPLE_RATE, passed)
+            if passed:
+                yield seg
+            elif on_drop:
+                on_drop(seg)
+
+    def pump(
+        self,
+        src: "queue.Queue",
+        dst: "queue.Queue",
+        on_drop: Optional[Callable[[AudioSegment], None]] = None
+    ):
+        """src queue-dan oxuyur, keçən seqmentləri dst-yə qoyur (None ilə bitir)."""
+        def drain():
+            while True:
+                seg = src.get()
+                if seg is None:
+                    return
+                yield seg
+        for seg in self.filter(drain(), on_drop):
+            dst.put(seg)
+        dst.put(None)
+
+    def record_decode(self, audio_secs: float, decode_secs: float):
+        """Worker-lər dekod vaxtını bildirir; qənaət bu orta RTF ilə təxmin olunur."""
+        with self._lock:
+            self.decoded_secs += audio_secs
+            self.decode_time  += decode_secs
+
+    def stats(self) -> dict:
+        with self._lock:
+            rtf = self.decode_time / self.decoded_secs if self.decoded_secs else 0.0
+            saved = self.dropped_secs * rtf
+            total = saved + self.decode_time
+            return {
+                "passed":             self.passed,
+                "dropped":            self.dropped,
+                "dropped_audio_secs": round(self.dropped_secs, 1),
+                "decode_secs":        round(self.decode_time, 1),
+                "est_saved_secs":     round(saved, 1),
+                "saved_share":        round(saved / total, 3) if total else 0.0,
+            }
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import List, NamedTuple, Optional
+
+from app.api.schemas import SegmentInfo
+
+logger = logging.getLogger(__name__)
+
+CAPTURED    = "captured"
+TRANSCRIBED = "transcribed"
+STORED      = "stored"
+DROPPED     = "dropped"      # gate/scheduler atdı və ya audio bərpa oluna bilmədi
+
+_CREATE_JOBS = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id         INTEGER PRIMARY KEY,
+    channel    TEXT    NOT NULL,
+    idx        INTEGER NOT NULL,
+    source     TEXT,              -- WAV yolu ("file" rejimi); PCM üçün NULL
+    start_ts   REAL    NOT NULL,
+    duration   REAL    NOT NULL,
+    state      TEXT    NOT NULL,
+    result     TEXT,              -- transkripsiya nəticəsi (JSON), DB-yə yazılana qədər
+    updated_at REAL    NOT NULL
+)
+"""
+_CREATE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS jobs_state_idx ON jobs (state, channel, start_ts)",
+    "CREATE INDEX IF NOT EXISTS jobs_channel_idx_idx ON jobs (channel, idx)",
+]
+
+
+class Job(NamedTuple):
+    id:       int
+    channel:  str
+    idx:      int
+    source:   Optional[str]
+    start_ts: float
+    duration: float
+    state:    str
+    result:   Optional[List[SegmentInfo]]
+
+
+def _dump(segments: List[SegmentInfo]) -> str:
+    # words exclude=True olduğu üçün model_dump-a düşmür, ayrıca yazılır
+    return json.dumps([{**s.model_dump(), "words": s.words} for s in segments])
+
+
+class SegmentJournal:
+    """
+    Seqment işlərinin lokal jurnalı (SQLite, WAL rejimi).
+
+    Hər audio seqment tutulanda `captured` kimi yazılır, transkripsiyadan sonra nəticə
+    ilə birlikdə `transcribed`, DB-yə yazılandan sonra `stored` olur. Restart-da
+    bitməmiş işlər `pending()` ilə oxunur: transkripsiyası olanlar yenidən dekod
+    edilmədən yazılır, qalanlar arxivdən bərpa edilib növbəyə qoyulur.
+    """
+
+    def __init__(self, settings):
+        self.keep_secs = settings.journal_keep_hours * 3600
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(settings.journal_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_CREATE_JOBS)
+        for ddl in _CREATE_INDEXES:
+            self._conn.execute(ddl)
+        self._conn.commit()
+
+    def _exec(self, sql: str, args=()) -> sqlite3.Cursor:
+        with self._lock:
+            cur = self._conn.execute(sql, args)
+            self._conn.commit()
+            return cur
+
+    def captured(self, channel: str, idx: int, source: Optional[str],
+                 start_ts: float, duration: float) -> int:
+        """Yeni seqment; jurnal id-sini qaytarır."""
+        cur = self._exec(
+            "INSERT INTO jobs (channel, idx, source, start_ts, duration, state, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (channel, idx, source, start_ts, duration, CAPTURED, time.time())
+        )
+        return cur.lastrowid
+
+    def transcribed(self, job: Optional[int], segments: List[SegmentInfo]):
+        if job is not None:
+            self._exec("UPDATE jobs SET state = ?, result = ?, updated_at = ? WHERE id = ?",
+                       (TRANSCRIBED, _dump(segments), time.time(), job))
+
+    def finish(self, job: Optional[int], state: str = STORED):
+        if job is not None:
+            self._exec("UPDATE jobs SET state = ?, result = NULL, updated_at = ? WHERE id = ?",
+                       (state, time.time(), job))
+
+    def next_index(self, channel: str) -> int:
+        """Kanalın növbəti seqment nömrəsi: restart-dan sonra WAV adları üst-üstə düşmür."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT max(idx) FROM jobs WHERE channel = ?", (channel,)
+            ).fetchone()
+        return 0 if row[0] is None else row[0] + 1
+
+    def pending(self, channel: str) -> List[Job]:
+        """Bitməmiş (captured/transcribed) işlər, vaxt sırası ilə."""
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT id, channel, idx, source, start_ts, duration, state, result
+                  FROM jobs
+                 WHERE channel = ? AND state IN (?, ?)
+                 ORDER BY start_ts
+            """, (channel, CAPTURED, TRANSCRIBED)).fetchall()
+        return [
+            Job(*r[:7], [SegmentInfo(**s) for s in json.loads(r[7])] if r[7] else None)
+            for r in rows
+        ]
+
+    def prune(self):
+        """Bitmiş və köhnəlmiş işləri silir (idx sayğacı üçün hər kanalın sonuncusu qalır)."""
+        cutoff = time.time() - self.keep_secs
+        cur = self._exec("""
+            DELETE FROM jobs
+             WHERE state IN (?, ?) AND updated_at < ?
+               AND id NOT IN (SELECT max(id) FROM jobs GROUP BY channel)
+        """, (STORED, DROPPED, cutoff))
+        if cur.rowcount:
+            logger.info("Jurnal: %d köhnə iş silindi", cur.rowcount)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
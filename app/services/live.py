@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, Set
+
+import orjson
+
+from app.services.async_db import AsyncDBClient
+from app.services.db import NOTIFY_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+
+class Subscriber:
+    """Bir canlı izləyici: məhdud buffer, yalnız seçdiyi kanalın seqmentləri."""
+
+    def __init__(self, channel: Optional[str], size: int):
+        self.channel = channel
+        self.queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(maxsize=size)
+        self.dropped = False
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """Növbəti seqment (JSON bayt). Timeout-da b"" (keepalive), atılıbsa None."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return b""
+
+
+class LiveHub:
+    """
+    Yeni transkriptləri canlı izləyicilərə paylayan publish/subscribe hub.
+
+    Ingest prosesi hər insert-dən sonra Postgres NOTIFY göndərir; hub bir ayrıca
+    bağlantı ilə LISTEN edir və hər seqmenti bir dəfə seriallaşdırıb bütün
+    abunəçilərə verir – izləyici sayı DB yükünü artırmır, polling yoxdur.
+    Hər abunəçinin buffer-i məhduddur; dolarsa (yavaş klient) o atılır, digərləri gözləmir.
+    """
+
+    def __init__(self, settings, db: AsyncDBClient):
+        self.db         = db
+        self.buffer     = settings.live_client_buffer
+        self.retry_secs = settings.live_reconnect_secs
+        self._subs: Set[Subscriber] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.dropped   = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for sub in list(self._subs):
+            self._drop(sub)
+
+    async def _listen(self):
+        """LISTEN bağlantısını saxlayır, kəsiləndə yenidən qoşulur."""
+        while True:
+            lost = asyncio.Event()
+            try:
+                conn = await self.db.connect()
+            except Exception as e:
+                logger.warning("Live: DB-yə qoşulmaq olmadı: %s", e)
+                await asyncio.sleep(self.retry_secs)
+                continue
+            try:
+                conn.add_termination_listener(lambda _conn: lost.set())
+                await conn.add_listener(NOTIFY_CHANNEL, self._on_notify)
+                logger.info("Live: %s kanalı dinlənilir", NOTIFY_CHANNEL)
+                await lost.wait()
+                logger.warning("Live: LISTEN bağlantısı kəsildi, yenidən qoşulur")
+            except Exception as e:
+                logger.warning("Live: LISTEN qurulmadı: %s", e)
+            finally:
+                if not conn.is_closed():
+                    try:
+                        await conn.close()
+                    except Exception:
+                        conn.terminate()
+            await asyncio.sleep(self.retry_secs)
+
+    def _on_notify(self, _conn, _pid, _channel, payload: str):
+        try:
+            segments = orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            logger.warning("Live: yanlış NOTIFY payload")
+            return
+        for seg in segments:
+            self.publish(seg)
+
+    def publish(self, segment: dict):
+        """Seqmenti (SegmentInfo dict-i) kanalına abunə olanlara göndərir."""
+        self.published += 1
+        data = orjson.dumps(segment)
+        for sub in list(self._subs):
+            if sub.channel and sub.channel != segment.get("channel"):
+                continue
+            try:
+                sub.queue.put_nowait(data)
+            except asyncio.QueueFull:
+                self._drop(sub)
+
+    def _drop(self, sub: Subscriber):
+        """Abunəçini çıxarır və get() None qaytarsın deyə buffer-i boşaldır."""
+        self._subs.discard(sub)
+        if sub.dropped:
+            return
+        sub.dropped = True
+        self.dropped += 1
+        while not sub.queue.empty():
+            sub.queue.get_nowait()
+        sub.queue.put_nowait(None)
+
+    @asynccontextmanager
+    async def subscribe(self, channel: Optional[str] = None) -> AsyncIterator[Subscriber]:
+        sub = Subscriber(channel, self.buffer)
+        self._subs.add(sub)
+        try:
+            yield sub
+        finally:
+            self._subs.discard(sub)
+
+    def stats(self) -> dict:
+        return {"subscribers": len(self._subs), "published": self.published, "dropped": self.dropped}
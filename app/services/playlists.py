@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+import math
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Hashable, List, Optional, Sequence, Tuple
+
+from app.services.archive_index import ArchiveIndex
+
+# TS faylları API-də bu prefiks altında statik verilir
+ARCHIVE_URL = "/archive"
+
+
+class PlaylistService:
+    """
+    Axtarış nəticələri və ya vaxt aralığı üçün dinamik VOD .m3u8.
+
+    Playlist artıq arxivdə olan `segment_%05d.ts` fayllarına istinad edir, ona görə
+    ffmpeg prosesi və transcode yoxdur. Başlanğıc nöqtəsi `EXT-X-START` ilə verilir,
+    bir-birinə bitişik olmayan aralıqlar `EXT-X-DISCONTINUITY` ilə ayrılır.
+    Hazır playlist-lər qısa müddət (TTL) yaddaşda saxlanılır.
+    """
+
+    def __init__(self, settings, index: ArchiveIndex):
+        self.index    = index
+        # Çoxkanallı rejimdə hər kanalın TS-ləri archive_dir/<kanal> altındadır
+        self.url      = f"{ARCHIVE_URL}/{settings.channel}" if settings.channels else ARCHIVE_URL
+        self.ttl      = settings.playlist_cache_ttl
+        self.max_size = settings.playlist_cache_size
+        self._lock    = threading.Lock()
+        self._cache: "OrderedDict[Hashable, Tuple[float, str]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            item = self._cache.get(key)
+            if item is None or item[0] < time.monotonic():
+                self._cache.pop(key, None)
+                return None
+            self._cache.move_to_end(key)
+            return item[1]
+
+    def put(self, key: Hashable, body: str):
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self.ttl, body)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def build(self, ranges: Sequence[Tuple[float, float]]) -> Optional[str]:
+        """
+        Epoch aralıqları üçün playlist. Üst-üstə düşən aralıqlar birləşdirilir, eyni
+        seqment iki dəfə yazılmır. Heç bir seqment tapılmasa None.
+        """
+        entries: List[Tuple[int, str, float, float]] = []
+        for start, end in sorted(ranges):
+            for entry in self.index.between(start, end):
+                if entries and entry[0] <= entries[-1][0]:
+                    continue
+                entries.append(entry)
+        if not entries:
+            return None
+
+        first_range = min(r[0] for r in ranges)
+        offset = max(first_range - entries[0][2], 0.0)
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            f"#EXT-X-TARGETDURATION:{math.ceil(max(e[3] for e in entries))}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+            "#EXT-X-PLAYLIST-TYPE:VOD",
+            f"#EXT-X-START:TIME-OFFSET={offset:.3f},PRECISE=YES",
+        ]
+        prev_seq = None
+        for seq, name, start, duration in entries:
+            if prev_seq is not None and seq != prev_seq + 1:
+                lines.append("#EXT-X-DISCONTINUITY")
+            if prev_seq is None or seq != prev_seq + 1:
+                pdt = datetime.fromtimestamp(start, timezone.utc).isoformat(timespec="milliseconds")
+                lines.append(f"#EXT-X-PROGRAM-DATE-TIME:{pdt}")
+            lines.append(f"#EXTINF:{duration:.3f},")
+            lines.append(f"{self.url}/{name}")
+            prev_seq = seq
+        lines.append("#EXT-X-ENDLIST")
+        return "\n".join(lines) + "\n"
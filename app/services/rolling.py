@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+import queue
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from app.api.schemas import SegmentInfo
+from app.services.db import DBClient
+from app.services.summarizer import DeepSeekClient
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def bucket_start(ts: datetime, bucket: timedelta) -> datetime:
+    """`ts`-in düşdüyü bucket-in başlanğıcı (epoch-a görə hizalanmış)."""
+    return ts - (ts - _EPOCH) % bucket
+
+
+class RollingSummarizer:
+    """
+    Ingest tərəfində fon xülasəsi. Worker seqmentləri DB-yə yazdıqdan sonra `add()` çağırır;
+    zaman `rolling_summary_minutes`-lik bucket-lərə bölünür və yeni bucket başlayanda
+    əvvəlki bucket-in mətni ayrıca thread-də `summarize_text` ilə xülasə edilib
+    `summaries` cədvəlinə yazılır. Transkripsiya LLM-i gözləmir.
+
+    Bucket-lər hər kanal üçün ayrıca izlənir. Bucket bağlandıqdan sonra gələn gecikmiş
+    seqmentlər həmin bucket-i yenidən növbəyə qoyur.
+    """
+
+    def __init__(self, db: DBClient, summarizer: DeepSeekClient, settings):
+        self.db         = db
+        self.summarizer = summarizer
+        self.bucket     = timedelta(minutes=settings.rolling_summary_minutes)
+        self.queue: "queue.Queue[Optional[Tuple[str, datetime]]]" = queue.Queue()
+        self._current: Dict[str, datetime] = {}   # kanal → hələ dolmaqda olan bucket
+        self._lock   = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def add(self, segments: List[SegmentInfo]):
+        """Yazılmış seqmentləri qeyd edir; bağlanan bucket-ləri xülasə növbəsinə qoyur."""
+        by_channel: Dict[str, set] = {}
+        for s in segments:
+            by_channel.setdefault(s.channel, set()).add(
+                bucket_start(datetime.fromisoformat(s.start_time), self.bucket)
+            )
+        with self._lock:
+            for channel, buckets in by_channel.items():
+                latest = max(buckets)
+                current = self._current.get(channel)
+                if current is None:
+                    self._current[channel] = latest
+                    continue
+                for b in sorted(buckets):
+                    if b < current:
+                        self.queue.put((channel, b))
+                while current < latest:
+                    self.queue.put((channel, current))
+                    current += self.bucket
+                self._current[channel] = current
+
+    def flush(self):
+        """Shutdown: açıq bucket-ləri də xülasə edir və thread-i dayandırır."""
+        with self._lock:
+            for channel, current in self._current.items():
+                self.queue.put((channel, current))
+        self.queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            try:
+                self.summarize_bucket(*item)
+            except Exception as e:
+                logger.error("Bucket xülasəsi alınmadı (%s %s): %s", item[0], item[1].isoformat(), e)
+
+    def summarize_bucket(self, channel: str, start: datetime):
+        end = start + self.bucket
+        texts = self.db.fetch_bucket_text(channel, start, end)
+        if not texts:
+            return
+        summary = self.summarizer.summarize_text("\n".join(texts))
+        self.db.put_bucket_summary(channel, start, end, summary, len(texts))
+        logger.info("[%s] Bucket xülasəsi yazıldı: %s (%d seqment)", channel, start.isoformat(), len(texts))
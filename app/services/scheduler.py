@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+import time
+import queue
+import logging
+import threading
+from typing import Callable, Iterator, List, NamedTuple, Optional
+
+from app.api.schemas import SegmentInfo
+from app.services.archiver import AudioSegment
+from app.services.gating import SpeechGate, load_pcm
+from app.services.transcriber import Transcriber
+
+logger = logging.getLogger(__name__)
+
+
+class Tier(NamedTuple):
+    name:        str
+    beam_size:   int
+    best_of:     int
+    fallback:    bool = False   # kiçik/int8 modelə keç
+    skip_silent: bool = False   # nitq az olan seqmentləri at
+
+
+# Lag həddləri keçildikcə bir pillə aşağı düşürük
+TIERS = [
+    Tier("full",     beam_size=4, best_of=4),
+    Tier("greedy",   beam_size=1, best_of=1),
+    Tier("fallback", beam_size=1, best_of=1, fallback=True),
+    Tier("skip",     beam_size=1, best_of=1, fallback=True, skip_silent=True),
+]
+
+
+class TranscriptionScheduler:
+    """
+    Transcriber ətrafında backlog-a həssas planlaşdırıcı.
+
+    Seqmentlər məhdud queue-ya düşür (dolanda ən köhnəsi atılır). Canlıdan gecikmə
+    `sched_lag_thresholds` həddlərini keçdikcə keyfiyyət pillə-pillə azaldılır:
+    greedy decode → kiçik int8 model → nitqi az olan seqmentləri ötürmək.
+    Gecikmə həddin `sched_restore_ratio` hissəsindən aşağı düşəndə bir pillə geri qalxır.
+    """
+
+    def __init__(
+        self,
+        transcriber: Transcriber,
+        settings,
+        on_drop: Optional[Callable[[AudioSegment], None]] = None
+    ):
+        self.transcriber   = transcriber
+        self.settings      = settings
+        self.seg_time      = settings.wav_segment_time
+        self.thresholds    = list(settings.sched_lag_thresholds)[:len(TIERS) - 1]
+        self.restore_ratio = settings.sched_restore_ratio
+        self.skip_ratio    = settings.sched_skip_speech_ratio
+        self.queue         = queue.Queue(maxsize=settings.sched_queue_size)
+        self._on_drop      = on_drop
+        self._gate         = SpeechGate(settings)
+
+        self._fallback: Optional[Transcriber] = None
+        self._load_lock = threading.Lock()   # fallback modeli bir dəfə yüklənsin
+        self._lock    = threading.Lock()
+        self._tier    = 0
+        self.lag      = 0.0
+        self.dropped  = 0
+        self.skipped  = 0
+
+    @property
+    def tier(self) -> Tier:
+        return TIERS[self._tier]
+
+    def submit(self, seg: AudioSegment):
+        """Seqmenti queue-ya qoyur; queue doludursa ən köhnə seqment atılır."""
+        while True:
+            try:
+                self.queue.put_nowait(seg)
+                return
+            except queue.Full:
+                pass
+            try:
+                old = self.queue.get_nowait()
+            except queue.Empty:
+                continue
+            if old is None:
+                self.queue.put(None)
+                return
+            with self._lock:
+                self.dropped += 1
+            logger.warning("Backlog dolub, seqment #%d atıldı", old.index)
+            if self._on_drop:
+                self._on_drop(old)
+
+    def close(self):
+        """
+        Stream bitdi: iterator queue boşalandan sonra dayanır. Sentinel gözləyərək
+        qoyulur ki, dolu queue-da real seqment atılmasın (EOF-da heç nə itmir).
+        """
+        self.queue.put(None)
+
+    def _update_tier(self, lag: float):
+        target = sum(1 for t in self.thresholds if lag > t)
+        with self._lock:
+            self.lag = lag
+            prev = self._tier
+            if target > self._tier:
+                self._tier = target
+            elif self._tier > 0 and lag < self.thresholds[self._tier - 1] * self.restore_ratio:
+                self._tier -= 1
+            if self._tier != prev:
+                logger.warning("Lag %.1fs: transkripsiya pilləsi %s → %s",
+                               lag, TIERS[prev].name, TIERS[self._tier].name)
+
+    def __iter__(self) -> Iterator[AudioSegment]:
+        """
+        Növbəti seqmenti qaytarır, lag-ı yeniləyir. `skip` pilləsində nitqi az olan
+        seqmentlər burada atılır (on_drop çağırılır).
+        """
+        while True:
+            seg = self.queue.get()
+            if seg is None:
+                self.queue.put(None)   # digər worker-lər də dayansın
+                return
+            self._update_tier(time.time() - (seg.start_ts + self.seg_time))
+
+            if self.tier.skip_silent:
+                ratio = self._gate.speech_ratio(load_pcm(seg.source))
+                if ratio < self.skip_ratio:
+                    with self._lock:
+                        self.skipped += 1
+                    logger.info("Seqment #%d ötürüldü (nitq payı %.2f)", seg.index, ratio)
+                    if self._on_drop:
+                        self._on_drop(seg)
+                    continue
+            yield seg
+
+    def _fallback_transcriber(self) -> Transcriber:
+        with self._load_lock:
+            if self._fallback is None:
+                self._fallback = self._load_fallback()
+        return self._fallback
+
+    def _load_fallback(self) -> Transcriber:
+        logger.info("Fallback model yüklənir: %s (%s)",
+                    self.settings.sched_fallback_model, self.settings.sched_fallback_compute_type)
+        return Transcriber(
+            self.settings,
+            model=self.settings.sched_fallback_model,
+            compute_type=self.settings.sched_fallback_compute_type
+        )
+
+    def transcribe(self, seg: AudioSegment) -> List[SegmentInfo]:
+        """Seqmenti cari pillənin parametrləri ilə transkripsiya edir."""
+        tier = self.tier
+        transcriber = self._fallback_transcriber() if tier.fallback else self.transcriber
+        return transcriber.transcribe(
+            seg.source, seg.start_ts, seg.index,
+            beam_size=tier.beam_size, best_of=tier.best_of
+        )
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "lag_secs": round(self.lag, 2),
+                "tier":     self.tier.name,
+                "queued":   self.queue.qsize(),
+                "dropped":  self.dropped,
+                "skipped":  self.skipped,
+            }
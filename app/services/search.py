@@ -0,0 +1,140 @@
+# app/services/search.py
+
+import logging
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional
+
+import orjson
+
+from app.api.schemas import BucketSummary, SearchResponse, SegmentInfo
+from app.services.async_db import AsyncDBClient
+from app.services.context import build_context, cluster_windows, trim_hits
+from app.services.rolling import bucket_start
+from app.services.summarizer import AsyncDeepSeekClient
+
+logger = logging.getLogger(__name__)
+
+
+class NotFound(Exception):
+    pass
+
+
+async def find_segments(
+    db: AsyncDBClient,
+    keyword: str,
+    limit: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    ranked: bool = False,
+    channel: Optional[str] = None
+) -> List[SegmentInfo]:
+    segments = await db.search(
+        keyword, limit=limit, start_time=start, end_time=end, ranked=ranked, channel=channel
+    )
+    if not segments:
+        raise NotFound(keyword)
+    return segments
+
+
+async def context_text(db: AsyncDBClient, segments: List[SegmentInfo], settings) -> str:
+    """
+    Hər tapıntının ±context_pad_secs pəncərəsi; üst-üstə düşənlər birləşdirilir,
+    hamısı bir sorğu ilə gətirilir və token büdcəsinə sığdırılır.
+    """
+    windows = cluster_windows(segments, timedelta(seconds=settings.context_pad_secs))
+    rows = await db.fetch_windows([(w.start, w.end, w.channel) for w in windows])
+    return build_context(windows, rows, settings.context_token_budget, settings.context_chars_per_token)
+
+
+async def hit_buckets(
+    db: AsyncDBClient,
+    segments: List[SegmentInfo],
+    settings
+) -> Optional[List[BucketSummary]]:
+    """
+    Tapıntıların düşdüyü bucket-lərin əvvəlcədən hazırlanmış xülasələri.
+    Hər hansı bucket-in xülasəsi hələ yoxdursa None.
+    """
+    bucket = timedelta(minutes=settings.rolling_summary_minutes)
+    starts = [datetime.fromisoformat(s.start_time) for s in segments]
+    wanted = {(s.channel, bucket_start(ts, bucket)) for s, ts in zip(segments, starts)}
+    rows = await db.fetch_bucket_summaries(min(starts), max(starts))
+    found = {(b.channel, datetime.fromisoformat(b.start_time)): b for b in rows}
+    if not wanted <= found.keys():
+        return None
+    return [found[k] for k in sorted(wanted, key=lambda k: (k[1], k[0]))]
+
+
+async def run_search(
+    db: AsyncDBClient,
+    ds: AsyncDeepSeekClient,
+    settings,
+    keyword: str,
+    **filters
+) -> SearchResponse:
+    """
+    Seqmentləri tapır. Tapıntıların bucket xülasələri hazırdırsa, LLM yalnız tapılan
+    seqmentlər (context_token_budget-ə sığanlar) üzərində açar sözə fokuslanmış qısa
+    xülasə üçün çağırılır; əks halda kontekst pəncərələri tam xülasə edilir.
+    """
+    segments = await find_segments(db, keyword, **filters)
+    if settings.rolling_summary_enabled:
+        buckets = await hit_buckets(db, segments, settings)
+        if buckets is not None:
+            hits = trim_hits(segments, settings.context_token_budget, settings.context_chars_per_token)
+            summary = await ds.summarize(hits, keyword)
+            return SearchResponse(summary=summary, segments=segments, bucket_summaries=buckets)
+    summary = await ds.summarize_text(await context_text(db, segments, settings))
+    return SearchResponse(summary=summary, segments=segments)
+
+
+def _sse(event: str, data) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+async def stream_search(
+    db: AsyncDBClient,
+    ds: AsyncDeepSeekClient,
+    settings,
+    segments: List[SegmentInfo]
+) -> AsyncIterator[bytes]:
+    """
+    SSE axını: əvvəlcə `segments` hadisəsi dərhal göndərilir, sonra xülasə
+    yarandıqca `summary` hadisələri ilə parça-parça gəlir, sonda `done`. Xülasə alınmasa
+    `summary_error` (brauzerdə "error" EventSource-un bağlantı xətası hadisəsidir).
+    """
+    yield _sse("segments", [s.model_dump() for s in segments])
+    try:
+        context = await context_text(db, segments, settings)
+        async for delta in ds.stream_summary_text(context):
+            yield _sse("summary", {"delta": delta})
+    except Exception as e:
+        logger.error("Xülasə stream xətası: %s", e)
+        yield _sse("summary_error", {"detail": "summary failed"})
+    yield _sse("done", {})
+
+
+async def ndjson_search(
+    db: AsyncDBClient,
+    keyword: str,
+    limit: Optional[int] = None,
+    chunk_rows: int = 200,
+    **filters
+) -> AsyncIterator[bytes]:
+    """
+    NDJSON axını: hər tapıntı bir sətir, server-side cursor-dan gəldikcə seriallaşdırılır
+    (Pydantic yoxdur, orjson). Sətirlər `chunk_rows`-luq parçalarla göndərilir. `limit`
+    dolubsa sonuncu sətir {"next_cursor": …} – növbəti sorğu oradan davam edir.
+    """
+    buf: List[bytes] = []
+    count, last = 0, None
+    async for hit, last in db.iter_search(keyword, limit=limit, **filters):
+        buf.append(orjson.dumps(hit))
+        count += 1
+        if len(buf) >= chunk_rows:
+            yield b"\n".join(buf) + b"\n"
+            buf.clear()
+    if limit and count >= limit:
+        buf.append(orjson.dumps({"next_cursor": last}))
+    if buf:
+        yield b"\n".join(buf) + b"\n"
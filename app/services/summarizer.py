@@ -1,21 +1,202 @@
 # app/services/deepseek_client.py
 
+import json
+import time
+import asyncio
 import requests
 import logging
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
 from app.config import Settings
 from app.api.schemas import SegmentInfo
+from app.services.summary_cache import SummaryCache
+from app.utils.metrics import LLM_REQUESTS, LLM_SECONDS
 
 logger = logging.getLogger(__name__)
 
+
+def summary_prompts(
+    segments: List[SegmentInfo],
+    keyword: Optional[str] = None
+) -> Tuple[str, str]:
+    """
+    Açar sözlə axtarış nəticəsində əldə olunmuş SegmentInfo-lar üçün (system, user) prompt cütü.
+    """
+    full_text = " ".join(seg.text for seg in segments)
+
+    system_prompt = (
+        "Sən transkript mətinlərini xülasə etmək üçün ixtisaslaşmış modelisən. "
+        "Cavabını Azərbaycan dilində, aydın və konkret ver."
+        "Tam olaraq sənə göndərilən mətində nə danışıldığını, nədən bəhsolunuduğu bizə açıqla. əlavə uzadıcı ifadə bildirici sözlər yazma."
+        "Ən sonda isə sintaktik və məna səhvlərinin düzəldilmiş versiyadakı mətini - Verimiş mətn : - deyərək sonda yaz."
+    )
+    if keyword:
+        user_prompt = (
+            f"Verilmiş mətndə “{keyword}” sözü ilə bağlı bütün cümlələri "
+            f"birinəşdirərək 2–3 cümləlik xülasə hazırla:\n\n{full_text}"
+            "Bu mətində verilmiş söz haqqında pozitiv mi, neqativmi yoxsa neytalmı fikir bildirildiyini bizə de."
+            "Tam olaraq sənə göndərilən mətində nə danışıldığını, nədən bəhsolunuduğu bizə açıqla. əlavə uzadıcı ifadə bildirici sözlər yazma."
+            "Ən sonda isə sintaktik və məna səhvlərinin düzəldilmiş versiyadakı mətini - Verimiş mətn : - deyərək sonda yaz."
+        )
+    else:
+        user_prompt = (
+            f"Aşağıdakı transkripti oxu və əsas məqamları qısa, nöqtəli bəndlərlə ver:\n\n{full_text}"
+        )
+    return system_prompt, user_prompt
+
+
+def text_prompts(text: str) -> Tuple[str, str]:
+    """
+    Uzun mətn parçası (transkript deyil) üçün (system, user) prompt cütü.
+    """
+    system_prompt = (
+        "Sən mətnləri qısa və konkret xülasə etmək üçün ixtisaslaşmış modelisən. "
+        "Cavabını Azərbaycan dilində ver."
+    )
+    user_prompt = f"Aşağıdakı mətni qısa, nöqtəli bəndlərlə xülasə et:\n\n{text}"
+    return system_prompt, user_prompt
+
+
+def reduce_prompts(summaries: List[str]) -> Tuple[str, str]:
+    """
+    Ayrı-ayrı parçaların qismən xülasələrini bir xülasədə birləşdirmək üçün (system, user) cütü.
+    """
+    system_prompt = (
+        "Sən bir mətnin ardıcıl hissələrinin xülasələrini vahid xülasədə birləşdirirsən. "
+        "Cavabını Azərbaycan dilində ver."
+    )
+    parts = "\n\n".join(f"Hissə {i + 1}:\n{text}" for i, text in enumerate(summaries))
+    user_prompt = (
+        "Aşağıdakı hissə xülasələrini təkrarları ataraq vahid, qısa, nöqtəli bəndli "
+        f"xülasədə birləşdir:\n\n{parts}"
+    )
+    return system_prompt, user_prompt
+
+
+def split_chunks(text: str, max_tokens: int, chars_per_token: float) -> List[str]:
+    """
+    Mətni seqment sərhədlərində (sətirlərdə) token limitli parçalara bölür.
+    Limitdən uzun tək sətir sözlər üzrə bölünür.
+    """
+    limit = max(int(max_tokens * chars_per_token), 1)
+    chunks: List[str] = []
+    buf: List[str] = []
+    size = 0
+
+    def pieces(line: str):
+        if len(line) <= limit:
+            yield line
+            return
+        piece: List[str] = []
+        n = 0
+        for word in line.split():
+            if piece and n + len(word) + 1 > limit:
+                yield " ".join(piece)
+                piece, n = [], 0
+            piece.append(word)
+            n += len(word) + 1
+        if piece:
+            yield " ".join(piece)
+
+    for line in text.splitlines():
+        for piece in pieces(line):
+            if buf and size + len(piece) + 1 > limit:
+                chunks.append("\n".join(buf))
+                buf, size = [], 0
+            buf.append(piece)
+            size += len(piece) + 1
+    if buf:
+        chunks.append("\n".join(buf))
+    return chunks
+
+
+def _groups(items: List[str], size: int) -> List[List[str]]:
+    size = max(size, 2)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _payload(model: str, system_prompt: str, user_prompt: str, stream: bool = False) -> dict:
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user",   "content": user_prompt}
+        ],
+        "max_tokens": 1024,
+        "temperature": 0.3,
+        "stream": stream
+    }
+
+
+# Təkrar cəhd edilən cavab statusları
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
 class DeepSeekClient:
     """
     DeepSeek API ilə əlaqə saxlayır, həm tam transkriptləri, həm də açar sözə fokuslanmış xülasələri hazırlayır.
     """
 
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, cache: Optional[SummaryCache] = None):
         self.api_url = settings.deepseek_api_url
         self.api_key = settings.deepseek_key
+        self.model   = settings.deepseek_model
+        self.timeout = (settings.deepseek_connect_timeout, settings.deepseek_timeout)
+        self.cache   = cache
+        self.max_retries     = settings.deepseek_max_retries
+        self.backoff         = settings.deepseek_retry_backoff
+        self.chunk_tokens    = settings.summary_chunk_tokens
+        self.chars_per_token = settings.context_chars_per_token
+        self.concurrency     = settings.summary_map_concurrency
+        self.fanin           = settings.summary_reduce_fanin
+        self._session = requests.Session()
+
+    def _complete(self, system_prompt: str, user_prompt: str) -> str:
+        """
+        Chat completion çağırışı. Cache varsa eyni prompt/model/mətn üçün
+        nəticə təkrar istifadə olunur və paralel eyni sorğular birləşdirilir.
+        """
+        payload = _payload(self.model, system_prompt, user_prompt)
+        if self.cache is None:
+            return self._post(payload)
+        key = SummaryCache.make_key(self.model, system_prompt, user_prompt)
+        return self.cache.get_or_compute(key, lambda: self._post(payload))
+
+    def _post(self, payload: dict) -> str:
+        with LLM_SECONDS.labels(client="sync", kind="complete").time():
+            return self._post_retrying(payload)
+
+    def _post_retrying(self, payload: dict) -> str:
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "Accept": "application/json"
+        }
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                resp = self._session.post(self.api_url, headers=headers, json=payload, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    LLM_REQUESTS.labels(result="error").inc()
+                    logger.error("DeepSeek API əlçatan deyil: %s", e)
+                    raise RuntimeError("DeepSeek API error") from e
+                LLM_REQUESTS.labels(result="retry").inc()
+                logger.warning("DeepSeek sorğusu alınmadı (%s), təkrar #%d", e, attempt + 1)
+            else:
+                if resp.status_code == 200:
+                    LLM_REQUESTS.labels(result="ok").inc()
+                    return resp.json()["choices"][0]["message"]["content"]
+                if resp.status_code not in _RETRY_STATUS or attempt == self.max_retries:
+                    LLM_REQUESTS.labels(result="error").inc()
+                    logger.error("DeepSeek API error %s: %s", resp.status_code, resp.text)
+                    raise RuntimeError("DeepSeek API error")
+                LLM_REQUESTS.labels(result="retry").inc()
+                logger.warning("DeepSeek API %s, təkrar #%d", resp.status_code, attempt + 1)
+            time.sleep(self.backoff * 2 ** attempt)
 
     def summarize(
         self,
@@ -27,79 +208,197 @@ class DeepSeekClient:
         Əgər `keyword` verilibsə, o söz ətrafında 2–3 cümləlik fokuslanmış xülasə,
         yoxdursa ümumi nöqtəli bəndli xülasə qaytarır.
         """
-        full_text = " ".join(seg.text for seg in segments)
+        return self._complete(*summary_prompts(segments, keyword))
 
-        system_prompt = (
-            "Sən transkript mətinlərini xülasə etmək üçün ixtisaslaşmış modelisən. "
-            "Cavabını Azərbaycan dilində, aydın və konkret ver."
-            "Tam olaraq sənə göndərilən mətində nə danışıldığını, nədən bəhsolunuduğu bizə açıqla. əlavə uzadıcı ifadə bildirici sözlər yazma."
-            "Ən sonda isə sintaktik və məna səhvlərinin düzəldilmiş versiyadakı mətini - Verimiş mətn : - deyərək sonda yaz."
+    def summarize_text(self, text: str) -> str:
+        """
+        Yalnız uzun bir mətn parçasını (transkript deyil) xülasə etmək üçün istifadə olunur.
+        Mətn bir parçaya sığmırsa map-reduce: parçalar paralel xülasə edilir, sonra
+        qismən xülasələr `summary_reduce_fanin`-lik qruplarla bir xülasə qalana qədər birləşdirilir.
+        """
+        chunks = split_chunks(text, self.chunk_tokens, self.chars_per_token)
+        if len(chunks) <= 1:
+            return self._complete(*text_prompts(text))
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            parts = list(pool.map(lambda c: self._complete(*text_prompts(c)), chunks))
+            while len(parts) > 1:
+                parts = list(pool.map(lambda g: self._complete(*reduce_prompts(g)), _groups(parts, self.fanin)))
+        return parts[0]
+
+
+class AsyncDeepSeekClient:
+    """
+    DeepSeekClient-in async variantı: bütün sorğular bir keep-alive httpx.AsyncClient
+    üzərindən gedir, timeout və retry var, xülasə token-token stream oluna bilər.
+    """
+
+    def __init__(self, settings: Settings, cache: Optional[SummaryCache] = None):
+        self.api_url     = settings.deepseek_api_url
+        self.api_key     = settings.deepseek_key
+        self.model       = settings.deepseek_model
+        self.max_retries = settings.deepseek_max_retries
+        self.backoff     = settings.deepseek_retry_backoff
+        self.cache       = cache
+        self.chunk_tokens    = settings.summary_chunk_tokens
+        self.chars_per_token = settings.context_chars_per_token
+        self.fanin           = settings.summary_reduce_fanin
+        self._map_slots  = asyncio.Semaphore(settings.summary_map_concurrency)
+        self._timeout = httpx.Timeout(settings.deepseek_timeout, connect=settings.deepseek_connect_timeout)
+        self._limits  = httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_connections
         )
-        if keyword:
-            user_prompt = (
-                f"Verilmiş mətndə “{keyword}” sözü ilə bağlı bütün cümlələri "
-                f"birinəşdirərək 2–3 cümləlik xülasə hazırla:\n\n{full_text}"
-                "Bu mətində verilmiş söz haqqında pozitiv mi, neqativmi yoxsa neytalmı fikir bildirildiyini bizə de."
-                "Tam olaraq sənə göndərilən mətində nə danışıldığını, nədən bəhsolunuduğu bizə açıqla. əlavə uzadıcı ifadə bildirici sözlər yazma."
-                "Ən sonda isə sintaktik və məna səhvlərinin düzəldilmiş versiyadakı mətini - Verimiş mətn : - deyərək sonda yaz."
-            )
-        else:
-            user_prompt = (
-                f"Aşağıdakı transkripti oxu və əsas məqamları qısa, nöqtəli bəndlərlə ver:\n\n{full_text}"
+        self._client: Optional[httpx.AsyncClient] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self._timeout,
+                limits=self._limits,
+                headers={"Authorization": f"Bearer {self.api_key}"}
             )
+        return self._client
 
-        payload = {
-            "model": "deepseek-chat",
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user",   "content": user_prompt}
-            ],
-            "max_tokens": 1024,
-            "temperature": 0.3,
-            "stream": False
-        }
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        }
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
-        resp = requests.post(self.api_url, headers=headers, json=payload)
-        if resp.status_code != 200:
-            logger.error("DeepSeek API error %s: %s", resp.status_code, resp.text)
-            raise RuntimeError("DeepSeek API error")
+    async def _retrying(self, send):
+        """`send()` çağırışını şəbəkə xətası və 429/5xx cavablarında backoff ilə təkrarlayır."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                resp = await send()
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    LLM_REQUESTS.labels(result="error").inc()
+                    logger.error("DeepSeek API əlçatan deyil: %s", e)
+                    raise RuntimeError("DeepSeek API error") from e
+                LLM_REQUESTS.labels(result="retry").inc()
+                logger.warning("DeepSeek sorğusu alınmadı (%s), təkrar #%d", e, attempt + 1)
+            else:
+                if resp.status_code == 200:
+                    LLM_REQUESTS.labels(result="ok").inc()
+                    return resp
+                body = (await resp.aread()).decode("utf-8", "replace")
+                await resp.aclose()
+                if resp.status_code not in _RETRY_STATUS or attempt == self.max_retries:
+                    LLM_REQUESTS.labels(result="error").inc()
+                    logger.error("DeepSeek API error %s: %s", resp.status_code, body)
+                    raise RuntimeError("DeepSeek API error")
+                LLM_REQUESTS.labels(result="retry").inc()
+                logger.warning("DeepSeek API %s, təkrar #%d", resp.status_code, attempt + 1)
+            await asyncio.sleep(self.backoff * 2 ** attempt)
 
-        return resp.json()["choices"][0]["message"]["content"]
+    async def _post(self, payload: dict) -> str:
+        with LLM_SECONDS.labels(client="async", kind="complete").time():
+            resp = await self._retrying(lambda: self.client.post(self.api_url, json=payload))
+            return resp.json()["choices"][0]["message"]["content"]
 
-    def summarize_text(self, text: str) -> str:
+    async def _cached(self, key: str) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return await asyncio.to_thread(self.cache.get, key)
+
+    async def _store(self, key: str, value: str):
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put, key, value)
+
+    async def _complete(self, system_prompt: str, user_prompt: str) -> str:
+        key = SummaryCache.make_key(self.model, system_prompt, user_prompt)
+        cached = await self._cached(key)
+        if cached is not None:
+            return cached
+
+        # Eyni açar üçün artıq gedən sorğu varsa, onu gözləyirik
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            value = await self._post(_payload(self.model, system_prompt, user_prompt))
+            await self._store(key, value)
+            fut.set_result(value)
+            return value
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # gözləyən yoxdursa "never retrieved" xəbərdarlığı olmasın
+            raise
+        except BaseException:
+            fut.cancel()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _stream(self, system_prompt: str, user_prompt: str) -> AsyncIterator[str]:
         """
-        Yalnız uzun bir mətn parçasını (transkript deyil) xülasə etmək üçün istifadə olunur.
+        Xülasəni upstream-dən `"stream": True` ilə parça-parça qaytarır.
+        Cache-də varsa bütöv mətn bir parça kimi gəlir; tam cavab sonda cache-ə yazılır.
         """
-        system_prompt = (
-            "Sən mətnləri qısa və konkret xülasə etmək üçün ixtisaslaşmış modelisən. "
-            "Cavabını Azərbaycan dilində ver."
-        )
-        user_prompt = f"Aşağıdakı mətni qısa, nöqtəli bəndlərlə xülasə et:\n\n{text}"
-
-        payload = {
-            "model": "deepseek-chat",
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user",   "content": user_prompt}
-            ],
-            "max_tokens": 1024,
-            "temperature": 0.3,
-            "stream": False
-        }
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        }
+        key = SummaryCache.make_key(self.model, system_prompt, user_prompt)
+        cached = await self._cached(key)
+        if cached is not None:
+            yield cached
+            return
+
+        payload = _payload(self.model, system_prompt, user_prompt, stream=True)
+        request = self.client.build_request("POST", self.api_url, json=payload)
+        t0 = time.perf_counter()
+        resp = await self._retrying(lambda: self.client.send(request, stream=True))
+        LLM_SECONDS.labels(client="async", kind="stream_ttfb").observe(time.perf_counter() - t0)
+        parts: List[str] = []
+        try:
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        finally:
+            await resp.aclose()
+            LLM_SECONDS.labels(client="async", kind="stream").observe(time.perf_counter() - t0)
+        await self._store(key, "".join(parts))
+
+    async def summarize(self, segments: List[SegmentInfo], keyword: Optional[str] = None) -> str:
+        return await self._complete(*summary_prompts(segments, keyword))
+
+    async def _bounded(self, system_prompt: str, user_prompt: str) -> str:
+        async with self._map_slots:
+            return await self._complete(system_prompt, user_prompt)
 
-        resp = requests.post(self.api_url, headers=headers, json=payload)
-        if resp.status_code != 200:
-            logger.error("DeepSeek API error %s: %s", resp.status_code, resp.text)
-            raise RuntimeError("DeepSeek API error")
+    async def _map_reduce(self, chunks: List[str]) -> List[str]:
+        """
+        Parçaları paralel (semaphore ilə məhdud) xülasə edir və qismən xülasələri
+        son reduce addımına qədər birləşdirir: qaytarılan siyahı bir sorğuya sığır.
+        """
+        parts = await asyncio.gather(*(self._bounded(*text_prompts(c)) for c in chunks))
+        while len(parts) > self.fanin:
+            parts = await asyncio.gather(
+                *(self._bounded(*reduce_prompts(g)) for g in _groups(parts, self.fanin))
+            )
+        return list(parts)
 
-        return resp.json()["choices"][0]["message"]["content"]
+    async def summarize_text(self, text: str) -> str:
+        chunks = split_chunks(text, self.chunk_tokens, self.chars_per_token)
+        if len(chunks) <= 1:
+            return await self._complete(*text_prompts(text))
+        return await self._complete(*reduce_prompts(await self._map_reduce(chunks)))
+
+    async def stream_summary_text(self, text: str) -> AsyncIterator[str]:
+        """Uzun mətndə map addımları gözlənilir, yalnız son reduce stream olunur."""
+        chunks = split_chunks(text, self.chunk_tokens, self.chars_per_token)
+        if len(chunks) <= 1:
+            prompts = text_prompts(text)
+        else:
+            prompts = reduce_prompts(await self._map_reduce(chunks))
+        async for delta in self._stream(*prompts):
+            yield delta
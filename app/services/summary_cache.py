@@ -0,0 +1,165 @@
+# app/services/summary_cache.py
+
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """Eyni açar üçün gedən yeganə upstream sorğu."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class SummaryCache:
+    """
+    DeepSeek xülasələri üçün content-addressed cache.
+
+    Açar prompt, model və mətnin sha256-sıdır. Əvvəlcə prosesdaxili LRU (TTL ilə),
+    sonra DB-dəki `summary_cache` cədvəli yoxlanılır. Eyni açar üçün paralel gələn
+    sorğular bir upstream çağırışında birləşdirilir (single-flight).
+    """
+
+    def __init__(self, settings, db=None):
+        self.max_entries = settings.summary_cache_size
+        self.ttl         = settings.summary_cache_ttl
+        self._db         = db
+
+        self._entries  = OrderedDict()   # key → (expires_at, summary)
+        self._inflight = {}              # key → _Flight
+        self._lock     = threading.Lock()
+
+        self.hits            = 0
+        self.persistent_hits = 0
+        self.misses          = 0
+        self.coalesced       = 0
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, user_prompt: str) -> str:
+        h = hashlib.sha256()
+        for part in (model, system_prompt, user_prompt):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _put_memory(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_persistent(self, key: str) -> Optional[str]:
+        if self._db is None:
+            return None
+        try:
+            return self._db.get_cached_summary(key, self.ttl)
+        except Exception as e:
+            logger.warning("Summary cache oxunmadı: %s", e)
+            return None
+
+    def _put_persistent(self, key: str, value: str):
+        if self._db is None:
+            return
+        try:
+            self._db.put_cached_summary(key, value)
+        except Exception as e:
+            logger.warning("Summary cache yazılmadı: %s", e)
+
+    def get(self, key: str) -> Optional[str]:
+        """Cache-dən oxuyur (yaddaş, sonra DB); upstream çağırmır."""
+        value = self._get_memory(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            return value
+        value = self._get_persistent(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.persistent_hits += 1
+        if value is not None:
+            self._put_memory(key, value)
+        return value
+
+    def put(self, key: str, value: str):
+        self._put_memory(key, value)
+        self._put_persistent(key, value)
+
+    def get_or_compute(self, key: str, compute: Callable[[], str]) -> str:
+        """
+        Cache-də varsa qaytarır, yoxdursa `compute()` çağırır. Eyni açar üçün
+        eyni anda gələn digər thread-lər həmin nəticəni gözləyir.
+        """
+        value = self._get_memory(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = self._get_persistent(key)
+            if value is not None:
+                with self._lock:
+                    self.persistent_hits += 1
+            else:
+                with self._lock:
+                    self.misses += 1
+                value = compute()
+                self._put_persistent(key, value)
+            self._put_memory(key, value)
+            flight.value = value
+            return value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries":         len(self._entries),
+                "hits":            self.hits,
+                "persistent_hits": self.persistent_hits,
+                "misses":          self.misses,
+                "coalesced":       self.coalesced,
+                "inflight":        len(self._inflight),
+            }
@@ -1,70 +1,358 @@
 #!/usr/bin/env python3
 import os
+import time
+import queue
+import bisect
 import datetime
-from typing import List
+from typing import Iterator, List, Optional, Union
 
-from faster_whisper import WhisperModel
+import numpy as np
+
+from faster_whisper import WhisperModel, BatchedInferencePipeline, decode_audio
+from faster_whisper.vad import VadOptions, get_speech_timestamps
 from app.api.schemas import SegmentInfo
+from app.services.archiver import AudioSegment, SAMPLE_RATE
+from app.utils.metrics import DECODE_SECONDS
+
+# Batched pipeline-ın öz VAD parametrləri: nitq hissələri 30s-lik chunk-lara birləşir
+_BATCH_VAD = VadOptions(max_speech_duration_s=30, min_silence_duration_ms=160)
+
+
+def ts_filename(source: Union[str, np.ndarray], index: Optional[int]) -> str:
+    """Seqment nömrəsindən TS fayl adı: idx=12 → "segment_00012.ts"."""
+    if index is None:
+        # misal: "segment_012.wav" → 12
+        basename = os.path.basename(source)
+        index = int(basename.split('_')[1].split('.')[0])
+    return f"segment_{index:05d}.ts"
+
+
+def _segment_info(start_ts: float, start: float, end: float,
+                  text: str, ts_file: str, words=None) -> SegmentInfo:
+    """
+    Seqment daxilindəki nisbi zamanlardan SegmentInfo qurur.
+    `words` – (start, end, söz) start_ts-ə nisbətən; seqmentin başlanğıcına nisbətən saxlanılır.
+    """
+    # Absolyut başlanğıc və son zamanlarını hesabla
+    abs_start = datetime.datetime.fromtimestamp(
+        start_ts + start, datetime.timezone.utc
+    )
+    abs_end = datetime.datetime.fromtimestamp(
+        start_ts + end, datetime.timezone.utc
+    )
+    return SegmentInfo(
+        start_time       = abs_start.isoformat(),
+        end_time         = abs_end.isoformat(),
+        text             = text.strip(),
+        segment_filename = ts_file,
+        offset_secs      = float(start),
+        duration_secs    = float(end - start),
+        words            = [
+            (float(ws - start), float(we - start), w.strip()) for ws, we, w in words
+        ] if words else None
+    )
 
 
 class Transcriber:
     """
-    WAV faylını Whisper vasitəsilə transkripsiya edən sinif.
+    WAV faylını və ya PCM massivini Whisper vasitəsilə transkripsiya edən sinif.
     """
 
-    def __init__(self, settings):
-        # Whisper modelini yükle
+    def __init__(self, settings, model: Optional[str] = None, compute_type: Optional[str] = None):
+        # Bir neçə worker eyni modeli paralel istifadə edə bilsin (kanallar arasında ortaq)
+        model_opts = {"num_workers": max(1, settings.transcribe_workers)}
+        if settings.device == "cpu" and settings.cpu_profile and model is None:
+            # CPU profili: model, quantization və thread düzülüşü kalibrasiya ilə seçilir
+            from app.services.calibration import load_or_calibrate
+            profile = load_or_calibrate(settings)
+            if profile is not None:
+                model, compute_type = profile["model"], profile["compute_type"]
+                model_opts = {"cpu_threads": profile["cpu_threads"], "num_workers": profile["num_workers"]}
+        # Neçə worker thread-i işə salınmalıdır (CPU profilində ölçülən düzülüş)
+        self.workers = model_opts["num_workers"]
+
+        # Whisper modelini yükle (model/compute_type verilibsə settings-i əvəz edir)
         self.model = WhisperModel(
-            settings.whisper_model,
+            model or settings.whisper_model,
             device=settings.device,
-            compute_type=settings.compute_type
+            compute_type=compute_type or settings.compute_type,
+            **model_opts
         )
+        self._batched = None
+        self.word_timestamps = settings.word_timestamps
 
-    def transcribe(self, wav_path: str, start_ts: float) -> List[SegmentInfo]:
+    def transcribe(
+        self,
+        source: Union[str, np.ndarray],
+        start_ts: float,
+        index: Optional[int] = None,
+        beam_size: int = 4,
+        best_of: int = 4
+    ) -> List[SegmentInfo]:
         """
-        Verilmiş WAV yolunu transkripsiya edir və hər bir tapılmış
-        seqment üçün SegmentInfo siyahısı qaytarır.
+        Verilmiş WAV yolunu və ya 16 kHz float32 PCM massivini transkripsiya edir
+        və hər bir tapılmış seqment üçün SegmentInfo siyahısı qaytarır.
 
-        :param wav_path: Lokal WAV faylının tam yolu
+        :param source: Lokal WAV faylının tam yolu və ya PCM massivi
         :param start_ts: Seqmentin başladığı epoch ilə ifadə olunan zaman
+        :param index: Seqment nömrəsi; verilməyibsə WAV fayl adından çıxarılır
+        :param beam_size: Beam search eni (1 – greedy)
+        :param best_of: Sampling namizədlərinin sayı
         :return: List[SegmentInfo]
         """
-        # Whisper transcribe çağırışı
+        ts_file = ts_filename(source, index)
+
+        # Whisper transcribe çağırışı (generator – dekod siyahı qurularkən gedir)
+        with DECODE_SECONDS.labels(mode="single").time():
+            segments, _ = self.model.transcribe(
+                source,
+                language="az",
+                beam_size=beam_size,
+                best_of=best_of,
+                vad_filter=True,
+                word_timestamps=self.word_timestamps
+            )
+
+            return [
+                _segment_info(
+                    start_ts, seg.start, seg.end, seg.text, ts_file,
+                    [(w.start, w.end, w.word) for w in seg.words] if seg.words else None
+                )
+                for seg in segments
+            ]
+
+    def transcribe_batch(
+        self,
+        batch: List[AudioSegment],
+        beam_size: int = 4,
+        best_of: int = 4
+    ) -> List[List[SegmentInfo]]:
+        """
+        Bir neçə seqmenti faster-whisper-in batched pipeline-ı ilə bir çağırışda
+        transkripsiya edir. Hər mənbə seqmentin nitq hissələri ayrıca clip kimi verilir,
+        nəticələr isə sıra ilə hər seqmentə geri paylanır.
+
+        :param batch: Archiver-dən gələn AudioSegment-lər
+        :param beam_size: Beam search eni (1 – greedy)
+        :param best_of: Sampling namizədlərinin sayı
+        :return: hər seqment üçün ayrıca List[SegmentInfo]
+        """
+        if self._batched is None:
+            self._batched = BatchedInferencePipeline(model=self.model)
+
+        audios = [
+            seg.source if isinstance(seg.source, np.ndarray)
+            else decode_audio(seg.source, sampling_rate=SAMPLE_RATE)
+            for seg in batch
+        ]
+        bounds = [0]
+        for a in audios:
+            bounds.append(bounds[-1] + len(a))
+
+        # clip_timestamps verildikdə pipeline VAD-ı keçir, ona görə VAD hər mənbəyə ayrıca
+        # tətbiq olunur (tək rejimdəki vad_filter=True kimi sükut/musiqi dekod olunmur).
+        # Nitq hissələri yalnız öz mənbəyi daxilində birləşdirilir, heç bir clip seqment
+        # sərhədini keçmir – nəticənin ortası həmişə öz mənbəyinə düşür. Pipeline
+        # clip_timestamps-i saniyə ilə gözləyir.
+        clips = []
+        for i, audio in enumerate(audios):
+            if not len(audio):
+                continue
+            speech = get_speech_timestamps(audio, _BATCH_VAD)
+            clips += [
+                {"start": (bounds[i] + c["start"]) / SAMPLE_RATE,
+                 "end":   (bounds[i] + c["end"]) / SAMPLE_RATE}
+                for c in merge_speech(speech, _BATCH_VAD.max_speech_duration_s * SAMPLE_RATE)
+            ]
+        result: List[List[SegmentInfo]] = [[] for _ in batch]
+        if not clips:
+            return result
+
+        t0 = time.perf_counter()
+        segments, _ = self._batched.transcribe(
+            np.concatenate(audios),
+            language="az",
+            beam_size=beam_size,
+            best_of=best_of,
+            batch_size=len(batch),
+            clip_timestamps=clips,
+            without_timestamps=False,
+            word_timestamps=self.word_timestamps
+        )
+
+        ts_files = [ts_filename(seg.source, seg.index) for seg in batch]
+        for seg in segments:
+            # Seqmentin ortası hansı mənbəyə düşürsə, ona aiddir
+            mid = (seg.start + seg.end) / 2 * SAMPLE_RATE
+            i = min(bisect.bisect_right(bounds, mid) - 1, len(batch) - 1)
+            base = bounds[i] / SAMPLE_RATE
+            result[i].append(_segment_info(
+                batch[i].start_ts, seg.start - base, seg.end - base,
+                seg.text, ts_files[i],
+                [(w.start - base, w.end - base, w.word) for w in seg.words] if seg.words else None
+            ))
+        DECODE_SECONDS.labels(mode="batch").observe(time.perf_counter() - t0)
+        return result
+
+
+def merge_speech(speech: List[dict], max_len: float) -> List[dict]:
+    """
+    Ardıcıl nitq hissələrini (sample) uzunluğu `max_len`-i keçməyən clip-lərə birləşdirir.
+    Tək hissə `max_len`-dən uzundursa olduğu kimi qalır.
+    """
+    merged: List[dict] = []
+    for chunk in speech:
+        if merged and chunk["end"] - merged[-1]["start"] <= max_len:
+            merged[-1]["end"] = chunk["end"]
+        else:
+            merged.append({"start": chunk["start"], "end": chunk["end"]})
+    return merged
+
+
+class SegmentBatcher:
+    """
+    Archiver queue-dan seqmentləri partiyalarla götürür: ilk seqmenti gözləyir,
+    sonra `max_wait` saniyə ərzində `batch_size`-a qədər əlavə seqment yığır.
+    Backlog böyüdükcə partiyalar dolu gəlir, canlı rejimdə isə gecikmə `max_wait`-dan artıq olmur.
+    """
+
+    def __init__(self, source: "queue.Queue", batch_size: int, max_wait: float):
+        self.queue      = source
+        self.batch_size = max(1, batch_size)
+        self.max_wait   = max_wait
+
+    def __iter__(self) -> Iterator[List[AudioSegment]]:
+        while True:
+            first = self.queue.get()
+            if first is None:
+                return
+
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    yield batch
+                    return
+                batch.append(item)
+            yield batch
+
+
+class StreamingDecoder:
+    """
+    Ardıcıl audio pəncərələrini kontekstlə dekod edir ki, seqment sərhədindəki
+    sözlər kəsilməsin və iki dəfə yazılmasın.
+
+    Hər pəncərənin son `holdback` saniyəsindəki sözlər hələ qəti sayılmır: onların
+    audiosu növbəti pəncərənin əvvəlinə qoşulur. Artıq emit olunmuş sözlər (zamana görə)
+    bir daha emit olunmur, əvvəlki mətnin sonu isə `initial_prompt` kimi verilir.
+    """
+
+    def __init__(self, transcriber: Transcriber, settings):
+        self.model        = transcriber.model
+        self.keep_words   = transcriber.word_timestamps
+        self.holdback     = settings.stream_holdback_secs
+        self.max_tail     = settings.stream_max_tail_secs
+        self.prompt_chars = settings.stream_prompt_chars
+
+        self._tail          = np.zeros(0, dtype=np.float32)
+        self._tail_start_ts = 0.0
+        self._committed     = 0.0     # son emit olunmuş sözün sonu (epoch)
+        self._prompt        = ""
+        self._prev_file     = None    # (start_ts, ts_file) – əvvəlki pəncərə
+        self._cur_file      = None
+
+    def _file_for(self, ts: float):
+        """Sözün düşdüyü TS faylı və həmin faylın başlanğıc zamanı."""
+        if self._prev_file and ts < self._cur_file[0]:
+            return self._prev_file
+        return self._cur_file
+
+    def feed(
+        self,
+        source: Union[str, np.ndarray],
+        start_ts: float,
+        index: Optional[int] = None,
+        final: bool = False
+    ) -> List[SegmentInfo]:
+        """
+        Növbəti audio pəncərəsini dekod edir və yalnız yeni, qəti sözlərdən
+        qurulmuş SegmentInfo-ları qaytarır.
+        """
+        audio = source if isinstance(source, np.ndarray) else decode_audio(source, sampling_rate=SAMPLE_RATE)
+        if index is not None or isinstance(source, str):
+            self._prev_file, self._cur_file = self._cur_file, (start_ts, ts_filename(source, index))
+
+        # Əvvəlki quyruq bu pəncərəyə bitişik deyilsə (boşluq), onu atırıq
+        tail_end = self._tail_start_ts + len(self._tail) / SAMPLE_RATE
+        if len(self._tail) and abs(tail_end - start_ts) > 1.0:
+            self._tail = self._tail[:0]
+        if len(self._tail):
+            buf, buf_ts = np.concatenate([self._tail, audio]), self._tail_start_ts
+        else:
+            buf, buf_ts = audio, start_ts
+        if len(buf) == 0:
+            return []
+
+        t0 = time.perf_counter()
         segments, _ = self.model.transcribe(
-            wav_path,
+            buf,
             language="az",
             beam_size=4,
             best_of=4,
-            vad_filter=True
+            vad_filter=True,
+            word_timestamps=True,
+            condition_on_previous_text=False,
+            initial_prompt=self._prompt or None
         )
 
+        buf_end = buf_ts + len(buf) / SAMPLE_RATE
+        cutoff  = buf_end if final else buf_end - self.holdback
+        pending = None
         result: List[SegmentInfo] = []
         for seg in segments:
-            # Absolyut başlanğıc və son zamanlarını hesabla
-            abs_start_ts = start_ts + seg.start
-            abs_end_ts   = start_ts + seg.end
-
-            abs_start = datetime.datetime.fromtimestamp(
-                abs_start_ts, datetime.timezone.utc
-            )
-            abs_end = datetime.datetime.fromtimestamp(
-                abs_end_ts, datetime.timezone.utc
-            )
+            words = []
+            for w in seg.words or []:
+                ws, we = buf_ts + w.start, buf_ts + w.end
+                if ws < self._committed - 0.05:
+                    continue                      # artıq emit olunub
+                if we > cutoff:
+                    pending = ws if pending is None else pending
+                    continue                      # növbəti pəncərədə qərar veriləcək
+                words.append((ws, we, w.word))
+            if not words:
+                continue
 
-            # .wav fayl adından TS fayl adını çıxar
-            # misal: "segment_012.wav" → idx=12 → "segment_00012.ts"
-            basename = os.path.basename(wav_path)
-            idx = int(basename.split('_')[1].split('.')[0])
-            ts_file = f"segment_{idx:05d}.ts"
-
-            # SegmentInfo obyektini doldur
-            result.append(SegmentInfo(
-                start_time       = abs_start.isoformat(),
-                end_time         = abs_end.isoformat(),
-                text             = seg.text.strip(),
-                segment_filename = ts_file,
-                offset_secs      = float(seg.start),
-                duration_secs    = float(seg.end - seg.start)
+            file_ts, ts_file = self._file_for(words[0][0])
+            result.append(_segment_info(
+                file_ts, words[0][0] - file_ts, words[-1][1] - file_ts,
+                "".join(w[2] for w in words), ts_file,
+                [(ws - file_ts, we - file_ts, w) for ws, we, w in words] if self.keep_words else None
             ))
+            self._committed = words[-1][1]
+        DECODE_SECONDS.labels(mode="stream").observe(time.perf_counter() - t0)
+
+        if result:
+            text = (self._prompt + " " + " ".join(s.text for s in result)).strip()
+            self._prompt = text[-self.prompt_chars:]
 
+        # Qəti olmayan hissənin audiosunu saxlayırıq (ring slotu azad olunacaq, ona görə copy)
+        tail_from = pending if pending is not None else max(cutoff, self._committed)
+        tail_from = max(tail_from, buf_end - self.max_tail)
+        offset = min(max(int((tail_from - buf_ts) * SAMPLE_RATE), 0), len(buf))
+        self._tail = buf[offset:].copy() if not final else buf[:0].copy()
+        self._tail_start_ts = buf_ts + offset / SAMPLE_RATE
         return result
+
+    def flush(self) -> List[SegmentInfo]:
+        """Stream bitəndə qalan quyruğu qəti şəkildə dekod edir."""
+        if not len(self._tail):
+            return []
+        tail_end = self._tail_start_ts + len(self._tail) / SAMPLE_RATE
+        return self.feed(np.zeros(0, dtype=np.float32), tail_end, final=True)
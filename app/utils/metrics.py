@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Pipeline mərhələlərinin Prometheus metrikləri (prometheus_client).
+
+Ingest metrikləri Service.py prosesində (metrics_port), API-nin metrikləri
+API-nin /metrics endpoint-ində görünür:
+
+    DECODE_SECONDS.labels(mode="batch").observe(1.2)
+    with DB_SECONDS.labels(op="insert", client="sync").time():
+        ...
+"""
+from typing import Callable, Dict
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.exposition import MetricsHandler
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+CAPTURE_WAIT_SECONDS = Histogram(
+    "hls_capture_wait_seconds", "Növbəti audio seqmentinin (WAV faylı/PCM parça) gözləmə müddəti",
+    ["channel", "mode"]
+)
+DECODE_SECONDS = Histogram(
+    "hls_whisper_decode_seconds", "Whisper dekod müddəti, çağırış başına",
+    ["mode"], buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+)
+DECODED_AUDIO_SECONDS = Counter(
+    "hls_whisper_audio_seconds", "Dekod olunmuş audio (saniyə)"
+)
+LIVE_LAG_SECONDS = Gauge(
+    "hls_live_lag_seconds", "Son yazılmış seqmentin canlı yayımdan geriliyi", ["channel"]
+)
+SEGMENTS_TOTAL = Counter(
+    "hls_segments", "İşlənmiş audio seqmentləri, nəticəyə görə", ["channel", "result"]
+)
+DB_SECONDS = Histogram(
+    "hls_db_seconds", "DB sorğu və insert müddətləri", ["op", "client"]
+)
+LLM_SECONDS = Histogram(
+    "hls_llm_request_seconds", "DeepSeek sorğularının müddəti (retry-lər daxil)",
+    ["client", "kind"], buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+)
+LLM_REQUESTS = Counter(
+    "hls_llm_requests", "DeepSeek sorğuları, nəticəyə görə", ["result"]
+)
+CLIP_FFMPEG_SECONDS = Histogram(
+    "hls_clip_ffmpeg_seconds", "/video_clip/ ffmpeg: spawn-dan ilk bayta (ttfb) və sona qədər (total)",
+    ["stage"]
+)
+CLIP_REQUESTS = Counter(
+    "hls_clip_requests", "Klip sorğuları: cache hit/miss", ["cache"]
+)
+CLIP_FFMPEG_ACTIVE = Gauge(
+    "hls_clip_ffmpeg_active", "İşləyən remux ffmpeg prosesləri"
+)
+
+
+class _BacklogCollector:
+    """Kanal başına növbə uzunluğu, scrape zamanı oxunur (Gauge.set_function label-siz olur)."""
+
+    def __init__(self, backlog: Callable[[], Dict[str, int]]):
+        self._backlog = backlog
+
+    def collect(self):
+        gauge = GaugeMetricFamily(
+            "hls_segment_backlog", "Transkripsiya növbəsində gözləyən seqmentlər", labels=["channel"]
+        )
+        for channel, n in self._backlog().items():
+            gauge.add_metric([channel], n)
+        yield gauge
+
+
+def track_backlog(backlog: Callable[[], Dict[str, int]]):
+    """`backlog()` – {kanal: gözləyən seqment sayı}, məs. FairQueue.backlog."""
+    REGISTRY.register(_BacklogCollector(backlog))
+
+
+def render() -> bytes:
+    """/metrics cavabı (text exposition formatı)."""
+    return generate_latest(REGISTRY)
+
+
+def start_http_server(port: int, profiler=None):
+    """
+    API-si olmayan proses (Service.py) üçün /metrics və, profiler aktivdirsə,
+    /debug/profile?seconds=N endpoint-ləri olan kiçik HTTP server (daemon thread).
+    """
+    import threading
+    from http.server import ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlparse
+
+    class Handler(MetricsHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/debug/profile":
+                return super().do_GET()
+            if profiler is None or not profiler.enabled:
+                return self._reply(404, "profiler söndürülüb\n")
+            try:
+                seconds = float(parse_qs(url.query).get("seconds", ["10"])[0])
+                self._reply(200, profiler.sample(seconds))
+            except ValueError:
+                self._reply(400, "seconds ədəd olmalıdır\n")
+            except RuntimeError as e:
+                self._reply(409, f"{e}\n")
+
+        def _reply(self, code: int, body: str):
+            data = body.encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
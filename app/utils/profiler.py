@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Opt-in sampling profiler: bütün thread-lərin stack-ləri `sys._current_frames()` ilə
+müəyyən intervalla götürülür və "collapsed stack" formatında (flamegraph.pl/speedscope)
+sayılır. Yalnız çağırılanda işləyir, ona görə production-da əlavə yük yoxdur.
+"""
+import os
+import sys
+import time
+import logging
+import threading
+from collections import Counter
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _stack(frame) -> str:
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class SamplingProfiler:
+    def __init__(self, settings):
+        self.enabled  = settings.profiler_enabled
+        self.interval = settings.profiler_interval_ms / 1000.0
+        self.max_secs = settings.profiler_max_secs
+        self.out_dir  = settings.profiler_dir
+        self._running = threading.Lock()   # eyni anda bir profil
+
+    def sample(self, seconds: float, top: Optional[int] = None) -> str:
+        """
+        `seconds` ərzində stack-ləri toplayır və ən çox görünənləri qaytarır:
+        hər sətir "thread;file:func:line;... say". Başqa profil gedirsə RuntimeError.
+        """
+        seconds = min(max(seconds, self.interval), self.max_secs)
+        if not self._running.acquire(blocking=False):
+            raise RuntimeError("profiler artıq işləyir")
+        try:
+            me = threading.get_ident()
+            stacks: Counter = Counter()
+            n = 0
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    stacks[f"{names.get(ident, ident)};{_stack(frame)}"] += 1
+                n += 1
+                time.sleep(self.interval)
+        finally:
+            self._running.release()
+
+        lines = [f"{stack} {count}" for stack, count in stacks.most_common(top)]
+        logger.info("Profil: %d nümunə, %d fərqli stack", n, len(stacks))
+        return "\n".join(lines) + "\n"
+
+    def dump(self, seconds: float) -> Optional[str]:
+        """Profili profiler_dir-ə yazır (məs. SIGUSR1 ilə); faylın yolunu qaytarır."""
+        try:
+            text = self.sample(seconds)
+        except RuntimeError as e:
+            logger.warning("Profil alınmadı: %s", e)
+            return None
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, time.strftime("profile-%Y%m%d-%H%M%S.txt"))
+        with open(path, "w") as f:
+            f.write(text)
+        logger.info("Profil yazıldı → %s", path)
+        return path
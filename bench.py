@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Ingest pipeline-ı üçün offline replay benchmark.
+
+Yazılmış audionu (WAV, TS, lokal m3u8) Archiver → Transcriber → DB zəncirindən
+keçirir və JSON hesabat verir: mərhələ gecikmələri, RTF, seqment/saniyə, peak RSS.
+
+    python bench.py wav_segments/segment_093.wav --transcriber fake --db sqlite
+    python bench.py archive/index.m3u8 --model tiny --device cpu --compute-type int8 \\
+        --baseline bench_baseline.json
+"""
+import sys
+import json
+import time
+import wave
+import sqlite3
+import logging
+import argparse
+import datetime
+import resource
+import statistics
+from typing import Dict, List
+
+import numpy as np
+
+from app.config import Settings
+from app.api.schemas import SegmentInfo
+from app.services.archiver import Archiver, SAMPLE_RATE
+
+logger = logging.getLogger("bench")
+
+# Metrik → True, əgər böyük dəyər pisdirsə
+_LOWER_IS_BETTER = {
+    "rtf": True,
+    "segments_per_sec": False,
+    "peak_rss_mb": True,
+    "capture_wait.p95": True,
+    "transcribe.p95": True,
+    "insert.p95": True,
+    "end_to_end_lag.p95": True,
+}
+
+
+class FakeTranscriber:
+    """Model yükləmədən işləyən stand-in: audio uzunluğu × rtf qədər yatır."""
+
+    def __init__(self, rtf: float):
+        self.rtf = rtf
+
+    def transcribe(self, source, start_ts, index=None, **_) -> List[SegmentInfo]:
+        secs = _audio_secs(source)
+        time.sleep(secs * self.rtf)
+        start = datetime.datetime.fromtimestamp(start_ts, datetime.timezone.utc)
+        end   = start + datetime.timedelta(seconds=secs)
+        return [SegmentInfo(
+            start_time       = start.isoformat(),
+            end_time         = end.isoformat(),
+            text             = "fake",
+            segment_filename = f"segment_{index or 0:05d}.ts",
+            offset_secs      = 0.0,
+            duration_secs    = secs
+        )]
+
+
+class SQLiteDB:
+    """Postgres-siz stand-in: eyni insert_segments interfeysi."""
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS transcripts (
+                id INTEGER PRIMARY KEY,
+                start_time TEXT, end_time TEXT, text TEXT,
+                segment_filename TEXT, offset_secs REAL, duration_secs REAL
+            )
+        """)
+
+    def init_db(self):
+        pass
+
+    def insert_segments(self, segments: List[SegmentInfo]):
+        self.conn.executemany(
+            "INSERT INTO transcripts (start_time, end_time, text, segment_filename,"
+            " offset_secs, duration_secs) VALUES (?,?,?,?,?,?)",
+            [(s.start_time, s.end_time, s.text, s.segment_filename,
+              s.offset_secs, s.duration_secs) for s in segments]
+        )
+        self.conn.commit()
+
+
+def _audio_secs(source) -> float:
+    if isinstance(source, np.ndarray):
+        return len(source) / SAMPLE_RATE
+    with wave.open(source) as w:
+        return w.getnframes() / w.getframerate()
+
+
+def _stats(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    return {
+        "count": len(values),
+        "mean":  round(statistics.fmean(values), 4),
+        "p50":   round(ordered[len(ordered) // 2], 4),
+        "p95":   round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+        "max":   round(ordered[-1], 4),
+    }
+
+
+def _peak_rss_mb() -> float:
+    # Linux-da ru_maxrss KB-dır; ffmpeg uşaq proses olduğu üçün ayrıca sayılır
+    own  = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    kids = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round((own + kids) / 1024, 1)
+
+
+def run(args) -> dict:
+    overrides = {
+        "hls_url":         args.input,
+        "wav_ingest_mode": args.ingest,
+        "ingest_realtime": args.realtime,
+    }
+    if args.model:
+        overrides["whisper_model"] = args.model
+    if args.device:
+        overrides["device"] = args.device
+    if args.compute_type:
+        overrides["compute_type"] = args.compute_type
+    if args.wav_dir:
+        overrides["wav_dir"] = args.wav_dir
+    settings = Settings(**overrides)
+
+    if args.transcriber == "fake":
+        transcriber = FakeTranscriber(args.fake_rtf)
+    else:
+        from app.services.transcriber import Transcriber
+        transcriber = Transcriber(settings)
+
+    if args.db == "sqlite":
+        db = SQLiteDB(args.sqlite_path)
+    elif args.db == "postgres":
+        from app.services.db import DBClient
+        db = DBClient(settings)
+        db.init_db()
+    else:
+        db = None
+
+    archiver = Archiver(settings)
+    timings = {"capture_wait": [], "transcribe": [], "insert": [], "end_to_end_lag": []}
+    audio_secs = 0.0
+    n_segments = n_rows = 0
+
+    started = time.monotonic()
+    archiver.start_wav()
+    mark = time.monotonic()
+    for seg in archiver.audio_generator():
+        timings["capture_wait"].append(time.monotonic() - mark)
+        secs = _audio_secs(seg.source)
+
+        t0 = time.monotonic()
+        segments = transcriber.transcribe(seg.source, seg.start_ts, seg.index)
+        timings["transcribe"].append(time.monotonic() - t0)
+
+        if db is not None:
+            t0 = time.monotonic()
+            db.insert_segments(segments)
+            timings["insert"].append(time.monotonic() - t0)
+
+        timings["end_to_end_lag"].append(time.time() - (seg.start_ts + secs))
+        archiver.done(seg)
+        audio_secs += secs
+        n_segments += 1
+        n_rows += len(segments)
+        mark = time.monotonic()
+    wall = time.monotonic() - started
+    archiver.stop()
+
+    decode = sum(timings["transcribe"])
+    return {
+        "input":            args.input,
+        "ingest":           args.ingest,
+        "transcriber":      args.transcriber if args.transcriber == "fake" else settings.whisper_model,
+        "db":               args.db,
+        "segments":         n_segments,
+        "rows":             n_rows,
+        "audio_secs":       round(audio_secs, 2),
+        "wall_secs":        round(wall, 2),
+        "rtf":              round(decode / audio_secs, 4) if audio_secs else None,
+        "segments_per_sec": round(n_segments / wall, 3) if wall else None,
+        "peak_rss_mb":      _peak_rss_mb(),
+        "stages":           {name: _stats(v) for name, v in timings.items()},
+    }
+
+
+def _metric(report: dict, name: str):
+    if "." in name:
+        stage, key = name.split(".")
+        return report.get("stages", {}).get(stage, {}).get(key)
+    return report.get(name)
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> List[dict]:
+    """Baseline-a görə `tolerance`-dan çox pisləşmiş metrikləri qaytarır."""
+    regressions = []
+    for name, lower_is_better in _LOWER_IS_BETTER.items():
+        new, old = _metric(report, name), _metric(baseline, name)
+        if new is None or not old:
+            continue
+        change = (new - old) / old
+        if (change > tolerance) if lower_is_better else (change < -tolerance):
+            regressions.append({"metric": name, "baseline": old, "current": new,
+                                "change": round(change, 4)})
+    return regressions
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("input", help="WAV/TS faylı və ya lokal m3u8 (hls_url əvəzinə)")
+    p.add_argument("--ingest", choices=["pipe", "file"], default="pipe")
+    p.add_argument("--realtime", action="store_true", help="ffmpeg -re ilə canlı sürətdə oxu")
+    p.add_argument("--wav-dir", help="file rejimi üçün müvəqqəti WAV qovluğu")
+    p.add_argument("--transcriber", choices=["whisper", "fake"], default="whisper")
+    p.add_argument("--fake-rtf", type=float, default=0.0, help="fake transcriber-in RTF-i")
+    p.add_argument("--model", help="məs. tiny")
+    p.add_argument("--device", help="məs. cpu")
+    p.add_argument("--compute-type", help="məs. int8")
+    p.add_argument("--db", choices=["sqlite", "postgres", "none"], default="sqlite")
+    p.add_argument("--sqlite-path", default=":memory:")
+    p.add_argument("--output", help="JSON hesabatı bu fayla da yaz")
+    p.add_argument("--baseline", help="müqayisə üçün əvvəlki hesabat")
+    p.add_argument("--save-baseline", help="hesabatı baseline kimi saxla")
+    p.add_argument("--tolerance", type=float, default=0.10, help="icazə verilən pisləşmə (0.10 = 10%%)")
+    args = p.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(message)s")
+    report = run(args)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["regressions"] = compare(report, json.load(f), args.tolerance)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w") as f:
+            f.write(text)
+
+    sys.exit(1 if report.get("regressions") else 0)
+
+
+if __name__ == "__main__":
+    main()
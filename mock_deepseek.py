@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test üçün lokal DeepSeek (OpenAI-uyğun chat completions) mock serveri.
+
+Hər sorğuya user mesajının başlanğıcından düzəldilmiş deterministik "xülasə" qaytarır,
+`"stream": true` olduqda SSE ilə parça-parça göndərir. Gecikmə və təsadüfi 503
+cavabları ilə map-reduce paralelliyini və retry/backoff-u yoxlamaq olar:
+
+    python mock_deepseek.py --port 8089 --latency 0.5 --fail-rate 0.2
+    DEEPSEEK_API_URL=http://127.0.0.1:8089/chat/completions python api.py
+"""
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger("mock_deepseek")
+
+
+class _Stats:
+    def __init__(self):
+        self.lock     = threading.Lock()
+        self.inflight = 0
+        self.peak     = 0
+        self.requests = 0
+        self.failed   = 0
+
+    def enter(self):
+        with self.lock:
+            self.requests += 1
+            self.inflight += 1
+            self.peak = max(self.peak, self.inflight)
+
+    def leave(self):
+        with self.lock:
+            self.inflight -= 1
+
+
+def _reply(payload: dict) -> str:
+    user = next((m["content"] for m in reversed(payload.get("messages", [])) if m["role"] == "user"), "")
+    body = user.split("\n\n", 1)[-1]
+    return f"- Xülasə ({len(body)} simvol): {' '.join(body.split()[:12])}"
+
+
+def make_handler(args, stats: _Stats):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *a):
+            logger.debug(fmt, *a)
+
+        def _send(self, status: int, body: bytes, ctype: str = "application/json"):
+            self.send_response(status)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            # Sadə statistika: maksimum paralel sorğu sayı map concurrency limitini göstərir
+            with stats.lock:
+                data = {"requests": stats.requests, "failed": stats.failed,
+                        "inflight": stats.inflight, "peak_inflight": stats.peak}
+            self._send(200, json.dumps(data).encode())
+
+        def do_POST(self):
+            stats.enter()
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                time.sleep(args.latency)
+                if random.random() < args.fail_rate:
+                    with stats.lock:
+                        stats.failed += 1
+                    self._send(503, b'{"error": "overloaded"}')
+                    return
+                text = _reply(payload)
+                if payload.get("stream"):
+                    self._stream(payload, text)
+                else:
+                    self._send(200, json.dumps({
+                        "model": payload.get("model"),
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                                     "finish_reason": "stop"}],
+                    }, ensure_ascii=False).encode("utf-8"))
+            finally:
+                stats.leave()
+
+        def _stream(self, payload: dict, text: str):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for word in text.split(" "):
+                chunk = {"model": payload.get("model"),
+                         "choices": [{"index": 0, "delta": {"content": word + " "}}]}
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(args.token_delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+
+    return Handler
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8089)
+    p.add_argument("--latency", type=float, default=0.2, help="hər sorğuya əlavə gecikmə (saniyə)")
+    p.add_argument("--token-delay", type=float, default=0.02, help="stream parçaları arası gecikmə")
+    p.add_argument("--fail-rate", type=float, default=0.0, help="503 qaytarılan sorğuların payı (0..1)")
+    args = p.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args, _Stats()))
+    logger.info("Mock DeepSeek: http://%s:%d/chat/completions", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
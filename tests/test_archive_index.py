@@ -0,0 +1,80 @@
+import os
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pydantic")
+
+from app.services.archive_index import ArchiveIndex
+
+T0 = datetime(2024, 5, 1, 10, 0, tzinfo=timezone.utc).timestamp()
+
+
+def _playlist(tmp_path, media_seq, entries):
+    """entries: (fayl adı, müddət, PDT və ya None)."""
+    lines = ["#EXTM3U", f"#EXT-X-MEDIA-SEQUENCE:{media_seq}"]
+    for name, dur, pdt in entries:
+        if pdt:
+            lines.append(f"#EXT-X-PROGRAM-DATE-TIME:{pdt}")
+        lines += [f"#EXTINF:{dur},", name]
+    (tmp_path / "index.m3u8").write_text("\n".join(lines) + "\n")
+
+
+@pytest.fixture
+def index(tmp_path):
+    return ArchiveIndex(SimpleNamespace(archive_dir=str(tmp_path), archive_index_refresh_secs=0))
+
+
+def test_parse_uses_pdt_then_previous_end(tmp_path, index):
+    _playlist(tmp_path, 5, [
+        ("segment_00005.ts", 10.0, "2024-05-01T10:00:00.000+0000"),
+        ("segment_00006.ts", 10.0, None),
+        ("segment_00007.ts", 10.0, "2024-05-01T10:01:00.000+0000"),
+    ])
+    assert index.between(T0, T0 + 120) == [
+        (5, "segment_00005.ts", T0, 10.0),
+        (6, "segment_00006.ts", T0 + 10, 10.0),
+        (7, "segment_00007.ts", T0 + 60, 10.0),
+    ]
+    assert index.start_of(6) == T0 + 10
+    assert index.start_of(4) is None
+
+
+def test_locate_returns_none_in_gap(tmp_path, index):
+    _playlist(tmp_path, 0, [
+        ("a.ts", 10.0, "2024-05-01T10:00:00Z"),
+        ("b.ts", 10.0, "2024-05-01T10:01:00Z"),
+    ])
+    assert index.locate(T0 + 4.5) == (0, "a.ts", 4.5)
+    assert index.locate(T0 + 30) is None
+    assert index.lookup(T0 + 61) == ("b.ts", 1.0)
+
+
+def test_span_covers_following_files(tmp_path, index):
+    _playlist(tmp_path, 0, [
+        ("a.ts", 10.0, "2024-05-01T10:00:00Z"),
+        ("b.ts", 10.0, None),
+        ("c.ts", 10.0, None),
+    ])
+    files, start = index.span(T0 + 8, 5)
+    assert [os.path.basename(f) for f in files] == ["a.ts", "b.ts"]
+    assert start == 8
+    assert index.span(T0 - 1, 5) is None
+
+
+def test_refresh_appends_new_and_drops_deleted(tmp_path, index):
+    entries = [
+        ("a.ts", 10.0, "2024-05-01T10:00:00Z"),
+        ("b.ts", 10.0, None),
+    ]
+    _playlist(tmp_path, 0, entries)
+    index.refresh(force=True)
+    assert len(index) == 2
+
+    # delete_segments: "a.ts" silinib, "c.ts" əlavə olunub
+    _playlist(tmp_path, 1, entries[1:] + [("c.ts", 10.0, None)])
+    index.refresh(force=True)
+    assert [(s, f) for s, f, _, _ in index.between(T0, T0 + 60)] == [(1, "b.ts"), (2, "c.ts")]
+    assert index.start_of(2) == T0 + 20
+    assert index.last_seq() == 2
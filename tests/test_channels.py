@@ -0,0 +1,56 @@
+import queue
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.services.archiver import AudioSegment
+from app.services.channels import FairQueue
+
+
+def _seg(channel, i):
+    return AudioSegment(f"{channel}_{i}.wav", 1000.0 + i, i, channel=channel)
+
+
+def _drain(fair, n):
+    return [(s.channel, s.index) for s in (fair.get(timeout=0.1) for _ in range(n))]
+
+
+def test_round_robin_across_channels():
+    fair = FairQueue(["a", "b"])
+    for i in range(3):
+        fair.put(_seg("a", i))
+    fair.put(_seg("b", 0))
+    assert _drain(fair, 4) == [("a", 0), ("b", 0), ("a", 1), ("a", 2)]
+    assert fair.served == {"a": 3, "b": 1}
+
+
+def test_exclusive_holds_channel_until_task_done():
+    fair = FairQueue(["a", "b"], exclusive=True)
+    fair.put(_seg("a", 0))
+    fair.put(_seg("a", 1))
+    fair.put(_seg("b", 0))
+
+    assert fair.get(timeout=0.1).channel == "a"
+    assert fair.get(timeout=0.1).channel == "b"
+    with pytest.raises(queue.Empty):
+        fair.get(block=False)
+
+    fair.task_done("a")
+    assert fair.get(timeout=0.1).index == 1
+
+
+def test_get_returns_none_once_all_channels_closed_and_drained():
+    fair = FairQueue(["a", "b"])
+    fair.inlet("a").put(_seg("a", 0))
+    fair.inlet("a").put(None)
+    fair.inlet("b").put(None)
+    assert fair.get(timeout=0.1).index == 0
+    assert fair.get(timeout=0.1) is None
+    assert fair.backlog() == {"a": 0, "b": 0}
+
+
+def test_get_times_out_while_channel_open():
+    fair = FairQueue(["a"])
+    with pytest.raises(queue.Empty):
+        fair.get(timeout=0.01)
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("pydantic")
+
+from app.api.schemas import SegmentInfo
+from app.services.context import Window, build_context, cluster_windows, trim_hits
+
+T0 = datetime(2024, 5, 1, 10, 0, tzinfo=timezone.utc)
+PAD = timedelta(seconds=15)
+
+
+def _seg(secs, text="söz", channel="default"):
+    start = T0 + timedelta(seconds=secs)
+    return SegmentInfo(
+        start_time=start.isoformat(),
+        end_time=(start + timedelta(seconds=4)).isoformat(),
+        text=text,
+        segment_filename="segment_00001.ts",
+        offset_secs=0.0,
+        duration_secs=4.0,
+        channel=channel,
+    )
+
+
+def _at(secs):
+    return T0 + timedelta(seconds=secs)
+
+
+def test_cluster_merges_overlapping_hits():
+    windows = cluster_windows([_seg(20), _seg(0), _seg(3600)], PAD)
+    assert windows == [
+        Window(_at(-15), _at(39), [_at(0), _at(20)]),
+        Window(_at(3585), _at(3619), [_at(3600)]),
+    ]
+
+
+def test_cluster_keeps_channels_apart():
+    windows = cluster_windows([_seg(0, channel="az1"), _seg(5, channel="az2")], PAD)
+    assert [(w.channel, w.hits) for w in windows] == [("az1", [_at(0)]), ("az2", [_at(5)])]
+
+
+def test_build_context_prefers_windows_with_more_hits():
+    windows = [
+        Window(_at(0), _at(30), [_at(10)]),
+        Window(_at(100), _at(130), [_at(105), _at(120)]),
+    ]
+    rows = [
+        [(_at(10), "a" * 40)],
+        [(_at(105), "b" * 40), (_at(120), "c" * 40)],
+    ]
+    # Hər sətir 11 token: yalnız ikinci pəncərə sığır
+    ctx = build_context(windows, rows, token_budget=25, chars_per_token=4)
+    assert ctx.splitlines()[1:] == ["b" * 40, "c" * 40]
+
+
+def test_build_context_trims_to_lines_nearest_hits():
+    windows = [Window(_at(0), _at(60), [_at(30)], "az1")]
+    rows = [[(_at(s), f"line{s}") for s in (0, 10, 30, 40, 55)]]
+    ctx = build_context(windows, rows, token_budget=6, chars_per_token=4)
+    header, *lines = ctx.splitlines()
+    assert header.endswith("(az1)")
+    assert lines == ["line10", "line30", "line40"]
+
+
+def test_trim_hits_keeps_ranked_order_then_sorts_by_time():
+    hits = [_seg(30, "x" * 8), _seg(0, "y" * 40), _seg(10, "z" * 8)]
+    kept = trim_hits(hits, token_budget=8, chars_per_token=4)
+    assert [s.text for s in kept] == ["z" * 8, "x" * 8]
@@ -0,0 +1,162 @@
+import datetime
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("psycopg2")
+pytest.importorskip("pydantic")
+
+from app.api.schemas import SegmentInfo
+from app.services import db
+
+
+class _Cursor:
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, sql, args=None):
+        self.executed.append((sql, args))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Conn:
+    def __init__(self):
+        self.cur = _Cursor()
+
+    def cursor(self):
+        return self.cur
+
+
+def _segment(start, text, words=None):
+    return SegmentInfo(
+        start_time=f"2024-05-01T10:00:{start:02d}+00:00",
+        end_time=f"2024-05-01T10:00:{start + 4:02d}+00:00",
+        text=text,
+        segment_filename="segment_00001.ts",
+        offset_secs=float(start),
+        duration_secs=4.0,
+        channel="az1",
+        words=words,
+    )
+
+
+@pytest.fixture
+def client(monkeypatch):
+    conn = _Conn()
+    calls = []
+
+    def execute_values(cur, sql, rows, template=None, fetch=False):
+        calls.append((sql, list(rows)))
+        # every VALUES row is new: (ord, id) pairs as the CTE returns them
+        return [(row[0], 100 + row[0]) for row in rows] if fetch else None
+
+    monkeypatch.setattr(db, "execute_values", execute_values)
+    c = db.DBClient(SimpleNamespace(db_pool_max=1, live_notify=False))
+    monkeypatch.setattr(c, "ensure_partitions", lambda days=None: None)
+
+    @contextmanager
+    def connection(op="other"):
+        yield conn
+
+    monkeypatch.setattr(c, "connection", connection)
+    c.calls = calls
+    return c
+
+
+def test_insert_segments_numbers_rows_and_maps_words(client):
+    segments = [
+        _segment(0, "salam", words=[(0.0, 0.5, "salam")]),
+        _segment(4, "dünya"),
+        _segment(8, "xəbərlər", words=[(0.1, 0.9, "xəbərlər")]),
+    ]
+    client.insert_segments(segments)
+
+    (_, rows), (_, word_rows) = client.calls
+    assert [row[0] for row in rows] == [0, 1, 2]
+    assert [row[3] for row in rows] == ["salam", "dünya", "xəbərlər"]
+    assert [(r[0], r[3]) for r in word_rows] == [(100, ["salam"]), (102, ["xəbərlər"])]
+
+
+def test_insert_segments_empty_is_noop(client):
+    client.insert_segments([])
+    assert client.calls == []
+
+
+class _Catalog(_Cursor):
+    """
+    Just enough of Postgres DDL to check ordering: tables must exist before
+    a partition is attached to them. Starts with a legacy plain table.
+    """
+
+    def __init__(self, legacy_rows):
+        super().__init__()
+        self.tables = {"transcripts": "r"}
+        self.legacy_rows = legacy_rows
+        self.rowcount = 0
+        self._result = None
+
+    def execute(self, sql, args=None):
+        super().execute(sql, args)
+        words = " ".join(sql.split())
+        self._result = None
+        if words.startswith("CREATE TABLE"):
+            name = words.split()[5 if "IF NOT EXISTS" in words else 2]
+            if " PARTITION OF " in words:
+                parent = words.split(" PARTITION OF ")[1].split()[0]
+                if parent not in self.tables:
+                    raise AssertionError(f'relation "{parent}" does not exist')
+            self.tables.setdefault(name, "p" if "PARTITION BY" in words else "r")
+        elif words.startswith("ALTER TABLE") and " RENAME TO " in words:
+            old, new = words.split()[2], words.split()[-1]
+            self.tables[new] = self.tables.pop(old)
+        elif words.startswith("DROP TABLE"):
+            self.tables.pop(words.split()[-1], None)
+        elif words.startswith("SELECT relkind FROM pg_class"):
+            kind = self.tables.get("transcripts")
+            self._result = (kind,) if kind else None
+        elif words.startswith("SELECT min(start_time), max(start_time)"):
+            self._result = self.legacy_rows
+
+    def fetchone(self):
+        return self._result
+
+
+def test_init_db_migrates_legacy_table(monkeypatch):
+    first = datetime.datetime(2024, 5, 1, 23, 0, tzinfo=datetime.timezone.utc)
+    last = datetime.datetime(2024, 5, 3, 1, 0, tzinfo=datetime.timezone.utc)
+    cur = _Catalog((first, last))
+    conn = SimpleNamespace(cursor=lambda: cur)
+
+    c = db.DBClient(SimpleNamespace(db_pool_max=1, db_partition_days_ahead=0))
+
+    @contextmanager
+    def connection(op="other"):
+        yield conn
+
+    monkeypatch.setattr(c, "connection", connection)
+    c.init_db()
+
+    assert cur.tables["transcripts"] == "p"
+    assert "transcripts_legacy" not in cur.tables
+    for day in ("20240501", "20240502", "20240503"):
+        assert f"transcripts_p{day}" in cur.tables
+        assert f"transcript_words_p{day}" in cur.tables
+
+
+def test_cursor_round_trip():
+    ts = datetime.datetime(2024, 5, 1, 10, 0, 4, 500000, tzinfo=datetime.timezone.utc)
+    cursor = db.encode_cursor(ts, 42)
+    assert "=" not in cursor
+    assert db.decode_cursor(cursor) == (ts, 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", "MjAyNC0wNS0wMXx4"])
+def test_decode_cursor_rejects_garbage(cursor):
+    with pytest.raises(ValueError):
+        db.decode_cursor(cursor)
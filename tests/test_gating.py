@@ -0,0 +1,68 @@
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.services.archiver import AudioSegment, SAMPLE_RATE
+from app.services.gating import SpeechGate
+
+
+def _gate(**kw):
+    settings = dict(
+        gate_frame_ms=30, gate_energy_db=-45.0, gate_noise_margin_db=6.0,
+        gate_zcr_min=0.01, gate_zcr_max=0.35, gate_min_speech_ratio=0.15,
+        gate_log_path="", gate_history=100,
+    )
+    settings.update(kw)
+    return SpeechGate(SimpleNamespace(**settings))
+
+
+def _tone(secs, amp=0.3, hz=200.0):
+    t = np.arange(int(secs * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amp * np.sin(2 * np.pi * hz * t)).astype(np.float32)
+
+
+def _silence(secs):
+    rng = np.random.default_rng(0)
+    return (rng.standard_normal(int(secs * SAMPLE_RATE)) * 1e-4).astype(np.float32)
+
+
+def test_speech_ratio_of_silence_is_zero():
+    gate = _gate()
+    assert gate.speech_ratio(_silence(2)) == 0.0
+    assert gate.speech_ratio(np.zeros(10, dtype=np.float32)) == 0.0
+
+
+def test_speech_ratio_counts_voiced_frames():
+    ratio = _gate().speech_ratio(np.concatenate([_silence(2), _tone(2)]))
+    assert ratio == pytest.approx(0.5, abs=0.05)
+
+
+def test_speech_ratio_rejects_broadband_noise():
+    noise = (np.random.default_rng(1).standard_normal(2 * SAMPLE_RATE) * 0.3).astype(np.float32)
+    assert _gate().speech_ratio(np.concatenate([_silence(2), noise])) < 0.05
+
+
+def test_filter_tracks_silent_runs_per_channel(caplog):
+    gate = _gate()
+    loud = np.concatenate([_silence(1), _tone(1)])
+    segs = [
+        AudioSegment(_silence(1), 0.0, 1, channel="az1"),
+        AudioSegment(_silence(1), 0.0, 1, channel="az2"),
+        AudioSegment(_silence(1), 0.0, 2, channel="az1"),
+        AudioSegment(loud, 0.0, 2, channel="az2"),
+        AudioSegment(loud, 0.0, 3, channel="az1"),
+    ]
+    dropped = []
+    with caplog.at_level(logging.INFO, logger="app.services.gating"):
+        passed = list(gate.filter(segs, on_drop=dropped.append))
+
+    assert [(s.channel, s.index) for s in passed] == [("az2", 2), ("az1", 3)]
+    assert [(s.channel, s.index) for s in dropped] == [("az1", 1), ("az2", 1), ("az1", 2)]
+    assert [r.getMessage() for r in caplog.records] == [
+        "[az2] Nitqsiz hissə atıldı: #1..#1 (1s)",
+        "[az1] Nitqsiz hissə atıldı: #1..#2 (2s)",
+    ]
+    assert gate.stats()["dropped"] == 3
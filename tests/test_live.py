@@ -0,0 +1,78 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("asyncpg")
+pytest.importorskip("orjson")
+pytest.importorskip("psycopg2")
+
+from app.api.schemas import SegmentInfo
+from app.services import db
+from app.services.live import LiveHub
+
+
+def _segment(text, channel="az1"):
+    return SegmentInfo(
+        start_time="2024-05-01T10:00:00+00:00",
+        end_time="2024-05-01T10:00:04+00:00",
+        text=text,
+        segment_filename="segment_00001.ts",
+        offset_secs=0.0,
+        duration_secs=4.0,
+        channel=channel,
+    )
+
+
+def test_notify_payloads_fit_and_keep_every_segment():
+    segments = [_segment(f"{i} " + "söz " * 200) for i in range(30)]
+    payloads = db.notify_payloads(segments)
+    assert len(payloads) > 1
+    assert all(len(p.encode()) <= db._NOTIFY_MAX_BYTES for p in payloads)
+    decoded = [seg for p in payloads for seg in json.loads(p)]
+    assert [seg["text"] for seg in decoded] == [s.text for s in segments]
+
+
+def test_notify_payloads_shortens_oversized_text():
+    [payload] = db.notify_payloads([_segment("ə" * db._NOTIFY_MAX_BYTES)])
+    assert len(payload.encode()) <= db._NOTIFY_MAX_BYTES
+    assert json.loads(payload)[0]["text"].startswith("əəə")
+    assert db.notify_payloads([]) == []
+
+
+def _hub(buffer=2):
+    settings = SimpleNamespace(live_client_buffer=buffer, live_reconnect_secs=1)
+    return LiveHub(settings, db=None)
+
+
+def test_hub_routes_by_channel():
+    async def run():
+        hub = _hub()
+        async with hub.subscribe("az1") as az1, hub.subscribe() as every:
+            hub._on_notify(None, 0, db.NOTIFY_CHANNEL, db.notify_payloads(
+                [_segment("bir", "az1"), _segment("iki", "az2")]
+            )[0])
+            got_az1 = [json.loads(await az1.get(0.1)), await az1.get(0.01)]
+            got_all = [json.loads(await every.get(0.1)) for _ in range(2)]
+        assert got_az1[0]["text"] == "bir" and got_az1[1] == b""
+        assert [s["text"] for s in got_all] == ["bir", "iki"]
+        assert hub.stats() == {"subscribers": 0, "published": 2, "dropped": 0}
+
+    asyncio.run(run())
+
+
+def test_hub_drops_slow_subscriber_only():
+    async def run():
+        hub = _hub(buffer=2)
+        async with hub.subscribe() as slow, hub.subscribe() as fast:
+            for i in range(3):
+                hub.publish({"text": str(i), "channel": "az1"})
+                if i < 2:
+                    await fast.get(0.1)
+            assert await slow.get(0.1) is None
+            assert json.loads(await fast.get(0.1))["text"] == "2"
+            assert hub.stats()["subscribers"] == 1
+        assert hub.dropped == 1
+
+    asyncio.run(run())
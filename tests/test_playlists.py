@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pydantic")
+
+from app.services.playlists import PlaylistService
+
+T0 = 1714557600.0   # 2024-05-01T10:00:00Z
+
+
+class _Index:
+    """10s-lik seqmentlər: seq n → [T0 + 10n, T0 + 10n + 10)."""
+
+    def __init__(self, seqs):
+        self.entries = [(n, f"segment_{n:05d}.ts", T0 + 10 * n, 10.0) for n in seqs]
+
+    def between(self, start, end):
+        return [e for e in self.entries if e[2] < end and e[2] + e[3] > start]
+
+
+def _service(index, channels=None):
+    settings = SimpleNamespace(
+        channel="az1", channels=channels, playlist_cache_ttl=60, playlist_cache_size=2
+    )
+    return PlaylistService(settings, index)
+
+
+def _media(body):
+    return [l for l in body.splitlines() if not l.startswith("#EXTM3U")][5:]
+
+
+def test_build_merges_ranges_and_marks_discontinuity():
+    svc = _service(_Index(range(10)))
+    body = svc.build([(T0 + 65, T0 + 85), (T0 + 5, T0 + 15), (T0 + 12, T0 + 25)])
+    assert "#EXT-X-START:TIME-OFFSET=5.000,PRECISE=YES" in body
+    assert _media(body) == [
+        "#EXT-X-PROGRAM-DATE-TIME:2024-05-01T10:00:00.000+00:00",
+        "#EXTINF:10.000,", "/archive/segment_00000.ts",
+        "#EXTINF:10.000,", "/archive/segment_00001.ts",
+        "#EXTINF:10.000,", "/archive/segment_00002.ts",
+        "#EXT-X-DISCONTINUITY",
+        "#EXT-X-PROGRAM-DATE-TIME:2024-05-01T10:01:00.000+00:00",
+        "#EXTINF:10.000,", "/archive/segment_00006.ts",
+        "#EXTINF:10.000,", "/archive/segment_00007.ts",
+        "#EXTINF:10.000,", "/archive/segment_00008.ts",
+        "#EXT-X-ENDLIST",
+    ]
+
+
+def test_build_discontinuity_on_archive_gap():
+    svc = _service(_Index([0, 1, 4]), channels=["az1", "az2"])
+    body = svc.build([(T0, T0 + 50)])
+    assert body.count("#EXT-X-DISCONTINUITY") == 1
+    assert "/archive/az1/segment_00004.ts" in body
+
+
+def test_build_returns_none_without_segments():
+    assert _service(_Index([])).build([(T0, T0 + 30)]) is None
+
+
+def test_cache_evicts_least_recently_used():
+    svc = _service(_Index([]))
+    svc.put("a", "A")
+    svc.put("b", "B")
+    assert svc.get("a") == "A"
+    svc.put("c", "C")
+    assert svc.get("b") is None
+    assert (svc.get("a"), svc.get("c")) == ("A", "C")
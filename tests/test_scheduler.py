@@ -0,0 +1,97 @@
+import time
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("faster_whisper")
+
+from app.services.archiver import AudioSegment, SAMPLE_RATE
+from app.services.scheduler import TranscriptionScheduler
+
+
+def _settings(**kw):
+    settings = dict(
+        wav_segment_time=8, sched_queue_size=2, sched_lag_thresholds=[30.0, 90.0, 180.0],
+        sched_restore_ratio=0.5, sched_skip_speech_ratio=0.2,
+        sched_fallback_model="small", sched_fallback_compute_type="int8",
+        gate_frame_ms=30, gate_energy_db=-45.0, gate_noise_margin_db=6.0,
+        gate_zcr_min=0.01, gate_zcr_max=0.35, gate_min_speech_ratio=0.15,
+        gate_log_path="", gate_history=10,
+    )
+    settings.update(kw)
+    return SimpleNamespace(**settings)
+
+
+def _seg(i, lag=0.0, source="x.wav"):
+    # start_ts elə seçilir ki, lag = now - (start_ts + seg_time) ≈ lag
+    return AudioSegment(source, time.time() - 8 - lag, i)
+
+
+def test_tier_steps_down_and_restores_with_hysteresis():
+    sched = TranscriptionScheduler(None, _settings())
+    names = []
+    for lag in (10, 40, 200, 100, 80, 40, 14, 10):
+        sched._update_tier(lag)
+        names.append(sched.tier.name)
+    assert names == ["full", "greedy", "skip", "skip", "fallback", "greedy", "full", "full"]
+    assert sched.status()["lag_secs"] == 10
+
+
+def test_submit_drops_oldest_when_full():
+    dropped = []
+    sched = TranscriptionScheduler(None, _settings(), on_drop=dropped.append)
+    for i in range(4):
+        sched.submit(_seg(i))
+    got = []
+    worker = threading.Thread(target=lambda: got.extend(s.index for s in sched))
+    worker.start()
+    sched.close()   # dolu queue-da worker yer açana qədər gözləyir
+    worker.join(timeout=1)
+    assert got == [2, 3]
+    assert [s.index for s in dropped] == [0, 1]
+    assert sched.status()["dropped"] == 2
+
+
+def test_close_stops_every_worker():
+    sched = TranscriptionScheduler(None, _settings())
+    sched.submit(_seg(0))
+    sched.close()
+    assert [s.index for s in sched] == [0]
+    assert list(sched) == []
+
+
+def test_skip_tier_drops_silent_segments():
+    dropped = []
+    sched = TranscriptionScheduler(None, _settings(sched_queue_size=4), on_drop=dropped.append)
+    silent = np.zeros(SAMPLE_RATE, dtype=np.float32)
+    t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+    speech = np.concatenate([silent, (0.3 * np.sin(2 * np.pi * 200 * t)).astype(np.float32)])
+    sched.submit(_seg(0, lag=300, source=silent))
+    sched.submit(_seg(1, lag=300, source=speech))
+    sched.close()
+    assert [s.index for s in sched] == [1]
+    assert [s.index for s in dropped] == [0]
+    assert sched.status()["skipped"] == 1
+
+
+def test_fallback_loaded_once(monkeypatch):
+    sched = TranscriptionScheduler(None, _settings())
+    loads = []
+
+    def load():
+        loads.append(1)
+        time.sleep(0.01)
+        return object()
+
+    monkeypatch.setattr(sched, "_load_fallback", load)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(sched._fallback_transcriber()))
+               for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(loads) == 1
+    assert len(set(map(id, results))) == 1
@@ -0,0 +1,23 @@
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("pydantic_settings")
+
+from app.services.summarizer import split_chunks
+
+
+def test_split_chunks_packs_lines_up_to_limit():
+    text = "\n".join(["aaaa", "bbbb", "cccc", "dd"])
+    # limit 10 simvol: iki 4 simvollu sətir + newline sığır
+    assert split_chunks(text, max_tokens=5, chars_per_token=2) == ["aaaa\nbbbb", "cccc\ndd"]
+
+
+def test_split_chunks_splits_long_line_on_words():
+    chunks = split_chunks("bir iki üç dörd beş", max_tokens=4, chars_per_token=2)
+    assert chunks == ["bir iki", "üç dörd", "beş"]
+    assert all(len(c) <= 8 for c in chunks)
+
+
+def test_split_chunks_keeps_short_text_whole():
+    assert split_chunks("salam\ndünya", max_tokens=100, chars_per_token=4) == ["salam\ndünya"]
+    assert split_chunks("", max_tokens=100, chars_per_token=4) == []
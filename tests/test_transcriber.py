@@ -0,0 +1,62 @@
+import queue
+
+import pytest
+
+pytest.importorskip("faster_whisper")
+
+from app.services.archiver import AudioSegment
+from app.services.transcriber import SegmentBatcher, merge_speech, ts_filename
+
+
+def _seg(i):
+    return AudioSegment(f"segment_{i:03d}.wav", 1000.0 + i, i)
+
+
+def _queue(*items):
+    q = queue.Queue()
+    for item in items:
+        q.put(item)
+    return q
+
+
+def test_batcher_fills_batches_from_backlog():
+    q = _queue(*(_seg(i) for i in range(5)), None)
+    batches = list(SegmentBatcher(q, batch_size=2, max_wait=1.0))
+    assert [[s.index for s in b] for b in batches] == [[0, 1], [2, 3], [4]]
+
+
+def test_batcher_yields_partial_batch_after_max_wait():
+    q = _queue(_seg(0))
+    batches = iter(SegmentBatcher(q, batch_size=4, max_wait=0.05))
+    assert [s.index for s in next(batches)] == [0]
+    q.put(None)
+    assert list(batches) == []
+
+
+def test_batcher_stops_on_sentinel_mid_batch():
+    q = _queue(_seg(0), _seg(1), None, _seg(2))
+    batches = list(SegmentBatcher(q, batch_size=8, max_wait=1.0))
+    assert [[s.index for s in b] for b in batches] == [[0, 1]]
+
+
+def test_ts_filename_from_index_or_wav_name():
+    assert ts_filename("wav/segment_012.wav", None) == "segment_00012.ts"
+    assert ts_filename("ignored.wav", 7) == "segment_00007.ts"
+
+
+def test_merge_speech_joins_chunks_up_to_max_len():
+    speech = [
+        {"start": 0, "end": 100},
+        {"start": 150, "end": 250},
+        {"start": 300, "end": 500},
+        {"start": 520, "end": 540},
+    ]
+    assert merge_speech(speech, 300) == [
+        {"start": 0, "end": 250},
+        {"start": 300, "end": 540},
+    ]
+
+
+def test_merge_speech_keeps_long_chunk_whole():
+    assert merge_speech([{"start": 0, "end": 900}], 300) == [{"start": 0, "end": 900}]
+    assert merge_speech([], 300) == []